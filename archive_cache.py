@@ -0,0 +1,160 @@
+import datetime
+import json
+import logging
+import os
+import time
+
+import requests
+
+from chess_rules import validate_pgn
+from metrics import API_FETCH_ERRORS, API_FETCH_SECONDS
+from pgn_format import format_pgns
+
+# ================= API ARCHIVE CACHE =================
+# One JSON file per player and month holding the raw API response, its HTTP
+# validators and the already-normalized PGNs. Open months are revalidated with
+# a conditional GET; months fetched after they ended are never requested again.
+# A changed open month only normalizes the games whose link is not cached yet.
+
+API_BASE = "https://api.chess.com/pub"
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+
+# Bump when the normalizer or game filter changes: cached PGNs are then
+# rebuilt from the stored raw response instead of being downloaded again.
+FORMAT_VERSION = 2
+
+# Late games can still be attached to a month shortly after it ends
+CLOSED_MONTH_GRACE = datetime.timedelta(days=1)
+
+
+def archive_url(username, year, month, api_base=API_BASE):
+    return f"{api_base}/player/{username}/games/{int(year):04d}/{int(month):02d}"
+
+def normalize_games(games):
+    # Filter for standard chess and convert to accepted format immediately
+    pgns = format_pgns(g["pgn"] for g in games if g.get("rules") == "chess" and g.get("pgn"))
+    # Drop games the board would reject before they ever reach the browser
+    valid = []
+    for pgn in pgns:
+        check = validate_pgn(pgn)
+        if check.ok:
+            valid.append(pgn)
+        else:
+            logging.warning(f"[VALIDATE] Dropping unplayable game: {check.error}")
+    return valid
+
+def game_key(game):
+    # The API's game url is the PGN's [Link] header
+    return game.get("url") or game.get("pgn")
+
+def month_closed_at(year, month):
+    year, month = int(year), int(month)
+    if month == 12:
+        end = datetime.datetime(year + 1, 1, 1, tzinfo=datetime.timezone.utc)
+    else:
+        end = datetime.datetime(year, month + 1, 1, tzinfo=datetime.timezone.utc)
+    return end + CLOSED_MONTH_GRACE
+
+
+class ArchiveCache:
+    def __init__(self, cache_dir, api_base=API_BASE, session=None, timeout=10):
+        self.cache_dir = cache_dir
+        self.api_base = api_base.rstrip("/")
+        self.session = session or requests.Session()
+        self.timeout = timeout
+
+    def path(self, username, year, month):
+        return os.path.join(self.cache_dir, username.lower(), f"{int(year):04d}-{int(month):02d}.json")
+
+    def load(self, username, year, month):
+        try:
+            with open(self.path(username, year, month), "r", encoding="utf-8") as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if entry.get("format_version") != FORMAT_VERSION:
+            try:
+                entry["pgns"] = normalize_games(json.loads(entry["raw"]).get("games", []))
+            except (KeyError, ValueError):
+                return None
+            entry["format_version"] = FORMAT_VERSION
+            self.save(username, year, month, entry)
+        return entry
+
+    def save(self, username, year, month, entry):
+        path = self.path(username, year, month)
+        tmp_path = path + ".tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logging.warning(f"[CACHE] Could not write {path}: {e}")
+
+    def fetch_month(self, username, year, month):
+        return self.refresh_month(username, year, month)[0]
+
+    def refresh_month(self, username, year, month):
+        # (every normalized PGN of the month, those added by this call)
+        entry = self.load(username, year, month)
+        if entry and entry.get("closed"):
+            logging.info(f"[CACHE] {username} {year}-{month}: closed month, served from cache")
+            return entry["pgns"], []
+
+        url = archive_url(username, year, month, self.api_base)
+        headers = {'User-Agent': USER_AGENT}
+        if entry:
+            if entry.get("etag"):
+                headers['If-None-Match'] = entry["etag"]
+            if entry.get("last_modified"):
+                headers['If-Modified-Since'] = entry["last_modified"]
+
+        logging.info(f"[API] Fetching games from {url}")
+        start = time.monotonic()
+        try:
+            try:
+                response = self.session.get(url, headers=headers, timeout=self.timeout)
+            finally:
+                # Timeouts and connection errors count towards latency too
+                API_FETCH_SECONDS.observe(time.monotonic() - start)
+            now = datetime.datetime.now(datetime.timezone.utc)
+            if response.status_code == 304 and entry:
+                logging.info(f"[CACHE] {username} {year}-{month}: not modified")
+                if now >= month_closed_at(year, month):
+                    entry["closed"] = True
+                    self.save(username, year, month, entry)
+                return entry["pgns"], []
+            response.raise_for_status()
+            raw = response.text
+            games = json.loads(raw).get("games", [])
+        except Exception as e:
+            API_FETCH_ERRORS.inc()
+            if entry:
+                logging.warning(f"[CACHE] {username} {year}-{month}: fetch failed ({e}), using cached copy")
+                return entry["pgns"], []
+            raise
+
+        pgns, known = [], set()
+        if entry:
+            pgns = entry["pgns"]
+            known = set(entry.get("links") or map(game_key, json.loads(entry["raw"]).get("games", [])))
+        fresh = [g for g in games if game_key(g) not in known]
+        new_pgns = normalize_games(fresh)
+        if entry:
+            logging.info(f"[CACHE] {username} {year}-{month}: {len(fresh)} new games, {len(new_pgns)} playable")
+
+        entry = {
+            "url": url,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "fetched_at": now.isoformat(),
+            # The response is complete once it was taken after the month ended
+            "closed": now >= month_closed_at(year, month),
+            "format_version": FORMAT_VERSION,
+            "raw": raw,
+            "links": [game_key(g) for g in games],
+            "pgns": pgns + new_pgns,
+        }
+        self.save(username, year, month, entry)
+        return entry["pgns"], new_pgns
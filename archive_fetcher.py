@@ -0,0 +1,208 @@
+import datetime
+import email.utils
+import logging
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from archive_cache import USER_AGENT
+from metrics import API_FETCH_ERRORS, API_FETCH_SECONDS
+
+# ================= CONCURRENT ARCHIVE FETCH =================
+
+LINK_RE = re.compile(r'\[Link "(.*?)"\]')
+
+
+def game_link(pgn):
+    match = LINK_RE.search(pgn)
+    return match.group(1) if match else None
+
+def retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    if value.strip().isdigit():
+        return float(value)
+    try:
+        return max(email.utils.parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
+class ThrottledSession(requests.Session):
+    # Connection-pooled session shared by all fetch workers. Requests are
+    # spaced to `requests_per_second` across threads, and a 429 pauses every
+    # worker until Retry-After (or an exponential backoff) has passed.
+    def __init__(self, pool_size=8, requests_per_second=3.0, max_retries=5, backoff=2.0):
+        super().__init__()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+        self.headers['User-Agent'] = USER_AGENT
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def _wait_for_slot(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _pause(self, seconds):
+        with self._lock:
+            self._next_slot = max(self._next_slot, time.monotonic() + seconds)
+
+    def request(self, method, url, *args, **kwargs):
+        for attempt in range(self.max_retries + 1):
+            self._wait_for_slot()
+            response = super().request(method, url, *args, **kwargs)
+            if response.status_code != 429 or attempt == self.max_retries:
+                return response
+            delay = retry_after_seconds(response)
+            if delay is None:
+                delay = self.backoff * (2 ** attempt)
+            logging.warning(f"[API] Rate limited on {url}, backing off {delay:.1f}s")
+            response.close()
+            self._pause(delay)
+        return response
+
+
+class ArchiveFetcher:
+    # Discovers every monthly archive for each player and downloads them on a
+    # bounded worker pool, appending each month to the playlist as it lands.
+    def __init__(self, cache, players, playlist, max_workers=4):
+        self.cache = cache
+        self.players = list(players)
+        self.playlist = playlist
+        self.max_workers = max_workers
+        self.thread = None
+
+    def list_archives(self, username):
+        url = f"{self.cache.api_base}/player/{username}/games/archives"
+        start = time.monotonic()
+        try:
+            response = self.cache.session.get(url, timeout=self.cache.timeout)
+            response.raise_for_status()
+        except Exception:
+            API_FETCH_ERRORS.inc()
+            raise
+        finally:
+            API_FETCH_SECONDS.observe(time.monotonic() - start)
+        months = []
+        for archive in response.json().get("archives", []):
+            year, month = archive.rstrip("/").split("/")[-2:]
+            months.append((year, month))
+        # Newest first so recent games reach the stream soonest
+        months.sort(reverse=True)
+        logging.info(f"[API] {username}: {len(months)} monthly archives")
+        return months
+
+    def run(self):
+        start = time.monotonic()
+        total = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch") as pool:
+            pending = {pool.submit(self.list_archives, u): ("archives", u) for u in self.players}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    kind, *key = pending.pop(fut)
+                    try:
+                        result = fut.result()
+                    except Exception as e:
+                        logging.error(f"[API] Fetch failed for {'/'.join(key)}: {e}")
+                        continue
+                    if kind == "archives":
+                        username = key[0]
+                        for year, month in result:
+                            job = pool.submit(self.cache.fetch_month, username, year, month)
+                            pending[job] = ("month", username, year, month)
+                    elif result:
+                        self.playlist.extend(result)
+                        total += len(result)
+        self.playlist.mark_complete()
+        logging.info(f"[API] Fetched {total} games for {len(self.players)} players in {time.monotonic() - start:.1f}s")
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="archive-fetcher", daemon=True)
+        self.thread.start()
+        return self.thread
+
+
+class PlaylistRefresher:
+    # Polls the months the playlist was built from while the stream runs and
+    # appends games it has not seen (by [Link]). months=None follows the
+    # current calendar month (playlists fetched from every archive). Only the
+    # new games of a month are normalized; indexes of queued games never shift.
+    def __init__(self, cache, players, playlist, interval=300, months=None):
+        self.cache = cache
+        self.players = list(players)
+        self.playlist = playlist
+        self.interval = interval
+        self.months = list(months) if months else None
+        self.seen = set()
+        self._scanned = 0
+        self._stop = threading.Event()
+        self.thread = None
+
+    def _scan(self):
+        # Other fetchers may still be appending; only look at what is new
+        end = len(self.playlist)
+        for idx in range(self._scanned, end):
+            if hasattr(self.playlist, "headers"):
+                # Compact playlists answer from the packed headers
+                self.seen.add(self.playlist.headers(idx).get("Link"))
+            else:
+                self.seen.add(game_link(self.playlist[idx]))
+        self._scanned = end
+
+    def poll(self):
+        self._scan()
+        months = self.months
+        if months is None:
+            now = datetime.datetime.now(datetime.timezone.utc)
+            months = [(f"{now.year:04d}", f"{now.month:02d}")]
+        added = []
+        for username in self.players:
+            for year, month in months:
+                try:
+                    _, new_pgns = self.cache.refresh_month(username, year, month)
+                except Exception as e:
+                    logging.warning(f"[REFRESH] {username} {year}-{month}: {e}")
+                    continue
+                for pgn in new_pgns:
+                    link = game_link(pgn)
+                    if link is not None and link in self.seen:
+                        continue
+                    self.seen.add(link)
+                    added.append(pgn)
+        if added:
+            self.playlist.extend(added)
+            logging.info(f"[REFRESH] Added {len(added)} new games ({len(self.playlist)} in playlist)")
+        return added
+
+    def run(self):
+        # Seed the seen set from the whole initial fetch, not part of it
+        self.playlist.wait_for(sys.maxsize)
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception as e:
+                logging.error(f"[REFRESH] Poll failed: {e}")
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="playlist-refresher", daemon=True)
+        self.thread.start()
+        return self.thread
+
+    def stop(self):
+        self._stop.set()
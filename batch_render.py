@@ -0,0 +1,129 @@
+import argparse
+import fractions
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from board_renderer import BoardRenderer
+from chess_rules import replay_game, validate_pgn
+import stream_scene
+
+# ================= OFFLINE BATCH RENDER =================
+# Renders a playlist to a video file faster than real time. Each game is an
+# independent segment rendered by one worker process. A worker writes every
+# position once to ffmpeg at a frame rate of 1/move_delay, so the timing is
+# exact and nothing waits on a clock; ffmpeg duplicates frames up to the
+# output rate. Segments get the live stream's scene (header, banner, audio)
+# and encoder settings from stream_scene.py and are joined with a
+# stream-copy concat, so no frame is encoded twice.
+
+# One renderer per worker process; its sprites are rasterized on first use
+_renderer = None
+
+
+def segment_command(size, move_delay, static_scene=False):
+    # Everything but the output path; built once per playlist
+    rate = fractions.Fraction(move_delay).limit_denominator(1000)
+    # tpad holds the final position for a move delay; without it fps ends
+    # the segment on the last frame's start and the last move is never seen
+    board_filter = f"tpad=stop_mode=clone:stop_duration={float(move_delay)},fps={stream_scene.OUTPUT_FPS},"
+    return (
+        ['ffmpeg', '-y', '-loglevel', 'error',
+         '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-video_size', f'{size}x{size}',
+         '-framerate', f'{rate.denominator}/{rate.numerator}',
+         '-i', 'pipe:0']
+        + stream_scene.overlay_inputs()
+        + stream_scene.filter_args((0, 0, size, size), board_filter)
+        # Single-threaded like the live encoder; the pool supplies parallelism
+        + stream_scene.encoding_args(static_scene)
+    )
+
+def render_game(job):
+    global _renderer
+    idx, pgn, path, command, size, allow_chess960 = job
+    check = validate_pgn(pgn, allow_chess960)
+    if not check.ok:
+        logging.warning(f"[BATCH] Skipping game {idx+1}: {check.error}")
+        return idx, None, 0
+    if _renderer is None or _renderer.size != size:
+        _renderer = BoardRenderer(size)
+    _, pos, moves = replay_game(pgn)
+    proc = subprocess.Popen(command + [path], stdin=subprocess.PIPE)
+    try:
+        proc.stdin.write(_renderer.render(pos))
+        for move in moves:
+            pos.push(move)
+            proc.stdin.write(_renderer.render(pos, move))
+        proc.stdin.close()
+    except BrokenPipeError:
+        pass
+    if proc.wait() != 0:
+        logging.error(f"[BATCH] ffmpeg failed on game {idx+1} (exit {proc.returncode})")
+        return idx, None, 0
+    return idx, path, len(moves)
+
+def concat_segments(paths, output_file, work_dir):
+    list_file = os.path.join(work_dir, "segments.txt")
+    with open(list_file, "w", encoding="utf-8") as f:
+        for path in paths:
+            escaped = path.replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    subprocess.run(['ffmpeg', '-y', '-loglevel', 'error', '-f', 'concat', '-safe', '0',
+                    '-i', list_file, '-c', 'copy', output_file], check=True)
+
+def render_playlist(pgns, output_file, move_delay=3, size=600, workers=None, work_dir=None,
+                    allow_chess960=True, static_scene=False):
+    workers = workers or os.cpu_count() or 1
+    own_dir = work_dir is None
+    work_dir = work_dir or tempfile.mkdtemp(prefix="batch_render_")
+    os.makedirs(work_dir, exist_ok=True)
+    start = time.monotonic()
+    # The renderer rounds the board down to whole squares
+    size = size // 8 * 8
+    command = segment_command(size, move_delay, static_scene)
+    jobs = [(idx, pgn, os.path.join(work_dir, f"game_{idx:05d}.mkv"), command, size, allow_chess960)
+            for idx, pgn in enumerate(pgns)]
+    logging.info(f"[BATCH] Rendering {len(jobs)} games on {workers} workers")
+    segments = [None] * len(jobs)
+    total_moves = 0
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            for idx, path, plies in pool.map(render_game, jobs, chunksize=1):
+                segments[idx] = path
+                total_moves += plies
+                if path:
+                    logging.info(f"[BATCH] Game {idx+1}/{len(jobs)} rendered ({plies} moves)")
+        segments = [path for path in segments if path]
+        if not segments:
+            raise RuntimeError("No game could be rendered")
+        concat_segments(segments, output_file, work_dir)
+    finally:
+        if own_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    elapsed = time.monotonic() - start
+    video_seconds = (total_moves + len(segments)) * move_delay
+    logging.info(f"[BATCH] {len(segments)} games, {video_seconds / 60:.1f} min of video in {elapsed:.1f}s "
+                 f"({video_seconds / max(elapsed, 1e-9):.1f}x real time) -> {output_file}")
+    return output_file
+
+
+if __name__ == "__main__":
+    from pgn_archive import PgnArchive
+    from pgn_format import format_pgn_to_standard
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Render a PGN file to a video faster than real time.")
+    parser.add_argument("pgn_file")
+    parser.add_argument("output_file")
+    parser.add_argument("--move-delay", type=float, default=3)
+    parser.add_argument("--size", type=int, default=600)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--no-chess960", action="store_true", help="skip Chess960 games")
+    args = parser.parse_args()
+    with PgnArchive(args.pgn_file, transform=format_pgn_to_standard) as archive:
+        render_playlist(list(archive), args.output_file, args.move_delay, args.size, args.workers,
+                        allow_chess960=not args.no_chess960)
@@ -0,0 +1,262 @@
+import argparse
+import datetime
+import json
+import logging
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import time
+
+import requests
+
+# ================= BENCHMARKS =================
+# Offline timings of the ingest and orchestration hot paths, with
+# magnus_games.pgn and a synthetic archive built from it as fixtures. The
+# browser is a stub that answers instantly, so the orchestration numbers are
+# pure Python overhead per game and per move. Results are written as JSON and
+# compared against a stored baseline; a slowdown beyond the threshold fails
+# the run.
+
+FIXTURE_PGN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "magnus_games.pgn")
+LINK_NUMBER_RE = re.compile(r'(\[Link "[^"]*?)(\d+)("\])')
+
+
+def best_of(fn, repeat):
+    # Best wall time of `repeat` runs; the minimum is the least noisy estimate
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def write_synthetic_archive(raw_games, count, path):
+    # `count` games cycled from the fixture, each with its own Link so
+    # dedupe-by-link paths see distinct games
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            game = raw_games[i % len(raw_games)]
+            game = LINK_NUMBER_RE.sub(lambda m: f"{m.group(1)}{int(m.group(2)) + i}{m.group(3)}", game, count=1)
+            f.write(game + "\n\n")
+    return path
+
+def month_response(raw_games):
+    # Body of a chess.com monthly archive response holding the fixture games
+    games = []
+    for i, pgn in enumerate(raw_games):
+        link = LINK_NUMBER_RE.search(pgn)
+        games.append({
+            "url": link.group(0)[7:-2] if link else f"https://www.chess.com/game/live/{i}",
+            "pgn": pgn,
+            "rules": "chess",
+        })
+    return json.dumps({"games": games})
+
+
+class FixtureSession:
+    # Serves one canned archive response; ETag changes with every call so
+    # the cache always parses the body (no 304 short cut)
+    def __init__(self, body):
+        self.body = body.encode("utf-8")
+        self.calls = 0
+
+    def get(self, url, headers=None, timeout=None):
+        self.calls += 1
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.body
+        response.headers["ETag"] = f'"{self.calls}"'
+        response.url = url
+        return response
+
+
+class StubButton:
+    def __init__(self, driver):
+        self.driver = driver
+
+    def get_attribute(self, name):
+        return "true" if self.driver.clicks >= self.driver.moves else None
+
+    def click(self):
+        self.driver.clicks += 1
+
+
+class StubDriver:
+    # Just enough WebDriver for load_game and play_all_moves
+    def __init__(self, moves=0):
+        self.moves = moves
+        self.clicks = 0
+        self.title = "Chesskit"
+
+    def find_element(self, by, value):
+        return StubButton(self)
+
+    def find_elements(self, by, value):
+        return [StubButton(self)]
+
+    def set_script_timeout(self, seconds):
+        pass
+
+    def execute_async_script(self, script, *args):
+        return {"ok": True, "error": None, "failed_phase": None,
+                "phases": {"open": 0, "select": 0, "input": 0, "submit": 0}, "total": 0}
+
+    def execute_script(self, script, *args):
+        return None
+
+
+def run_benchmarks(repeat=5, synthetic_games=5000, work_dir=None):
+    import main
+    from archive_cache import ArchiveCache
+    from chess_rules import validate_pgn
+    from pgn_archive import PgnArchive
+    from pgn_format import format_pgn_to_standard
+    from playlist import CompactPlaylist
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    # Time the code, not log I/O
+    logging.disable(logging.INFO)
+    main.move_delay = 0
+    # StubDriver answers the one-shot loader script; the dialog flow needs a real page
+    main.scripted_game_loader = True
+
+    with PgnArchive(FIXTURE_PGN, persist_index=False) as archive:
+        raw_games = [archive.raw(idx) for idx in range(len(archive))]
+    pgns = [format_pgn_to_standard(raw) for raw in raw_games]
+    synthetic = write_synthetic_archive(raw_games, synthetic_games, os.path.join(work_dir, "synthetic.pgn"))
+    body = month_response(raw_games)
+    compact = CompactPlaylist(pgns)
+    results = {}
+
+    def record(name, seconds, ops, unit):
+        results[name] = {"per_op": seconds / ops, "ops": ops, "unit": unit, "total": seconds}
+        print(f"  {name:<28} {seconds / ops * 1e6:>12.1f} us/{unit}  ({ops} {unit}s, best of {repeat})")
+
+    print(f"[BENCH] Fixtures: {len(raw_games)} games from {os.path.basename(FIXTURE_PGN)}, "
+          f"{synthetic_games} synthetic")
+
+    # ---------- ingest ----------
+    record("format_pgn_to_standard",
+           best_of(lambda: [format_pgn_to_standard(raw) for raw in raw_games], repeat), len(raw_games), "game")
+
+    def index_and_format():
+        with PgnArchive(synthetic, transform=format_pgn_to_standard, persist_index=False) as games:
+            for _ in games:
+                pass
+    record("archive_index_and_format", best_of(index_and_format, repeat), synthetic_games, "game")
+
+    def parse_month():
+        cache_dir = tempfile.mkdtemp(dir=work_dir)
+        ArchiveCache(cache_dir, session=FixtureSession(body)).fetch_month("bench", "2026", "01")
+        shutil.rmtree(cache_dir)
+    record("fetch_pgns_parse", best_of(parse_month, repeat), len(raw_games), "game")
+
+    # Revalidated month with a changed ETag but no new games: only the delta is normalized
+    delta_dir = tempfile.mkdtemp(dir=work_dir)
+    delta_cache = ArchiveCache(delta_dir, session=FixtureSession(body))
+    delta_cache.fetch_month("bench", "2026", "01")
+    record("fetch_pgns_refresh_unchanged",
+           best_of(lambda: delta_cache.refresh_month("bench", "2026", "01"), repeat), len(raw_games), "game")
+
+    record("validate_pgn", best_of(lambda: [validate_pgn(pgn) for pgn in pgns], repeat), len(pgns), "game")
+
+    # ---------- playlist metadata ----------
+    def regex_players():
+        for pgn in pgns:
+            re.search(r'\[White "(.*?)"\]', pgn)
+            re.search(r'\[Black "(.*?)"\]', pgn)
+    record("metadata_regex", best_of(regex_players, repeat), len(pgns), "game")
+
+    def archive_headers():
+        with PgnArchive(synthetic, persist_index=False) as games:
+            for idx in range(len(games)):
+                games.headers(idx)
+    record("metadata_archive_headers", best_of(archive_headers, repeat), synthetic_games, "game")
+
+    record("metadata_compact_headers",
+           best_of(lambda: [compact.headers(idx) for idx in range(len(compact))], repeat), len(compact), "game")
+    record("compact_encode", best_of(lambda: CompactPlaylist(pgns), repeat), len(pgns), "game")
+    record("compact_decode", best_of(lambda: list(compact), repeat), len(compact), "game")
+
+    # ---------- orchestration (stubbed browser) ----------
+    def per_game():
+        driver = StubDriver()
+        for idx in range(len(compact)):
+            pgn = compact[idx]
+            re.search(r'\[White "(.*?)"\]', pgn)
+            re.search(r'\[Black "(.*?)"\]', pgn)
+            if validate_pgn(pgn, main.allow_chess960).ok:
+                main.load_game(driver, None, pgn)
+    record("orchestration_per_game", best_of(per_game, repeat), len(compact), "game")
+
+    moves = 2000
+    def per_move():
+        driver = StubDriver(moves)
+        main.play_all_moves(driver, WebDriverWait(driver, 1), "bench")
+    record("orchestration_per_move", best_of(per_move, repeat), moves, "move")
+
+    logging.disable(logging.NOTSET)
+    return results
+
+def compare(results, baseline, threshold):
+    # Names whose per-op time grew by more than `threshold` (0.25 = 25%)
+    regressions = []
+    print(f"[BENCH] Against baseline ({threshold:.0%} threshold):")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if not base:
+            print(f"  {name:<28} new")
+            continue
+        ratio = result["per_op"] / base["per_op"]
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"  {name:<28} {ratio:>6.2f}x  {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+def load_results(path):
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)["results"]
+
+def save_results(path, results, repeat, synthetic_games):
+    report = {
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": f"{platform.system()} {platform.machine()}, {os.cpu_count()} cpus",
+        "repeat": repeat,
+        "synthetic_games": synthetic_games,
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time the ingest and orchestration hot paths offline.")
+    parser.add_argument("--output", default="bench_results.json", help="where to write this run's results")
+    parser.add_argument("--baseline", default="bench_baseline.json", help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown per benchmark (0.25 = 25%%)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--synthetic-games", type=int, default=5000)
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="bench_")
+    try:
+        results = run_benchmarks(args.repeat, args.synthetic_games, work_dir)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+    save_results(args.output, results, args.repeat, args.synthetic_games)
+    print(f"[BENCH] Results written to {args.output}")
+
+    if args.save_baseline:
+        save_results(args.baseline, results, args.repeat, args.synthetic_games)
+        print(f"[BENCH] Baseline saved to {args.baseline}")
+    elif os.path.exists(args.baseline):
+        if compare(results, load_results(args.baseline), args.threshold):
+            sys.exit(1)
+    else:
+        print(f"[BENCH] No baseline at {args.baseline}; run with --save-baseline to create one.")
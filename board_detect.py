@@ -0,0 +1,140 @@
+import logging
+import subprocess
+from collections import namedtuple
+
+# ================= BOARD REGION DETECTION =================
+# Finds the board rectangle so ffmpeg can grab and crop exactly the board
+# instead of hand-tuned offsets. The page's own element geometry is tried
+# first; a captured frame is the fallback, where the 8x8 grid shows up as
+# nine evenly spaced edge lines in the row and column gradient profiles.
+
+# x, y, w, h in pixels of the capture source (screen for x11grab)
+BoardRegion = namedtuple("BoardRegion", "x y w h")
+
+# Union of the 64 squares if the board renders them as elements, else the
+# largest square-ish board container. Screen offsets come from the window
+# position plus the browser UI above/left of the viewport.
+BOARD_GEOMETRY_JS = """
+const ratio = window.devicePixelRatio || 1;
+const rectOf = (els) => {
+    let l = Infinity, t = Infinity, r = -Infinity, b = -Infinity;
+    for (const el of els) {
+        const rc = el.getBoundingClientRect();
+        if (!rc.width || !rc.height) continue;
+        l = Math.min(l, rc.left); t = Math.min(t, rc.top);
+        r = Math.max(r, rc.right); b = Math.max(b, rc.bottom);
+    }
+    return r > l ? {left: l, top: t, width: r - l, height: b - t} : null;
+};
+let rect = null;
+const squares = document.querySelectorAll('[data-square]');
+if (squares.length === 64) rect = rectOf(squares);
+if (!rect) {
+    let best = null;
+    for (const el of document.querySelectorAll('.cg-board, .chess-board, [class*="board"], [data-boardid]')) {
+        const rc = el.getBoundingClientRect();
+        if (rc.width < 200 || Math.abs(rc.width - rc.height) > rc.width * 0.05) continue;
+        if (!best || rc.width > best.width) best = {left: rc.left, top: rc.top, width: rc.width, height: rc.height};
+    }
+    rect = best;
+}
+if (!rect) return null;
+return {
+    x: rect.left * ratio, y: rect.top * ratio, w: rect.width * ratio, h: rect.height * ratio,
+    screen_x: (window.screenX + (window.outerWidth - window.innerWidth)) * ratio,
+    screen_y: (window.screenY + (window.outerHeight - window.innerHeight)) * ratio,
+};
+"""
+
+
+def _even(value):
+    # yuv420p needs even dimensions
+    return int(value) // 2 * 2
+
+def board_region_from_page(driver, screen=True):
+    try:
+        geo = driver.execute_script(BOARD_GEOMETRY_JS)
+    except Exception as e:
+        logging.warning(f"[DETECT] Board geometry script failed: {e}")
+        return None
+    if not geo:
+        return None
+    x, y = geo["x"], geo["y"]
+    if screen:
+        x += geo["screen_x"]
+        y += geo["screen_y"]
+    return BoardRegion(round(x), round(y), _even(geo["w"]), _even(geo["h"]))
+
+def grab_display_frame(display, width, height):
+    # One rgb24 frame of the X display as a (height, width, 3) array
+    import numpy as np
+    out = subprocess.run(
+        ['ffmpeg', '-loglevel', 'error', '-f', 'x11grab', '-video_size', f'{width}x{height}',
+         '-i', display, '-frames:v', '1', '-f', 'rawvideo', '-pix_fmt', 'rgb24', 'pipe:1'],
+        capture_output=True, timeout=15, check=True,
+    ).stdout
+    return np.frombuffer(out, dtype=np.uint8).reshape(height, width, 3)
+
+def _grid_lines(profile, min_square, tolerance=2):
+    # Longest-spaced run of nine near-equidistant peaks in an edge profile
+    import numpy as np
+    threshold = profile.mean() + 2 * profile.std()
+    inner = profile[1:-1]
+    peaks = np.flatnonzero((inner >= profile[:-2]) & (inner >= profile[2:]) & (inner > threshold)) + 1
+    if len(peaks) < 9:
+        return None
+    best = None
+    best_key = None
+    for i, start in enumerate(peaks):
+        for end in peaks[i + 1:]:
+            span = end - start
+            if span < 8 * min_square:
+                continue
+            expected = start + np.arange(9) * (span / 8.0)
+            nearest = np.abs(peaks[None, :] - expected[:, None]).min(axis=1)
+            if not (nearest <= tolerance).all():
+                continue
+            # Tightest fit wins; a UI edge one square away only fits loosely
+            key = (nearest.sum(), -span)
+            if best_key is None or key < best_key:
+                best, best_key = (int(start), int(end)), key
+    return best
+
+def board_region_from_image(frame, min_square=20):
+    # frame: (h, w, 3) uint8 array. Square boundaries are long straight edges
+    # across the whole board, so they dominate the summed gradient profiles.
+    import numpy as np
+    # A black 1px frame gives a board that touches the screen edge its outer line
+    gray = np.pad(frame.astype(np.int16).sum(axis=2), 1)
+    cols = np.zeros(gray.shape[1])
+    rows = np.zeros(gray.shape[0])
+    cols[1:] = np.abs(np.diff(gray, axis=1)).sum(axis=0)
+    rows[1:] = np.abs(np.diff(gray, axis=0)).sum(axis=1)
+    xs = _grid_lines(cols, min_square)
+    ys = _grid_lines(rows, min_square)
+    if not xs or not ys:
+        return None
+    x0, x1 = xs
+    y0, y1 = ys
+    return BoardRegion(x0 - 1, y0 - 1, _even(x1 - x0), _even(y1 - y0))
+
+def detect_board_region(driver=None, display=None, screen_size=(800, 800), screen=True):
+    region = board_region_from_page(driver, screen) if driver else None
+    source = "page"
+    if region is None and display and screen:
+        try:
+            region = board_region_from_image(grab_display_frame(display, *screen_size))
+            source = "image"
+        except ImportError:
+            logging.warning("[DETECT] numpy not installed; image fallback unavailable.")
+        except Exception as e:
+            logging.warning(f"[DETECT] Image fallback failed: {e}")
+    if region is None:
+        logging.warning("[DETECT] Board not found; using the configured crop.")
+        return None
+    # Keep the grab inside the screen
+    x = min(max(region.x, 0), screen_size[0] - 2)
+    y = min(max(region.y, 0), screen_size[1] - 2)
+    region = BoardRegion(x, y, min(region.w, _even(screen_size[0] - x)), min(region.h, _even(screen_size[1] - y)))
+    logging.info(f"[DETECT] Board at {region.w}x{region.h}+{region.x}+{region.y} (from {source})")
+    return region
@@ -0,0 +1,213 @@
+import logging
+import time
+
+from chess_rules import decode_move, replay_game
+from metrics import record_move
+
+# ================= NATIVE BOARD RENDERER =================
+# Draws board frames straight from positions as rgb24 bytes so ffmpeg can read
+# them from stdin (-f rawvideo), with no browser or X server involved.
+
+LIGHT_SQUARE = (240, 217, 181)
+DARK_SQUARE = (181, 136, 99)
+HIGHLIGHT = (205, 210, 106)
+HIGHLIGHT_ALPHA = 0.5
+PIECE_COLORS = {
+    # color: (fill, outline)
+    0: ((250, 250, 250), (25, 25, 25)),
+    1: ((35, 35, 35), (225, 225, 225)),
+}
+
+# Piece silhouettes in unit-square coordinates (y grows downwards)
+PIECE_SHAPES = {
+    0: [  # pawn
+        ("ellipse", 0.50, 0.32, 0.12, 0.12),
+        ("poly", [(0.40, 0.42), (0.60, 0.42), (0.66, 0.72), (0.34, 0.72)]),
+        ("rect", 0.26, 0.72, 0.74, 0.84),
+    ],
+    1: [  # knight
+        ("poly", [(0.30, 0.84), (0.74, 0.84), (0.72, 0.60), (0.66, 0.40), (0.58, 0.24), (0.48, 0.14),
+                  (0.44, 0.24), (0.36, 0.30), (0.22, 0.46), (0.26, 0.56), (0.36, 0.52), (0.46, 0.46),
+                  (0.40, 0.62)]),
+    ],
+    2: [  # bishop
+        ("ellipse", 0.50, 0.22, 0.06, 0.06),
+        ("ellipse", 0.50, 0.48, 0.15, 0.21),
+        ("rect", 0.36, 0.64, 0.64, 0.74),
+        ("rect", 0.26, 0.74, 0.74, 0.84),
+    ],
+    3: [  # rook
+        ("rect", 0.28, 0.16, 0.36, 0.26),
+        ("rect", 0.46, 0.16, 0.54, 0.26),
+        ("rect", 0.64, 0.16, 0.72, 0.26),
+        ("rect", 0.28, 0.26, 0.72, 0.36),
+        ("poly", [(0.33, 0.36), (0.67, 0.36), (0.70, 0.74), (0.30, 0.74)]),
+        ("rect", 0.24, 0.74, 0.76, 0.84),
+    ],
+    4: [  # queen
+        ("poly", [(0.26, 0.74), (0.20, 0.32), (0.36, 0.56), (0.42, 0.26), (0.50, 0.54),
+                  (0.58, 0.26), (0.64, 0.56), (0.80, 0.32), (0.74, 0.74)]),
+        ("ellipse", 0.20, 0.30, 0.05, 0.05),
+        ("ellipse", 0.42, 0.24, 0.05, 0.05),
+        ("ellipse", 0.58, 0.24, 0.05, 0.05),
+        ("ellipse", 0.80, 0.30, 0.05, 0.05),
+        ("rect", 0.24, 0.74, 0.76, 0.84),
+    ],
+    5: [  # king
+        ("rect", 0.46, 0.10, 0.54, 0.40),
+        ("rect", 0.38, 0.18, 0.62, 0.26),
+        ("poly", [(0.28, 0.74), (0.22, 0.46), (0.38, 0.38), (0.62, 0.38), (0.78, 0.46), (0.72, 0.74)]),
+        ("rect", 0.24, 0.74, 0.76, 0.84),
+    ],
+}
+
+SUPERSAMPLE = 3
+
+
+def _inside(shape, x, y):
+    kind = shape[0]
+    if kind == "rect":
+        _, x0, y0, x1, y1 = shape
+        return x0 <= x <= x1 and y0 <= y <= y1
+    if kind == "ellipse":
+        _, cx, cy, rx, ry = shape
+        return ((x - cx) / rx) ** 2 + ((y - cy) / ry) ** 2 <= 1.0
+    # Even-odd polygon test
+    points = shape[1]
+    inside = False
+    j = len(points) - 1
+    for i in range(len(points)):
+        xi, yi = points[i]
+        xj, yj = points[j]
+        if (yi > y) != (yj > y) and x < (xj - xi) * (y - yi) / (yj - yi) + xi:
+            inside = not inside
+        j = i
+    return inside
+
+def rasterize(shapes, size):
+    # Anti-aliased coverage mask (0.0 - 1.0 per pixel, row-major)
+    n = SUPERSAMPLE
+    coverage = []
+    for py in range(size):
+        for px in range(size):
+            hits = 0
+            for sy in range(n):
+                y = (py + (sy + 0.5) / n) / size
+                for sx in range(n):
+                    x = (px + (sx + 0.5) / n) / size
+                    if any(_inside(shape, x, y) for shape in shapes):
+                        hits += 1
+            coverage.append(hits / (n * n))
+    return coverage
+
+def dilate(mask, size, radius):
+    out = list(mask)
+    for py in range(size):
+        for px in range(size):
+            best = mask[py * size + px]
+            for dy in range(-radius, radius + 1):
+                yy = py + dy
+                if not 0 <= yy < size:
+                    continue
+                row = yy * size
+                for dx in range(-radius, radius + 1):
+                    xx = px + dx
+                    if 0 <= xx < size and mask[row + xx] > best:
+                        best = mask[row + xx]
+            out[py * size + px] = best
+    return out
+
+
+class BoardRenderer:
+    # Square tiles (background shade x piece) are composited once and cached;
+    # a frame is then just row copies into a preallocated bytearray.
+    def __init__(self, size=600, flipped=False):
+        self.square = size // 8
+        self.size = self.square * 8
+        self.flipped = flipped
+        self.frame = bytearray(self.size * self.size * 3)
+        self._sprites = {}
+        self._tiles = {}
+
+    def _sprite(self, ptype):
+        sprite = self._sprites.get(ptype)
+        if sprite is None:
+            fill = rasterize(PIECE_SHAPES[ptype], self.square)
+            outline = dilate(fill, self.square, max(1, self.square // 30))
+            sprite = self._sprites[ptype] = (fill, outline)
+        return sprite
+
+    def _tile(self, code, dark, highlighted):
+        key = (code, dark, highlighted)
+        tile = self._tiles.get(key)
+        if tile is not None:
+            return tile
+        bg = DARK_SQUARE if dark else LIGHT_SQUARE
+        if highlighted:
+            bg = tuple(round(c * (1 - HIGHLIGHT_ALPHA) + h * HIGHLIGHT_ALPHA) for c, h in zip(bg, HIGHLIGHT))
+        pixels = bytearray(bytes(bg) * (self.square * self.square))
+        if code >= 0:
+            fill_color, outline_color = PIECE_COLORS[code // 6]
+            fill, outline = self._sprite(code % 6)
+            for i, (a_out, a_fill) in enumerate(zip(outline, fill)):
+                if not a_out:
+                    continue
+                for c in range(3):
+                    v = bg[c] * (1 - a_out) + outline_color[c] * a_out
+                    pixels[i * 3 + c] = round(v * (1 - a_fill) + fill_color[c] * a_fill)
+        tile = self._tiles[key] = bytes(pixels)
+        return tile
+
+    def render(self, pos, last_move=None):
+        highlighted = ()
+        if last_move is not None:
+            frm, to, _ = decode_move(last_move)
+            highlighted = (frm, to)
+        sq = self.square
+        row_bytes = sq * 3
+        stride = self.size * 3
+        frame = self.frame
+        for sq_idx in range(64):
+            file, rank = sq_idx & 7, sq_idx >> 3
+            col, row = (7 - file, rank) if self.flipped else (file, 7 - rank)
+            tile = self._tile(pos.board[sq_idx], (file + rank) % 2 == 0, sq_idx in highlighted)
+            offset = row * sq * stride + col * row_bytes
+            for y in range(sq):
+                frame[offset:offset + row_bytes] = tile[y * row_bytes:(y + 1) * row_bytes]
+                offset += stride
+        return bytes(frame)
+
+
+class FramePacer:
+    # Writes frames to ffmpeg's stdin at a fixed rate against a monotonic
+    # clock; an unchanged board is repeated from the same bytes object.
+    def __init__(self, stream, fps):
+        self.stream = stream
+        self.interval = 1.0 / fps
+        self.fps = fps
+        self.next_frame = None
+
+    def hold(self, frame, seconds):
+        if self.next_frame is None:
+            self.next_frame = time.monotonic()
+        for _ in range(max(1, round(seconds * self.fps))):
+            delay = self.next_frame - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self.stream.write(frame)
+            self.next_frame += self.interval
+        self.stream.flush()
+
+
+def stream_game(pacer, renderer, pgn, move_delay, game_info="Unknown Game"):
+    _, pos, moves = replay_game(pgn)
+    pacer.hold(renderer.render(pos), move_delay)
+    for move_count, move in enumerate(moves, 1):
+        start = time.monotonic()
+        pos.push(move)
+        frame = renderer.render(pos, move)
+        record_move(time.monotonic() - start)
+        logging.info(f"[PLAY] [{game_info}] Playing move {move_count}...")
+        pacer.hold(frame, move_delay)
+    logging.info(f"[PLAY] End of game reached after {len(moves)} moves.")
+    return len(moves)
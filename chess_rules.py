@@ -0,0 +1,612 @@
+import re
+from collections import namedtuple
+
+from pgn_archive import HEADER_RE
+from pgn_format import format_pgn_to_standard
+
+# ================= CHESS RULES =================
+# Bitboard legal-move generator and SAN parser used to validate games before
+# they are sent to the browser. Squares are 0..63 with a1 = 0, h8 = 63.
+# Castling is stored as the set of rook squares that may still castle and a
+# castling move is encoded as "king takes own rook", so standard chess and
+# Chess960 share one code path.
+
+WHITE, BLACK = 0, 1
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = range(6)
+PIECE_SYMBOLS = "pnbrqk"
+FILE_NAMES = "abcdefgh"
+STARTING_FEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+BACK_RANKS = (0xFF, 0xFF << 56)
+FILES = [0x0101010101010101 << f for f in range(8)]
+RANKS = [0xFF << (8 * r) for r in range(8)]
+PROMOTIONS = (QUEEN, ROOK, BISHOP, KNIGHT)
+
+
+class IllegalMoveError(ValueError):
+    pass
+
+
+def square_name(sq):
+    return FILE_NAMES[sq & 7] + str((sq >> 3) + 1)
+
+def parse_square(name):
+    return FILE_NAMES.index(name[0]) + 8 * (int(name[1]) - 1)
+
+def iter_squares(bb):
+    while bb:
+        low = bb & -bb
+        yield low.bit_length() - 1
+        bb ^= low
+
+def encode_move(frm, to, promo=0):
+    return frm | (to << 6) | (promo << 12)
+
+def decode_move(move):
+    return move & 63, (move >> 6) & 63, move >> 12
+
+def _step_table(deltas):
+    table = []
+    for sq in range(64):
+        f, r = sq & 7, sq >> 3
+        bb = 0
+        for df, dr in deltas:
+            if 0 <= f + df < 8 and 0 <= r + dr < 8:
+                bb |= 1 << ((r + dr) * 8 + f + df)
+        table.append(bb)
+    return table
+
+def _ray_table(df, dr):
+    table = []
+    for sq in range(64):
+        f, r = (sq & 7) + df, (sq >> 3) + dr
+        bb = 0
+        while 0 <= f < 8 and 0 <= r < 8:
+            bb |= 1 << (r * 8 + f)
+            f, r = f + df, r + dr
+        table.append(bb)
+    return table
+
+KNIGHT_ATTACKS = _step_table([(1, 2), (2, 1), (2, -1), (1, -2), (-1, -2), (-2, -1), (-2, 1), (-1, 2)])
+KING_ATTACKS = _step_table([(1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0), (-1, -1), (0, -1), (1, -1)])
+PAWN_ATTACKS = (_step_table([(-1, 1), (1, 1)]), _step_table([(-1, -1), (1, -1)]))
+
+# The first four directions increase the square index, the last four decrease it
+RAYS = [_ray_table(df, dr) for df, dr in
+        [(0, 1), (1, 0), (1, 1), (-1, 1), (0, -1), (-1, 0), (-1, -1), (1, -1)]]
+ROOK_DIRS = (0, 1, 4, 5)
+BISHOP_DIRS = (2, 3, 6, 7)
+
+def _slide(sq, occ, dirs):
+    attacks = 0
+    for d in dirs:
+        ray = RAYS[d][sq]
+        blockers = ray & occ
+        if blockers:
+            first = (blockers & -blockers).bit_length() - 1 if d < 4 else blockers.bit_length() - 1
+            ray ^= RAYS[d][first]
+        attacks |= ray
+    return attacks
+
+def _span(a, b):
+    # Inclusive run of squares between a and b on the same rank
+    lo, hi = min(a, b), max(a, b)
+    return ((1 << (hi + 1)) - 1) ^ ((1 << lo) - 1)
+
+
+class Position:
+    __slots__ = ("board", "bb", "occ", "turn", "castling", "ep", "halfmove", "fullmove")
+
+    def __init__(self):
+        self.board = [-1] * 64        # piece code color * 6 + type, -1 if empty
+        self.bb = [0] * 12
+        self.occ = [0, 0]
+        self.turn = WHITE
+        self.castling = 0             # bitmask of rook squares that may castle
+        self.ep = None
+        self.halfmove = 0
+        self.fullmove = 1
+
+    # ---------- FEN ----------
+    @classmethod
+    def from_fen(cls, fen=STARTING_FEN):
+        fields = fen.split()
+        if len(fields) < 4:
+            raise ValueError(f"bad FEN: {fen!r}")
+        pos = cls()
+        rows = fields[0].split("/")
+        if len(rows) != 8:
+            raise ValueError(f"bad FEN board: {fields[0]!r}")
+        for r, row in enumerate(rows):
+            f = 0
+            for ch in row:
+                if ch.isdigit():
+                    f += int(ch)
+                    continue
+                ptype = PIECE_SYMBOLS.find(ch.lower())
+                if ptype < 0 or f > 7:
+                    raise ValueError(f"bad FEN board: {fields[0]!r}")
+                pos._put((7 - r) * 8 + f, (WHITE if ch.isupper() else BLACK) * 6 + ptype)
+                f += 1
+            if f != 8:
+                raise ValueError(f"bad FEN board: {fields[0]!r}")
+        if pos.bb[KING].bit_count() != 1 or pos.bb[6 + KING].bit_count() != 1:
+            raise ValueError("FEN needs exactly one king per side")
+        pos.turn = WHITE if fields[1] == "w" else BLACK
+        pos._parse_castling(fields[2])
+        pos.ep = parse_square(fields[3]) if fields[3] != "-" else None
+        if len(fields) >= 6:
+            pos.halfmove, pos.fullmove = int(fields[4]), int(fields[5])
+        return pos
+
+    def _parse_castling(self, field):
+        for ch in field:
+            if ch == "-":
+                continue
+            color = WHITE if ch.isupper() else BLACK
+            king = self.king_square(color)
+            rooks = self.bb[color * 6 + ROOK] & BACK_RANKS[color]
+            if not king >> 3 == (0 if color == WHITE else 7):
+                continue
+            upper = ch.upper()
+            if upper == "K":
+                rooks &= ~((2 << king) - 1)
+                rook = rooks.bit_length() - 1 if rooks else None
+            elif upper == "Q":
+                rooks &= (1 << king) - 1
+                rook = (rooks & -rooks).bit_length() - 1 if rooks else None
+            elif upper in "ABCDEFGH":
+                rooks &= FILES[FILE_NAMES.index(upper.lower())]
+                rook = rooks.bit_length() - 1 if rooks else None
+            else:
+                raise ValueError(f"bad FEN castling field: {field!r}")
+            if rook is not None:
+                self.castling |= 1 << rook
+
+    def _castling_field(self):
+        # X-FEN: K/Q for the outermost rook on a side, the rook's file otherwise
+        out = ""
+        for color in (WHITE, BLACK):
+            king = self.king_square(color)
+            rooks = self.bb[color * 6 + ROOK] & BACK_RANKS[color]
+            rights = self.castling & rooks
+            for rook in sorted(iter_squares(rights), reverse=True):
+                if rook > king:
+                    outer = rooks.bit_length() - 1
+                    ch = "K" if rook == outer else FILE_NAMES[rook & 7].upper()
+                else:
+                    outer = (rooks & -rooks).bit_length() - 1
+                    ch = "Q" if rook == outer else FILE_NAMES[rook & 7].upper()
+                out += ch if color == WHITE else ch.lower()
+        return out or "-"
+
+    def fen(self):
+        rows = []
+        for r in range(7, -1, -1):
+            row, empty = "", 0
+            for f in range(8):
+                code = self.board[r * 8 + f]
+                if code < 0:
+                    empty += 1
+                    continue
+                if empty:
+                    row += str(empty)
+                    empty = 0
+                ch = PIECE_SYMBOLS[code % 6]
+                row += ch.upper() if code < 6 else ch
+            rows.append(row + (str(empty) if empty else ""))
+        ep = square_name(self.ep) if self.ep is not None else "-"
+        return (f"{'/'.join(rows)} {'w' if self.turn == WHITE else 'b'} "
+                f"{self._castling_field()} {ep} {self.halfmove} {self.fullmove}")
+
+    # ---------- board helpers ----------
+    def _put(self, sq, code):
+        self.board[sq] = code
+        self.bb[code] |= 1 << sq
+        self.occ[code // 6] |= 1 << sq
+
+    def _remove(self, sq):
+        code = self.board[sq]
+        self.board[sq] = -1
+        self.bb[code] &= ~(1 << sq)
+        self.occ[code // 6] &= ~(1 << sq)
+        return code
+
+    def copy(self):
+        pos = Position.__new__(Position)
+        pos.board = self.board[:]
+        pos.bb = self.bb[:]
+        pos.occ = self.occ[:]
+        pos.turn, pos.castling, pos.ep = self.turn, self.castling, self.ep
+        pos.halfmove, pos.fullmove = self.halfmove, self.fullmove
+        return pos
+
+    def king_square(self, color):
+        return self.bb[color * 6 + KING].bit_length() - 1
+
+    def attacked(self, sq, by, occ=None, mask=-1):
+        bb = self.bb
+        base = by * 6
+        if occ is None:
+            occ = self.occ[0] | self.occ[1]
+        if KNIGHT_ATTACKS[sq] & bb[base + KNIGHT] & mask:
+            return True
+        if PAWN_ATTACKS[by ^ 1][sq] & bb[base + PAWN] & mask:
+            return True
+        if KING_ATTACKS[sq] & bb[base + KING] & mask:
+            return True
+        queens = bb[base + QUEEN]
+        if _slide(sq, occ, BISHOP_DIRS) & (bb[base + BISHOP] | queens) & mask:
+            return True
+        if _slide(sq, occ, ROOK_DIRS) & (bb[base + ROOK] | queens) & mask:
+            return True
+        return False
+
+    def is_check(self):
+        return self.attacked(self.king_square(self.turn), self.turn ^ 1)
+
+    def is_castling(self, move):
+        frm, to, _ = decode_move(move)
+        return self.board[frm] == self.turn * 6 + KING and self.board[to] == self.turn * 6 + ROOK
+
+    # ---------- move generation ----------
+    def _is_legal(self, frm, to):
+        us = self.turn
+        from_bit, to_bit = 1 << frm, 1 << to
+        occ = ((self.occ[0] | self.occ[1]) & ~from_bit) | to_bit
+        mask = ~to_bit
+        code = self.board[frm]
+        if code == us * 6 + PAWN and to == self.ep:
+            captured = to - 8 if us == WHITE else to + 8
+            occ &= ~(1 << captured)
+            mask &= ~(1 << captured)
+        king = to if code == us * 6 + KING else self.king_square(us)
+        return not self.attacked(king, us ^ 1, occ, mask)
+
+    def _pinned(self):
+        # Own pieces that are the only blocker between our king and an enemy slider
+        us = self.turn
+        king = self.king_square(us)
+        occ = self.occ[0] | self.occ[1]
+        them = (us ^ 1) * 6
+        queens = self.bb[them + QUEEN]
+        pinned = 0
+        for d in range(8):
+            blockers = RAYS[d][king] & occ
+            if not blockers:
+                continue
+            first = (blockers & -blockers).bit_length() - 1 if d < 4 else blockers.bit_length() - 1
+            if not self.occ[us] >> first & 1:
+                continue
+            beyond = RAYS[d][first] & occ
+            if not beyond:
+                continue
+            second = (beyond & -beyond).bit_length() - 1 if d < 4 else beyond.bit_length() - 1
+            sliders = self.bb[them + (ROOK if d in ROOK_DIRS else BISHOP)] | queens
+            if sliders >> second & 1:
+                pinned |= 1 << first
+        return pinned
+
+    def _castling_moves(self):
+        us = self.turn
+        king = self.king_square(us)
+        occ = self.occ[0] | self.occ[1]
+        back = 0 if us == WHITE else 56
+        moves = []
+        for rook in iter_squares(self.castling & self.bb[us * 6 + ROOK] & BACK_RANKS[us]):
+            if king >> 3 != back >> 3:
+                break
+            kingside = rook > king
+            king_to = back + (6 if kingside else 2)
+            rook_to = back + (5 if kingside else 3)
+            king_bit, rook_bit = 1 << king, 1 << rook
+            if (occ ^ king_bit ^ rook_bit) & (_span(king, king_to) | _span(rook, rook_to)):
+                continue
+            path = (_span(king, king_to) & ~(1 << king_to)) | king_bit
+            if any(self.attacked(sq, us ^ 1, occ ^ king_bit) for sq in iter_squares(path)):
+                continue
+            if self.attacked(king_to, us ^ 1, (occ ^ king_bit ^ rook_bit) | (1 << rook_to)):
+                continue
+            moves.append(encode_move(king, rook))
+        return moves
+
+    def _pawn_targets(self, frm):
+        us = self.turn
+        occ = self.occ[0] | self.occ[1]
+        up = 8 if us == WHITE else -8
+        targets = PAWN_ATTACKS[us][frm] & self.occ[us ^ 1]
+        if self.ep is not None:
+            targets |= PAWN_ATTACKS[us][frm] & (1 << self.ep)
+        to = frm + up
+        if not occ >> to & 1:
+            targets |= 1 << to
+            if frm >> 3 == (1 if us == WHITE else 6) and not occ >> (to + up) & 1:
+                targets |= 1 << (to + up)
+        return targets
+
+    def _targets(self, frm, ptype, occ):
+        if ptype == KNIGHT:
+            return KNIGHT_ATTACKS[frm]
+        if ptype == BISHOP:
+            return _slide(frm, occ, BISHOP_DIRS)
+        if ptype == ROOK:
+            return _slide(frm, occ, ROOK_DIRS)
+        if ptype == QUEEN:
+            return _slide(frm, occ, BISHOP_DIRS) | _slide(frm, occ, ROOK_DIRS)
+        return KING_ATTACKS[frm]
+
+    def _generation_state(self):
+        us = self.turn
+        own = self.occ[us]
+        # Out of check, a piece that is not pinned can make any of its moves;
+        # only king moves, pinned pieces and en passant need the full test
+        unchecked = 0 if self.is_check() else own & ~self._pinned() & ~self.bb[us * 6 + KING]
+        return own, own | self.occ[us ^ 1], unchecked
+
+    def _legal_targets(self, frm, ptype, safe, occ, own):
+        if ptype == PAWN:
+            targets = self._pawn_targets(frm)
+        else:
+            targets = self._targets(frm, ptype, occ) & ~own
+        if safe:
+            if ptype == PAWN and self.ep is not None and targets >> self.ep & 1 and not self._is_legal(frm, self.ep):
+                targets ^= 1 << self.ep
+            return targets
+        legal = 0
+        for to in iter_squares(targets):
+            if self._is_legal(frm, to):
+                legal |= 1 << to
+        return legal
+
+    def _origin_moves(self, frm, state):
+        # (legal target bitboard, moves per target, castling moves) for one piece
+        own, occ, unchecked = state
+        us = self.turn
+        ptype = self.board[frm] - us * 6
+        targets = self._legal_targets(frm, ptype, unchecked >> frm & 1, occ, own)
+        per_target = 4 if ptype == PAWN and frm >> 3 == (6 if us == WHITE else 1) else 1
+        castles = self._castling_moves() if ptype == KING else ()
+        return targets, per_target, castles
+
+    def legal_moves(self):
+        # Deterministic order (origin square, then target square, then
+        # promotion piece Q/R/B/N, castling after the king's other moves):
+        # compact move encoding relies on it.
+        state = self._generation_state()
+        moves = []
+        for frm in iter_squares(state[0]):
+            targets, per_target, castles = self._origin_moves(frm, state)
+            for to in iter_squares(targets):
+                if per_target == 4:
+                    moves.extend(encode_move(frm, to, promo) for promo in PROMOTIONS)
+                else:
+                    moves.append(encode_move(frm, to))
+            moves.extend(castles)
+        return moves
+
+    def move_index(self, move):
+        # legal_moves().index(move), counting whole pieces instead of listing moves
+        frm, to, promo = decode_move(move)
+        state = self._generation_state()
+        index = 0
+        for sq in iter_squares(state[0] & ((1 << frm) - 1)):
+            targets, per_target, castles = self._origin_moves(sq, state)
+            index += targets.bit_count() * per_target + len(castles)
+        targets, per_target, castles = self._origin_moves(frm, state)
+        if move in castles:
+            return index + targets.bit_count() + castles.index(move)
+        if not targets >> to & 1 or bool(promo) != (per_target == 4):
+            raise IllegalMoveError(f"illegal move {move}")
+        index += (targets & ((1 << to) - 1)).bit_count() * per_target
+        return index + (PROMOTIONS.index(promo) if promo else 0)
+
+    def move_at(self, index):
+        # legal_moves()[index] without listing the moves of earlier pieces
+        state = self._generation_state()
+        for frm in iter_squares(state[0]):
+            targets, per_target, castles = self._origin_moves(frm, state)
+            count = targets.bit_count() * per_target
+            if index < count:
+                to = list(iter_squares(targets))[index // per_target]
+                return encode_move(frm, to, PROMOTIONS[index % 4] if per_target == 4 else 0)
+            index -= count
+            if index < len(castles):
+                return castles[index]
+            index -= len(castles)
+        raise IllegalMoveError("move index out of range")
+
+    # ---------- making moves ----------
+    def push(self, move):
+        frm, to, promo = decode_move(move)
+        us = self.turn
+        code = self.board[frm]
+        ptype = code - us * 6
+        self.halfmove += 1
+        ep = None
+        if ptype == KING and self.board[to] == us * 6 + ROOK:
+            back = frm & 56
+            kingside = to > frm
+            self._remove(frm)
+            self._remove(to)
+            self._put(back + (6 if kingside else 2), code)
+            self._put(back + (5 if kingside else 3), us * 6 + ROOK)
+            self.castling &= ~BACK_RANKS[us]
+        else:
+            if self.board[to] >= 0:
+                self._remove(to)
+                self.halfmove = 0
+            elif ptype == PAWN and to == self.ep:
+                self._remove(to - 8 if us == WHITE else to + 8)
+            self._remove(frm)
+            self._put(to, us * 6 + (promo or ptype))
+            if ptype == PAWN:
+                self.halfmove = 0
+                if abs(to - frm) == 16:
+                    ep = (frm + to) // 2
+            elif ptype == KING:
+                self.castling &= ~BACK_RANKS[us]
+            self.castling &= ~((1 << frm) | (1 << to))
+        self.ep = ep
+        if us == BLACK:
+            self.fullmove += 1
+        self.turn = us ^ 1
+
+    # ---------- SAN ----------
+    def parse_san(self, san):
+        token = san.rstrip("+#!?")
+        if token in ("O-O", "0-0", "O-O-O", "0-0-0"):
+            kingside = len(token) == 3
+            for move in self._castling_moves():
+                frm, to, _ = decode_move(move)
+                if (to > frm) == kingside:
+                    return move
+            raise IllegalMoveError(f"illegal castling {san!r}")
+
+        m = SAN_RE.match(token)
+        if not m:
+            raise IllegalMoveError(f"unparseable move {san!r}")
+        piece, from_file, from_rank, dest, promo = m.groups()
+        to = parse_square(dest)
+        us = self.turn
+        own = self.occ[us]
+        occ = own | self.occ[us ^ 1]
+        if own >> to & 1:
+            raise IllegalMoveError(f"illegal move {san!r}")
+
+        if piece:
+            ptype = PIECE_SYMBOLS.index(piece.lower())
+            origins = self._targets(to, ptype, occ) & self.bb[us * 6 + ptype]
+        else:
+            ptype = PAWN
+            pawns = self.bb[us * 6 + PAWN]
+            if from_file:
+                capturable = self.occ[us ^ 1] | (1 << self.ep if self.ep is not None else 0)
+                origins = PAWN_ATTACKS[us ^ 1][to] & pawns if capturable >> to & 1 else 0
+            else:
+                origins = 0
+                down = -8 if us == WHITE else 8
+                if not occ >> to & 1 and 0 <= to + down < 64:
+                    if pawns >> (to + down) & 1:
+                        origins = 1 << (to + down)
+                    elif (to >> 3 == (3 if us == WHITE else 4) and not occ >> (to + down) & 1
+                            and pawns >> (to + 2 * down) & 1):
+                        origins = 1 << (to + 2 * down)
+            last_rank = 7 if us == WHITE else 0
+            if (to >> 3 == last_rank) != bool(promo):
+                raise IllegalMoveError(f"bad promotion in {san!r}")
+        if from_file:
+            origins &= FILES[FILE_NAMES.index(from_file)]
+        if from_rank:
+            origins &= RANKS[int(from_rank) - 1]
+
+        legal = [frm for frm in iter_squares(origins) if self._is_legal(frm, to)]
+        if len(legal) != 1:
+            raise IllegalMoveError(f"{'ambiguous' if legal else 'illegal'} move {san!r}")
+        promo_type = PIECE_SYMBOLS.index(promo.lower()) if promo else 0
+        return encode_move(legal[0], to, promo_type)
+
+    def san(self, move):
+        frm, to, promo = decode_move(move)
+        us = self.turn
+        ptype = self.board[frm] - us * 6
+        if self.is_castling(move):
+            text = "O-O" if to > frm else "O-O-O"
+        else:
+            capture = self.board[to] >= 0 or (ptype == PAWN and to == self.ep)
+            if ptype == PAWN:
+                text = (FILE_NAMES[frm & 7] + "x" if capture else "") + square_name(to)
+                if promo:
+                    text += "=" + PIECE_SYMBOLS[promo].upper()
+            else:
+                occ = self.occ[0] | self.occ[1]
+                rivals = self._targets(to, ptype, occ) & self.bb[us * 6 + ptype] & ~(1 << frm)
+                rivals = [sq for sq in iter_squares(rivals) if self._is_legal(sq, to)]
+                text = PIECE_SYMBOLS[ptype].upper()
+                if rivals:
+                    if all(sq & 7 != frm & 7 for sq in rivals):
+                        text += FILE_NAMES[frm & 7]
+                    elif all(sq >> 3 != frm >> 3 for sq in rivals):
+                        text += str((frm >> 3) + 1)
+                    else:
+                        text += square_name(frm)
+                text += ("x" if capture else "") + square_name(to)
+        after = self.copy()
+        after.push(move)
+        if after.is_check():
+            text += "#" if not after.legal_moves() else "+"
+        return text
+
+
+SAN_RE = re.compile(r"^([NBKRQ])?([a-h])?([1-8])?x?([a-h][1-8])(?:=?([NBRQnbrq]))?$")
+
+# ================= PGN VALIDATION =================
+GameCheck = namedtuple("GameCheck", "ok error variant plies final_fen result")
+
+RESULTS = ("1-0", "0-1", "1/2-1/2", "*")
+STANDARD_VARIANTS = ("", "standard", "chess")
+CHESS960_VARIANTS = ("chess960", "chess 960", "fischerandom", "fischer random")
+# "12.", "12..." or a bare "12"; never the leading 0 of "0-0" castling
+MOVE_NUMBER_RE = re.compile(r"^\d+(?:\.+|$)")
+VARIATION_RE = re.compile(r"\([^()]*\)")
+
+
+def split_pgn(pgn):
+    text = format_pgn_to_standard(pgn)
+    header_block, _, move_text = text.partition("\n\n")
+    return dict(HEADER_RE.findall(header_block)), move_text
+
+def iter_san_tokens(move_text):
+    # Drop (nested) variations, then move numbers; what is left are SAN moves
+    # and the result token
+    while "(" in move_text:
+        stripped = VARIATION_RE.sub(" ", move_text)
+        if stripped == move_text:
+            break
+        move_text = stripped
+    for token in move_text.split():
+        if token not in RESULTS:
+            token = MOVE_NUMBER_RE.sub("", token)
+        if token:
+            yield token
+
+def replay_game(pgn):
+    # Headers, starting position and the game's moves; raises on any bad move
+    headers, move_text = split_pgn(pgn)
+    start = Position.from_fen(headers.get("FEN", STARTING_FEN))
+    pos = start.copy()
+    moves = []
+    for token in iter_san_tokens(move_text):
+        if token in RESULTS:
+            break
+        move = pos.parse_san(token)
+        pos.push(move)
+        moves.append(move)
+    return headers, start, moves
+
+def validate_pgn(pgn, allow_chess960=True):
+    headers, move_text = split_pgn(pgn)
+    variant = headers.get("Variant", "")
+    result = headers.get("Result", "*")
+    if variant.lower() in CHESS960_VARIANTS:
+        if not allow_chess960:
+            return GameCheck(False, f"variant {variant} disabled", variant, 0, None, result)
+    elif variant.lower() not in STANDARD_VARIANTS:
+        return GameCheck(False, f"unsupported variant {variant}", variant, 0, None, result)
+
+    try:
+        pos = Position.from_fen(headers.get("FEN", STARTING_FEN))
+    except ValueError as e:
+        return GameCheck(False, str(e), variant, 0, None, result)
+
+    plies = 0
+    for token in iter_san_tokens(move_text):
+        if token in RESULTS:
+            if token != result:
+                return GameCheck(False, f"result {token} does not match header {result}", variant, plies, pos.fen(), result)
+            break
+        try:
+            pos.push(pos.parse_san(token))
+        except IllegalMoveError as e:
+            return GameCheck(False, f"ply {plies + 1}: {e}", variant, plies, pos.fen(), result)
+        plies += 1
+    return GameCheck(True, None, variant, plies, pos.fen(), result)
@@ -0,0 +1,144 @@
+import collections
+import logging
+import threading
+import time
+
+# ================= FFMPEG TELEMETRY =================
+# ffmpeg runs with `-progress pipe:2 -nostats`, so stderr carries blocks of
+# key=value lines ending in `progress=continue|end` mixed with its normal log.
+# A reader thread parses the blocks; a watchdog flags an output clock that
+# stops advancing and an encode that falls behind real time.
+
+PROGRESS_ARGS = ['-progress', 'pipe:2', '-nostats']
+
+PROGRESS_KEYS = {
+    "frame", "fps", "bitrate", "total_size", "out_time_us", "out_time_ms", "out_time",
+    "dup_frames", "drop_frames", "speed", "progress",
+}
+
+
+def parse_progress_value(key, value):
+    value = value.strip()
+    if value in ("N/A", ""):
+        return None
+    try:
+        if key in ("frame", "total_size", "out_time_us", "out_time_ms", "dup_frames", "drop_frames"):
+            return int(value)
+        if key == "fps":
+            return float(value)
+        if key == "bitrate":
+            # "512.3kbits/s"
+            return float(value.replace("kbits/s", ""))
+        if key == "speed":
+            return float(value.rstrip("x"))
+    except ValueError:
+        return None
+    return value
+
+
+class FfmpegTelemetry:
+    def __init__(self, proc, stall_seconds=15, min_speed=0.95, speed_window=30):
+        self.proc = proc
+        self.stall_seconds = stall_seconds
+        self.min_speed = min_speed
+        self.speed_window = speed_window
+        self.latest = {}
+        self.updated_at = None
+        self.stalled = False
+        self.slow = False
+        self.stall_count = 0
+        self.slow_count = 0
+        self._lock = threading.Lock()
+        self._block = {}
+        self._out_time_us = None
+        self._advanced_at = time.monotonic()
+        # (monotonic time, out_time_us) pairs for the windowed speed
+        self._history = collections.deque()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def start(self):
+        for target, name in ((self._read, "ffmpeg-progress"), (self._watch, "ffmpeg-watchdog")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def snapshot(self):
+        with self._lock:
+            snap = dict(self.latest)
+            snap["window_speed"] = self._window_speed()
+            snap["stalled"] = self.stalled
+            snap["slow"] = self.slow
+            snap["stall_count"] = self.stall_count
+            snap["slow_count"] = self.slow_count
+            return snap
+
+    def _read(self):
+        for raw in iter(self.proc.stderr.readline, b""):
+            line = raw.decode("utf-8", "replace").rstrip()
+            key, sep, value = line.partition("=")
+            if not sep or key not in PROGRESS_KEYS:
+                if line:
+                    logging.info(f"[FFMPEG] {line}")
+                continue
+            self._block[key] = parse_progress_value(key, value)
+            if key == "progress":
+                self._commit(self._block)
+                self._block = {}
+        logging.info(f"[FFMPEG] Progress feed closed (exit code {self.proc.poll()})")
+
+    def _commit(self, block):
+        now = time.monotonic()
+        with self._lock:
+            self.latest = block
+            self.updated_at = now
+            out_time = block.get("out_time_us")
+            if out_time is not None and (self._out_time_us is None or out_time > self._out_time_us):
+                self._out_time_us = out_time
+                self._advanced_at = now
+                self._history.append((now, out_time))
+            while self._history and now - self._history[0][0] > self.speed_window:
+                self._history.popleft()
+
+    def _window_speed(self):
+        # Speed over the recent window; ffmpeg's own figure averages since start
+        if len(self._history) < 2:
+            return None
+        (t0, out0), (t1, out1) = self._history[0], self._history[-1]
+        if t1 - t0 < self.speed_window / 2:
+            return None
+        return (out1 - out0) / 1e6 / (t1 - t0)
+
+    def _watch(self):
+        while not self._stop.wait(1.0):
+            if self.proc.poll() is not None:
+                return
+            with self._lock:
+                idle = time.monotonic() - self._advanced_at
+                speed = self._window_speed()
+                stalled = idle >= self.stall_seconds
+                slow = speed is not None and speed < self.min_speed
+                if stalled and not self.stalled:
+                    self.stall_count += 1
+                    logging.warning(f"[FFMPEG] Stall: output time has not advanced for {idle:.0f}s")
+                elif self.stalled and not stalled:
+                    logging.info("[FFMPEG] Output time advancing again.")
+                if slow and not self.slow:
+                    self.slow_count += 1
+                    logging.warning(f"[FFMPEG] Encode behind real time: {speed:.2f}x over {self.speed_window}s "
+                                    f"(fps {self.latest.get('fps')}, drop {self.latest.get('drop_frames')}, "
+                                    f"dup {self.latest.get('dup_frames')})")
+                elif self.slow and not slow:
+                    logging.info(f"[FFMPEG] Encode back at {speed:.2f}x.")
+                self.stalled, self.slow = stalled, slow
+
+    def summary(self):
+        snap = self.snapshot()
+        speed = snap["window_speed"]
+        return (f"fps {snap.get('fps')} | speed {snap.get('speed')}x"
+                f" (window {'n/a' if speed is None else f'{speed:.2f}x'}) | bitrate {snap.get('bitrate')}kbit/s"
+                f" | drop {snap.get('drop_frames')} dup {snap.get('dup_frames')} | out {snap.get('out_time')}")
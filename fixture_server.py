@@ -0,0 +1,390 @@
+import argparse
+import email.utils
+import hashlib
+import http.server
+import json
+import logging
+import random
+import re
+import socketserver
+import threading
+import time
+import urllib.parse
+from collections import defaultdict
+
+from pgn_archive import HEADER_RE, PgnArchive
+
+# ================= FIXTURE SERVER =================
+# Local stand-in for the third-party sites the Selenium path talks to, so
+# load and move latency can be measured reproducibly offline:
+#   /                        chesskit-style page: "Load game" dialog (MUI-like
+#                            select, PGN textarea, "Add"), the Next Move button
+#                            markup and a 64-square board
+#   /pub/player/<u>/games/... chess.com published-data API (archives list and
+#                            monthly archives, with ETag / Last-Modified / 304)
+# Latency and failures are injected from a fault profile: set when the server
+# starts, changed at runtime with POST /__faults, or per page via the query
+# string (e.g. /?page_submit_ms=800).
+
+DEFAULT_FAULTS = {
+    "latency": 0.0,                   # seconds added to every HTTP response
+    "api_failure_rate": 0.0,          # share of API requests answered 503
+    "api_rate_limit_rate": 0.0,       # share of API requests answered 429
+    "retry_after": 1,                 # Retry-After seconds on a 429
+    "page_open_ms": 0,                # "Load game" click -> dialog rendered
+    "page_select_ms": 0,              # select mousedown -> menu rendered
+    "page_validate_ms": 0,            # textarea input -> "Add" enabled
+    "page_submit_ms": 0,              # "Add" click -> dialog closed
+    "page_move_ms": 0,                # Next Move click -> board updated
+    "page_load_failure_rate": 0.0,    # share of loads rejected as invalid
+    "page_drop_first_input": False,   # controlled textarea ignores the first value
+}
+
+API_GAMES_RE = re.compile(r"^/pub/player/([^/]+)/games/(?:(archives)|(\d{4})/(\d{2}))/?$")
+
+PAGE_HTML = r"""<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>Chesskit (fixture)</title>
+<style>
+body { margin: 0; font-family: sans-serif; background: #222; color: #eee; }
+header.MuiAppBar-root { height: 60px; background: #333; display: flex; align-items: center; padding: 0 16px; }
+main { display: flex; gap: 16px; padding: 16px; }
+.chess-board { display: grid; grid-template-columns: repeat(8, 70px); grid-template-rows: repeat(8, 70px); }
+.chess-board div { display: flex; align-items: center; justify-content: center; font-size: 12px; }
+.light { background: #eed; color: #333; }
+.dark { background: #795; color: #eee; }
+.side { display: flex; flex-direction: column; gap: 8px; width: 180px; }
+[role=dialog] { position: fixed; inset: 0; background: rgba(0,0,0,.5); display: flex; align-items: center; justify-content: center; }
+.MuiDialog-paper { background: #fff; color: #222; padding: 16px; width: 420px; position: relative; }
+#dialog-select { border: 1px solid #888; padding: 6px; cursor: pointer; margin-bottom: 8px; }
+[role=listbox] { list-style: none; margin: 0; padding: 0; position: absolute; background: #fff; border: 1px solid #888; width: 200px; }
+[role=listbox] li { padding: 6px; cursor: pointer; }
+textarea { width: 100%; height: 120px; }
+.shadow { visibility: hidden; position: absolute; height: 0; overflow: hidden; }
+.dialog-error { color: #c00; }
+</style>
+</head>
+<body>
+<header class="MuiAppBar-root">Chesskit</header>
+<main>
+  <div class="chess-board" id="board"></div>
+  <div class="side">
+    <button id="load-game" class="MuiButton-root MuiButton-contained">Load game</button>
+    <div id="status">No game loaded</div>
+    <div id="controls"></div>
+    <div id="game-end"></div>
+  </div>
+</main>
+<script>
+const F = window.__faults = Object.assign(__FAULTS__, Object.fromEntries(
+    [...new URLSearchParams(location.search)].map(([k, v]) => [k, /^true$/i.test(v) ? true : /^false$/i.test(v) ? false : Number(v)])));
+const later = (ms, fn) => setTimeout(fn, ms || 0);
+const el = (html) => { const t = document.createElement('template'); t.innerHTML = html.trim(); return t.content.firstChild; };
+const game = {moves: [], ply: 0};
+
+const board = document.getElementById('board');
+for (let rank = 7; rank >= 0; rank--) {
+    for (let file = 0; file < 8; file++) {
+        const name = 'abcdefgh'[file] + (rank + 1);
+        const sq = el(`<div data-square="${name}" class="${(rank + file) % 2 ? 'light' : 'dark'}"></div>`);
+        board.appendChild(sq);
+    }
+}
+
+function sanMoves(pgn) {
+    // Movetext tokens without headers, comments, variations, numbers and result
+    const text = pgn.replace(/\[[^\]]*\]/g, ' ').replace(/\{[^}]*\}/g, ' ').replace(/\([^()]*\)/g, ' ');
+    return text.split(/\s+/).map(t => t.replace(/^\d+\.+/, '')).filter(t => t && !/^(1-0|0-1|1\/2-1\/2|\*)$/.test(t));
+}
+
+function render() {
+    const status = document.getElementById('status');
+    status.textContent = game.moves.length
+        ? `Move ${game.ply} / ${game.moves.length}` + (game.ply ? ` (${game.moves[game.ply - 1]})` : '')
+        : 'No game loaded';
+    const next = document.getElementById('next-move');
+    if (next) {
+        if (game.ply >= game.moves.length) next.setAttribute('disabled', '');
+        else next.removeAttribute('disabled');
+    }
+    const end = document.getElementById('game-end');
+    end.innerHTML = game.moves.length && game.ply >= game.moves.length ? '<p>Load another game</p>' : '';
+    const again = end.querySelector('p');
+    if (again) again.addEventListener('click', () => later(F.page_open_ms, openDialog));
+}
+
+function renderControls() {
+    document.getElementById('controls').innerHTML =
+        '<button class="MuiIconButton-root" aria-label="Previous move"><svg viewBox="0 0 24 24" width="24" height="24">' +
+        '<path d="m10.828 12l4.95 4.95l-1.414 1.413L8 12l6.364-6.364l1.414 1.415z"></path></svg></button>' +
+        '<button id="next-move" class="MuiIconButton-root" aria-label="Next move"><svg viewBox="0 0 24 24" width="24" height="24">' +
+        '<path d="m13.172 12l-4.95-4.95l1.414-1.413L16 12l-6.364 6.364l-1.414-1.415z"></path></svg></button>';
+    document.getElementById('next-move').addEventListener('click', () => {
+        if (game.ply >= game.moves.length) return;
+        later(F.page_move_ms, () => { game.ply = Math.min(game.ply + 1, game.moves.length); render(); });
+    });
+}
+
+function openDialog() {
+    if (document.querySelector("div[role='dialog']")) return;
+    const dialog = el(
+        '<div role="dialog" class="MuiDialog-root"><div class="MuiDialog-paper">' +
+        '<h2>Load a game</h2>' +
+        '<div id="dialog-select" role="combobox" tabindex="0" class="MuiSelect-select">Chess.com</div>' +
+        '<div class="fields"></div><div class="dialog-error"></div>' +
+        '<button class="MuiButton-root MuiButton-text">Cancel</button>' +
+        '<button class="MuiButton-root MuiButton-containedPrimary" disabled>Add</button>' +
+        '</div></div>');
+    document.body.appendChild(dialog);
+    const paper = dialog.firstChild;
+    const [cancel, add] = paper.querySelectorAll('button');
+    cancel.addEventListener('click', () => dialog.remove());
+    // MUI selects open on mousedown
+    paper.querySelector('#dialog-select').addEventListener('mousedown', () => later(F.page_select_ms, () => openMenu(paper)));
+    add.addEventListener('click', () => submit(dialog, paper));
+}
+
+function openMenu(paper) {
+    if (paper.querySelector("[role='listbox']")) return;
+    const menu = el('<ul role="listbox" class="MuiMenu-list"><li role="option">Chess.com</li>' +
+                    '<li role="option">Lichess</li><li role="option">PGN</li></ul>');
+    paper.appendChild(menu);
+    menu.addEventListener('click', (e) => {
+        if (e.target.tagName !== 'LI') return;
+        paper.querySelector('#dialog-select').textContent = e.target.textContent;
+        menu.remove();
+        if (e.target.textContent === 'PGN') showTextarea(paper);
+    });
+}
+
+function showTextarea(paper) {
+    const fields = paper.querySelector('.fields');
+    // MUI keeps an aria-hidden shadow textarea next to the real one
+    fields.innerHTML = '<textarea placeholder="Paste PGN"></textarea><textarea class="shadow" aria-hidden="true" readonly tabindex="-1"></textarea>';
+    const textarea = fields.querySelector('textarea');
+    const add = paper.querySelector('.MuiButton-containedPrimary');
+    let dropNext = !!F.page_drop_first_input;
+    textarea.addEventListener('input', () => {
+        if (dropNext) {
+            // Controlled input re-renders with its old state
+            dropNext = false;
+            textarea.value = '';
+        }
+        const value = textarea.value;
+        later(F.page_validate_ms, () => {
+            if (textarea.value === value) add.disabled = value.trim().length < 10;
+        });
+    });
+}
+
+function submit(dialog, paper) {
+    const pgn = paper.querySelector('textarea').value;
+    later(F.page_submit_ms, () => {
+        const moves = sanMoves(pgn);
+        if (!moves.length || Math.random() < F.page_load_failure_rate) {
+            paper.querySelector('.dialog-error').textContent = 'Invalid PGN: the game could not be loaded';
+            return;
+        }
+        dialog.remove();
+        game.moves = moves;
+        game.ply = 0;
+        renderControls();
+        render();
+    });
+}
+
+document.getElementById('load-game').addEventListener('click', () => later(F.page_open_ms, openDialog));
+render();
+</script>
+</body>
+</html>
+"""
+
+
+def games_by_month(pgn_file):
+    # {(year, month): [pgn, ...]} keyed on UTCDate (or Date)
+    months = defaultdict(list)
+    with PgnArchive(pgn_file) as archive:
+        for idx in range(len(archive)):
+            headers = archive.headers(idx)
+            date = headers.get("UTCDate") or headers.get("Date") or ""
+            year, _, rest = date.partition(".")
+            if year.isdigit() and rest[:2].isdigit():
+                months[(year, rest[:2])].append(archive.raw(idx))
+    return months
+
+def api_game(pgn):
+    headers = dict(HEADER_RE.findall(pgn))
+    variant = headers.get("Variant", "").lower()
+    return {
+        "url": headers.get("Link", ""),
+        "pgn": pgn,
+        "time_control": headers.get("TimeControl", ""),
+        "rules": "chess960" if variant == "chess960" else "chess",
+        "white": {"username": headers.get("White", ""), "result": ""},
+        "black": {"username": headers.get("Black", ""), "result": ""},
+    }
+
+
+class FixtureServer:
+    def __init__(self, pgn_file="magnus_games.pgn", host="127.0.0.1", port=0, faults=None, seed=None):
+        self.faults = dict(DEFAULT_FAULTS, **(faults or {}))
+        self.months = games_by_month(pgn_file)
+        # Monthly archives are "modified" when the server loaded them
+        self.loaded_at = int(time.time())
+        self.random = random.Random(seed)
+        self.requests = defaultdict(int)
+        self._lock = threading.Lock()
+        self.httpd = socketserver.ThreadingTCPServer((host, port), self._handler())
+        self.httpd.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    @property
+    def api_base(self):
+        return self.url + "pub"
+
+    def set_faults(self, **faults):
+        with self._lock:
+            unknown = set(faults) - set(DEFAULT_FAULTS)
+            if unknown:
+                raise KeyError(f"Unknown faults: {', '.join(sorted(unknown))}")
+            self.faults.update(faults)
+
+    def _roll(self, rate):
+        with self._lock:
+            return rate > 0 and self.random.random() < rate
+
+    def player_months(self, username):
+        name = username.lower()
+        found = defaultdict(list)
+        for key, pgns in self.months.items():
+            for pgn in pgns:
+                if re.search(rf'\[(?:White|Black) "{re.escape(name)}"\]', pgn, re.IGNORECASE):
+                    found[key].append(pgn)
+        return found
+
+    def start(self):
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name="fixture-server", daemon=True)
+        self.thread.start()
+        logging.info(f"[FIXTURE] Serving {self.url} (API {self.api_base})")
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def _handler(self):
+        server = self
+
+        class FixtureHandler(http.server.BaseHTTPRequestHandler):
+            def send_body(self, status, body, content_type, extra=None):
+                self.send_response(status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                for key, value in (extra or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def send_json(self, status, payload, extra=None):
+                self.send_body(status, json.dumps(payload).encode("utf-8"), "application/json", extra)
+
+            def do_GET(self):
+                parsed = urllib.parse.urlsplit(self.path)
+                with server._lock:
+                    server.requests[parsed.path] += 1
+                    faults = dict(server.faults)
+                if faults["latency"]:
+                    time.sleep(faults["latency"])
+                if parsed.path == "/":
+                    page = PAGE_HTML.replace("__FAULTS__", json.dumps(faults))
+                    self.send_body(200, page.encode("utf-8"), "text/html; charset=utf-8")
+                elif parsed.path == "/__faults":
+                    self.send_json(200, faults)
+                elif parsed.path.startswith("/pub/"):
+                    self.api(parsed.path, faults)
+                else:
+                    self.send_json(404, {"code": 0, "message": "Not found"})
+
+            def do_POST(self):
+                if urllib.parse.urlsplit(self.path).path != "/__faults":
+                    self.send_json(404, {"code": 0, "message": "Not found"})
+                    return
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                    server.set_faults(**json.loads(self.rfile.read(length) or b"{}"))
+                except (ValueError, KeyError, TypeError) as e:
+                    self.send_json(400, {"message": str(e)})
+                    return
+                self.send_json(200, server.faults)
+
+            def api(self, path, faults):
+                if server._roll(faults["api_rate_limit_rate"]):
+                    self.send_json(429, {"message": "Too many requests"}, {"Retry-After": str(faults["retry_after"])})
+                    return
+                if server._roll(faults["api_failure_rate"]):
+                    self.send_json(503, {"message": "Service unavailable"})
+                    return
+                m = API_GAMES_RE.match(path)
+                months = server.player_months(m.group(1)) if m else None
+                if not months:
+                    self.send_json(404, {"code": 0, "message": "User not found"})
+                    return
+                if m.group(2):
+                    archives = [f"{server.api_base}/player/{m.group(1)}/games/{y}/{mo}" for y, mo in sorted(months)]
+                    self.send_json(200, {"archives": archives})
+                    return
+                body = json.dumps({"games": [api_game(pgn) for pgn in months.get((m.group(3), m.group(4)), [])]})
+                etag = '"' + hashlib.sha1(body.encode("utf-8")).hexdigest() + '"'
+                validators = {"ETag": etag, "Last-Modified": email.utils.formatdate(server.loaded_at, usegmt=True)}
+                if self.not_modified(etag, server.loaded_at):
+                    self.send_response(304)
+                    for key, value in validators.items():
+                        self.send_header(key, value)
+                    self.end_headers()
+                    return
+                self.send_body(200, body.encode("utf-8"), "application/json", validators)
+
+            def not_modified(self, etag, modified_at):
+                # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+                if_none_match = self.headers.get("If-None-Match")
+                if if_none_match is not None:
+                    return if_none_match.strip() == "*" or etag in (t.strip() for t in if_none_match.split(","))
+                if_modified_since = self.headers.get("If-Modified-Since")
+                if if_modified_since:
+                    try:
+                        since = email.utils.parsedate_to_datetime(if_modified_since).timestamp()
+                    except (TypeError, ValueError):
+                        return False
+                    return modified_at <= since
+                return False
+
+            def log_message(self, format, *args):
+                return
+
+        return FixtureHandler
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Serve a local stand-in for chesskit.org and the chess.com API.")
+    parser.add_argument("--pgn-file", default="magnus_games.pgn")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=None)
+    for name, default in DEFAULT_FAULTS.items():
+        kind = (lambda v: v.lower() in ("1", "true", "yes")) if isinstance(default, bool) else type(default)
+        parser.add_argument("--" + name.replace("_", "-"), type=kind, default=default)
+    args = parser.parse_args()
+    faults = {name: getattr(args, name) for name in DEFAULT_FAULTS}
+    server = FixtureServer(args.pgn_file, port=args.port, faults=faults, seed=args.seed).start()
+    try:
+        server.thread.join()
+    except KeyboardInterrupt:
+        server.stop()
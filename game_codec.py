@@ -0,0 +1,173 @@
+import json
+import re
+import struct
+from array import array
+
+from chess_rules import Position, STARTING_FEN, WHITE, replay_game
+
+# ================= COMPACT GAME ENCODING =================
+# A game is packed into a few bytes of header ids plus one byte per ply: the
+# index of the move in Position.legal_moves(), whose order is deterministic
+# (never more than 218 legal moves, so a byte always fits). Header values are
+# interned once per table, trailing game/tournament ids are stored as integers
+# and CurrentPosition is dropped when it is just the final position. A packed
+# game is about a tenth of its normalized PGN string; text is rebuilt only
+# when the game is about to be played.
+
+ARCHIVE_MAGIC = b"CGAMES1\0"
+ARCHIVE_HEADER = struct.Struct("<8sQQQ")   # magic, table bytes, game count, blob bytes
+
+# Header value kinds
+INTERNED, NUMBERED, FINAL_FEN = range(3)
+
+# "https://www.chess.com/game/live/164105982219" -> prefix + integer
+NUMBERED_RE = re.compile(r"^(.*?)([1-9]\d{5,})$")
+
+
+def write_varint(out, value):
+    while value > 0x7F:
+        out.append(value & 0x7F | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, pos):
+    value = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, pos
+        shift += 7
+
+
+class StringTable:
+    __slots__ = ("strings", "ids")
+
+    def __init__(self, strings=()):
+        self.strings = list(strings)
+        self.ids = {s: i for i, s in enumerate(self.strings)}
+
+    def intern(self, value):
+        idx = self.ids.get(value)
+        if idx is None:
+            idx = self.ids[value] = len(self.strings)
+            self.strings.append(value)
+        return idx
+
+    def __getitem__(self, idx):
+        return self.strings[idx]
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class CompactGame:
+    # Unpacked form: header pairs in order, move codes and the final FEN
+    __slots__ = ("headers", "codes", "final_fen")
+
+    def __init__(self, headers, codes, final_fen=None):
+        self.headers = headers
+        self.codes = codes
+        self.final_fen = final_fen
+
+    @classmethod
+    def from_pgn(cls, pgn):
+        # Raises IllegalMoveError/ValueError on games that do not replay
+        header_map, start, moves = replay_game(pgn)
+        pos = start.copy()
+        codes = bytearray()
+        for move in moves:
+            codes.append(pos.move_index(move))
+            pos.push(move)
+        return cls(list(header_map.items()), bytes(codes), pos.fen())
+
+    def pgn(self):
+        header_map = dict(self.headers)
+        pos = Position.from_fen(header_map.get("FEN", STARTING_FEN))
+        parts = []
+        for code in self.codes:
+            move = pos.move_at(code)
+            if pos.turn == WHITE:
+                parts.append(f"{pos.fullmove}.")
+            parts.append(pos.san(move))
+            pos.push(move)
+        parts.append(header_map.get("Result", "*"))
+        lines = [f'[{key} "{pos.fen() if value is None else value}"]' for key, value in self.headers]
+        return "\n".join(lines) + "\n\n" + " ".join(parts)
+
+
+class GameCodec:
+    # Shared interning tables; packed games are only meaningful with the
+    # codec that produced them
+    def __init__(self, strings=(), layouts=()):
+        self.strings = StringTable(strings)
+        self.layouts = StringTable(tuple(tuple(entry) for entry in layout) for layout in layouts)
+
+    def pack(self, game):
+        out = bytearray()
+        layout, values = [], []
+        for key, value in game.headers:
+            if key == "CurrentPosition" and value == game.final_fen:
+                layout.append((key, FINAL_FEN))
+                continue
+            m = NUMBERED_RE.match(value)
+            if m:
+                layout.append((key, NUMBERED))
+                values.append(self.strings.intern(m.group(1)))
+                values.append(int(m.group(2)))
+            else:
+                layout.append((key, INTERNED))
+                values.append(self.strings.intern(value))
+        write_varint(out, self.layouts.intern(tuple(layout)))
+        for value in values:
+            write_varint(out, value)
+        write_varint(out, len(game.codes))
+        out += game.codes
+        return bytes(out)
+
+    def unpack_headers(self, data):
+        # ([(key, value)], offset of the move codes); value None = final FEN
+        layout_id, pos = read_varint(data, 0)
+        headers = []
+        for key, kind in self.layouts[layout_id]:
+            if kind == FINAL_FEN:
+                headers.append((key, None))
+                continue
+            value, pos = read_varint(data, pos)
+            value = self.strings[value]
+            if kind == NUMBERED:
+                number, pos = read_varint(data, pos)
+                value += str(number)
+            headers.append((key, value))
+        return headers, pos
+
+    def unpack(self, data):
+        headers, pos = self.unpack_headers(data)
+        count, pos = read_varint(data, pos)
+        return CompactGame(headers, bytes(data[pos:pos + count]))
+
+    def tables(self):
+        return {"strings": self.strings.strings, "layouts": self.layouts.strings}
+
+
+def write_archive(path, codec, blob, offsets):
+    # offsets: array("Q") of len(games) + 1 boundaries into blob
+    tables = json.dumps(codec.tables(), separators=(",", ":")).encode("utf-8")
+    with open(path, "wb") as f:
+        f.write(ARCHIVE_HEADER.pack(ARCHIVE_MAGIC, len(tables), len(offsets) - 1, len(blob)))
+        f.write(tables)
+        offsets.tofile(f)
+        f.write(blob)
+
+def read_archive(path):
+    # (codec, blob, offsets)
+    with open(path, "rb") as f:
+        magic, table_size, count, blob_size = ARCHIVE_HEADER.unpack(f.read(ARCHIVE_HEADER.size))
+        if magic != ARCHIVE_MAGIC:
+            raise ValueError(f"{path} is not a compact game archive")
+        tables = json.loads(f.read(table_size).decode("utf-8"))
+        offsets = array("Q")
+        offsets.fromfile(f, count + 1)
+        blob = bytearray(f.read(blob_size))
+    return GameCodec(tables["strings"], tables["layouts"]), blob, offsets
@@ -0,0 +1,271 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+from pgn_archive import PgnArchive, HEADER_RE
+from pgn_format import format_pgn_to_standard
+from playlist import Playlist
+
+# ================= GAME STORE =================
+# Games and their header metadata in one SQLite file. Players, date, ECO,
+# result, time control, variant and termination are indexed columns, so a
+# playlist is a query ("Magnus wins in blitz this month, no Chess960") that
+# returns row ids in milliseconds; PGN text is only read for the game about
+# to be played.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    link TEXT NOT NULL UNIQUE,
+    white TEXT COLLATE NOCASE,
+    black TEXT COLLATE NOCASE,
+    played_at TEXT,
+    eco TEXT,
+    result TEXT,
+    time_control TEXT,
+    time_class TEXT,
+    variant TEXT,
+    termination TEXT,
+    source TEXT,
+    pgn TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS games_white ON games (white, played_at);
+CREATE INDEX IF NOT EXISTS games_black ON games (black, played_at);
+CREATE INDEX IF NOT EXISTS games_played_at ON games (played_at);
+CREATE INDEX IF NOT EXISTS games_eco ON games (eco);
+CREATE INDEX IF NOT EXISTS games_result ON games (result);
+CREATE INDEX IF NOT EXISTS games_time_class ON games (time_class, played_at);
+CREATE INDEX IF NOT EXISTS games_variant ON games (variant);
+CREATE INDEX IF NOT EXISTS games_termination ON games (termination);
+"""
+
+COLUMNS = ("link", "white", "black", "played_at", "eco", "result", "time_control",
+           "time_class", "variant", "termination", "source", "pgn")
+
+# First keyword found in the Termination header, e.g. "X won by resignation"
+TERMINATIONS = (
+    ("checkmate", "checkmate"), ("resignation", "resignation"), ("time", "time"),
+    ("abandon", "abandoned"), ("stalemate", "stalemate"), ("repetition", "repetition"),
+    ("agreement", "agreement"), ("insufficient", "insufficient"), ("50-move", "50-move"),
+)
+
+
+def parse_headers(pgn):
+    # Header block only; the move text is never scanned
+    end = pgn.find("\n\n")
+    return dict(HEADER_RE.findall(pgn if end < 0 else pgn[:end]))
+
+def time_class(time_control):
+    # chess.com classes from the estimated game length (base + 40 increments)
+    if not time_control or time_control == "-":
+        return None
+    if "/" in time_control:
+        return "daily"
+    base, _, inc = time_control.partition("+")
+    try:
+        seconds = int(base) + 40 * int(inc or 0)
+    except ValueError:
+        return None
+    if seconds < 180:
+        return "bullet"
+    if seconds < 600:
+        return "blitz"
+    if seconds < 3600:
+        return "rapid"
+    return "classical"
+
+def termination_kind(termination):
+    text = (termination or "").lower()
+    for keyword, kind in TERMINATIONS:
+        if keyword in text:
+            return kind
+    return text or None
+
+def played_at(headers):
+    date = headers.get("UTCDate") or headers.get("Date") or ""
+    if not date[:4].isdigit():
+        return None
+    stamp = date.replace(".", "-").replace("??", "01")
+    clock = headers.get("UTCTime") or headers.get("StartTime")
+    return f"{stamp} {clock}" if clock else stamp
+
+def game_row(pgn, source="", headers=None):
+    headers = headers if headers is not None else parse_headers(pgn)
+    link = headers.get("Link") or "sha1:" + hashlib.sha1(pgn.encode("utf-8")).hexdigest()
+    return (
+        link, headers.get("White"), headers.get("Black"), played_at(headers),
+        headers.get("ECO"), headers.get("Result"), headers.get("TimeControl"),
+        time_class(headers.get("TimeControl")), headers.get("Variant") or "Standard",
+        termination_kind(headers.get("Termination")), source, pgn,
+    )
+
+
+class GameStore:
+    def __init__(self, path):
+        self.path = path
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Shared by the fetch threads and the main loop
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return self.db.execute("SELECT COUNT(*) FROM games").fetchone()[0]
+
+    # ---------- import ----------
+    def import_rows(self, rows):
+        # One transaction per batch; games already stored (same link) are kept
+        with self._lock, self.db:
+            before = self.db.total_changes
+            self.db.executemany(
+                f"INSERT OR IGNORE INTO games ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                rows)
+            added = self.db.total_changes - before
+            # Refresh the planner's index statistics after large imports
+            self.db.execute("PRAGMA optimize")
+            return added
+
+    def import_pgns(self, pgns, source=""):
+        start = time.monotonic()
+        added = self.import_rows(game_row(pgn, source) for pgn in pgns)
+        logging.info(f"[STORE] Imported {added} new games from {source or 'memory'} in {time.monotonic() - start:.2f}s")
+        return added
+
+    def import_archive(self, path, batch=5000):
+        # Headers come from the archive's header-only parse; only the stored
+        # PGN text goes through the normalizer
+        start = time.monotonic()
+        added = 0
+        source = os.path.basename(path)
+        with PgnArchive(path) as archive:
+            rows = []
+            for idx in range(len(archive)):
+                pgn = format_pgn_to_standard(archive.raw(idx))
+                if not pgn:
+                    continue
+                rows.append(game_row(pgn, source, archive.headers(idx)))
+                if len(rows) >= batch:
+                    added += self.import_rows(rows)
+                    rows = []
+            added += self.import_rows(rows)
+        logging.info(f"[STORE] Imported {added} new games from {source} in {time.monotonic() - start:.2f}s")
+        return added
+
+    def import_month(self, cache, username, year, month):
+        return self.import_pgns(cache.fetch_month(username, year, month), f"{username} {year}-{month}")
+
+    # ---------- queries ----------
+    def select(self, player=None, outcome=None, color=None, time_class=None, since=None, until=None,
+               eco=None, variant="Standard", termination=None, order="played_at", limit=None):
+        # Row ids of matching games. outcome is "win", "loss" or "draw" from
+        # `player`'s side; since/until are "YYYY-MM-DD" (until is inclusive);
+        # eco may be a prefix ("B9"); variant=None allows every variant.
+        where, args = [], []
+        if player:
+            sides = {"white": ["white"], "black": ["black"]}.get(color, ["white", "black"])
+            side_terms = []
+            for side in sides:
+                term = f"{side} = ?"
+                args.append(player)
+                if outcome in ("win", "loss"):
+                    winning = (side == "white") == (outcome == "win")
+                    term += " AND result = ?"
+                    args.append("1-0" if winning else "0-1")
+                elif outcome == "draw":
+                    term += " AND result = '1/2-1/2'"
+                side_terms.append(f"({term})")
+            where.append(f"({' OR '.join(side_terms)})")
+        elif outcome == "draw":
+            where.append("result = '1/2-1/2'")
+        if time_class:
+            where.append("time_class = ?")
+            args.append(time_class)
+        if since:
+            where.append("played_at >= ?")
+            args.append(since)
+        if until:
+            # Dates sort before any "date time" of the same day
+            where.append("played_at < ?")
+            args.append(until + "~")
+        if eco:
+            where.append("eco LIKE ?")
+            args.append(eco + "%")
+        if variant:
+            where.append("variant = ?")
+            args.append(variant)
+        if termination:
+            where.append("termination = ?")
+            args.append(termination)
+        if order not in ("played_at", "id", "random"):
+            raise ValueError(f"Unknown order: {order}")
+        sql = "SELECT id FROM games"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY " + ("random()" if order == "random" else order)
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        start = time.monotonic()
+        with self._lock:
+            ids = array("q", (row[0] for row in self.db.execute(sql, args)))
+        logging.info(f"[STORE] {len(ids)} games selected in {(time.monotonic() - start) * 1000:.1f}ms")
+        return ids
+
+    def pgn(self, game_id):
+        with self._lock:
+            row = self.db.execute("SELECT pgn FROM games WHERE id = ?", (game_id,)).fetchone()
+        if row is None:
+            raise KeyError(game_id)
+        return row[0]
+
+    def close(self):
+        self.db.close()
+
+
+class StorePlaylist(Playlist):
+    # Playlist over a query's row ids (8 bytes per game in memory). Fetchers
+    # extend() it with PGN text: the games are imported and the query re-run,
+    # and matching rows not queued yet are appended.
+    def __init__(self, store, query=None, source="API archives"):
+        super().__init__()
+        self.store = store
+        self.query = dict(query or {})
+        self.source = source
+        self.ids = array("q")
+        self._queued = set()
+        self.refresh()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, idx):
+        return self.store.pgn(self.ids[idx])
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def refresh(self):
+        ids = self.store.select(**self.query)
+        with self._cond:
+            new = [game_id for game_id in ids if game_id not in self._queued]
+            self.ids.extend(new)
+            self._queued.update(new)
+            self._cond.notify_all()
+        return len(new)
+
+    def extend(self, pgns):
+        if self.store.import_pgns(pgns, self.source):
+            self.refresh()
+
+    def wait_for(self, count, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: len(self.ids) >= count or self.complete, timeout)
+            return len(self.ids) >= count
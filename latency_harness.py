@@ -0,0 +1,170 @@
+import argparse
+import json
+import logging
+import os
+import shutil
+import statistics
+import tempfile
+import time
+import urllib.parse
+from collections import defaultdict
+
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.support.ui import WebDriverWait
+
+import main
+from archive_cache import ArchiveCache
+from chess_rules import validate_pgn
+from fixture_server import DEFAULT_FAULTS, FixtureServer
+
+# ================= LATENCY HARNESS =================
+# Runs the Selenium load/play cycle of main.py against fixture_server.py and
+# reports per-phase timings: API fetch and revalidation, page open, each
+# phase of the scripted loader (or the step-by-step loader), board pinning
+# and move playback. Fault settings go to the fixture page, so selector and
+# wait changes can be timed offline under the same injected latency.
+
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean": statistics.fmean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "max": ordered[-1],
+    }
+
+def print_report(phases):
+    print(f"{'phase':<24} {'n':>5} {'mean ms':>10} {'p50 ms':>10} {'p95 ms':>10} {'max ms':>10}")
+    for name, samples in phases.items():
+        s = summarize(samples)
+        print(f"{name:<24} {s['count']:>5} {s['mean'] * 1000:>10.1f} {s['p50'] * 1000:>10.1f} "
+              f"{s['p95'] * 1000:>10.1f} {s['max'] * 1000:>10.1f}")
+
+
+class LatencyHarness:
+    def __init__(self, server, loader="script", playback="click", max_plies=40, headless=True):
+        self.server = server
+        self.loader = loader
+        self.playback = playback
+        self.max_plies = max_plies
+        self.headless = headless
+        self.phases = defaultdict(list)
+        self.failed_loads = 0
+
+    def timed(self, name, fn, *args):
+        start = time.perf_counter()
+        result = fn(*args)
+        self.phases[name].append(time.perf_counter() - start)
+        return result
+
+    def fetch_games(self, username, year, month):
+        cache_dir = tempfile.mkdtemp(prefix="latency_api_")
+        try:
+            cache = ArchiveCache(cache_dir, self.server.api_base)
+            pgns = self.timed("api_fetch_month", cache.fetch_month, username, year, month)
+            # A past month is served from disk once closed; reopen it so the
+            # conditional GET (ETag / Last-Modified -> 304) is timed too
+            entry = cache.load(username, year, month)
+            if entry:
+                entry["closed"] = False
+                cache.save(username, year, month, entry)
+                self.timed("api_revalidate_month", cache.refresh_month, username, year, month)
+            return pgns
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def open_page(self, driver, wait):
+        query = urllib.parse.urlencode({k: v for k, v in self.server.faults.items() if k.startswith("page_")})
+        driver.get(f"{self.server.url}?{query}")
+        wait.until(EC.element_to_be_clickable((By.XPATH, "//button[contains(., 'Load game')]")))
+
+    def load(self, driver, wait, pgn):
+        if self.loader == "script":
+            start = time.perf_counter()
+            result = main.load_game_via_script(driver, pgn)
+            self.phases["load_total"].append(time.perf_counter() - start)
+            for name, ms in result["phases"].items():
+                self.phases[f"load_{name}"].append(ms / 1000)
+            return result["ok"]
+        return self.timed("load_total", main.load_game_via_pgn, driver, wait, pgn)
+
+    def play(self, driver, wait, pgn, plies):
+        start = time.perf_counter()
+        if self.playback == "in-page":
+            main.play_all_moves_in_page(driver, wait, "latency")
+        else:
+            main.play_all_moves(driver, wait, "latency")
+        elapsed = time.perf_counter() - start
+        self.phases["play_total"].append(elapsed)
+        if plies:
+            # Wall time per move beyond the configured delay
+            self.phases["play_per_move"].append(max(elapsed / plies - main.move_delay, 0.0))
+
+    def run(self, username, year, month, games=3):
+        pgns = self.fetch_games(username, year, month)
+        playable = []
+        for pgn in pgns:
+            check = validate_pgn(pgn, main.allow_chess960)
+            if check.ok and 0 < check.plies <= self.max_plies:
+                playable.append((pgn, check.plies))
+            if len(playable) >= games:
+                break
+        if not playable:
+            raise RuntimeError(f"No game of at most {self.max_plies} plies in the fixture month")
+
+        driver = self.timed("browser_start", main.create_driver, None, self.headless)
+        wait = WebDriverWait(driver, 10)
+        try:
+            self.timed("page_open", self.open_page, driver, wait)
+            for pgn, plies in playable:
+                if not self.load(driver, wait, pgn):
+                    self.failed_loads += 1
+                    continue
+                self.timed("pin_board", main.pin_board, driver)
+                self.play(driver, wait, pgn, plies)
+        finally:
+            main.quit_driver(driver)
+        return dict(self.phases)
+
+
+if __name__ == "__main__":
+    # main configured INFO logging on import; keep the report readable
+    logging.getLogger().setLevel(logging.WARNING)
+    parser = argparse.ArgumentParser(description="Time the Selenium load/play cycle against the local fixture site.")
+    parser.add_argument("--pgn-file", default="magnus_games.pgn")
+    parser.add_argument("--username", default="MagnusCarlsen")
+    parser.add_argument("--year", default="2026")
+    parser.add_argument("--month", default="01")
+    parser.add_argument("--games", type=int, default=3)
+    parser.add_argument("--max-plies", type=int, default=40, help="skip longer games to keep runs short")
+    parser.add_argument("--loader", choices=("script", "pgn"), default="script")
+    parser.add_argument("--playback", choices=("click", "in-page"), default="click")
+    parser.add_argument("--move-delay", type=float, default=0.0)
+    parser.add_argument("--headed", action="store_true", help="run Chrome on the X display instead of headless")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--output", default="latency_results.json")
+    for name, default in DEFAULT_FAULTS.items():
+        kind = (lambda v: v.lower() in ("1", "true", "yes")) if isinstance(default, bool) else type(default)
+        parser.add_argument("--" + name.replace("_", "-"), type=kind, default=default)
+    args = parser.parse_args()
+
+    main.move_delay = args.move_delay
+    faults = {name: getattr(args, name) for name in DEFAULT_FAULTS}
+    server = FixtureServer(args.pgn_file, faults=faults, seed=args.seed).start()
+    try:
+        harness = LatencyHarness(server, args.loader, args.playback, args.max_plies, not args.headed)
+        phases = harness.run(args.username, args.year, args.month, args.games)
+    finally:
+        server.stop()
+
+    print_report(phases)
+    if harness.failed_loads:
+        print(f"[LATENCY] {harness.failed_loads} loads failed")
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump({"faults": faults, "loader": args.loader, "playback": args.playback,
+                   "move_delay": args.move_delay, "failed_loads": harness.failed_loads,
+                   "phases": {k: summarize(v) for k, v in phases.items()}}, f, indent=2)
+    print(f"[LATENCY] Results written to {os.path.abspath(args.output)}")
@@ -20,21 +20,153 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
 from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+
+from pgn_archive import PgnArchive
+from pgn_format import format_pgn_to_standard
+from archive_cache import ArchiveCache
+from archive_fetcher import ArchiveFetcher, PlaylistRefresher, ThrottledSession
+from playlist import Playlist, CompactPlaylist
+from game_store import GameStore, StorePlaylist
+from chess_rules import validate_pgn
+from board_renderer import BoardRenderer, FramePacer, stream_game
+from ffmpeg_telemetry import FfmpegTelemetry, PROGRESS_ARGS
+from memory_sampler import MemorySampler, PROCESS_GROUPS
+from screencast import ScreencastCapture
+from board_detect import detect_board_region
+from batch_render import render_playlist
+from segment_cache import SegmentCache, SegmentRelay, SegmentTee, segment_key
+import metrics
+import stream_scene
+from metrics import (GAMES_LOADED, GAMES_FAILED, GAMES_SKIPPED, GAME_LOAD_SECONDS,
+                     FFMPEG_RESTARTS, BROWSER_RECOVERIES, GOVERNOR_GCS, GOVERNOR_RELOADS,
+                     GOVERNOR_RECYCLES, PAGE_JS_HEAP, PAGE_DOM_NODES, record_move)
 
 # ================= CONFIG =================
 username = "MagnusCarlsen"
 # API specific config
 target_year = "2026"
 target_month = "01"
+# Optional local PGN archive (e.g. "magnus_games.pgn"); empty uses the API
+pgn_file = ""
+# Raw API responses, validators and normalized PGNs survive restarts here
+api_cache_dir = os.path.join(os.getcwd(), ".api_cache")
+api_base = "https://api.chess.com/pub"
+# Fetch every monthly archive of every player instead of one target month
+fetch_all_archives = False
+players = [username]
+fetch_workers = 4
+api_requests_per_second = 3
+# Opt-in: poll the playlist's months this often while streaming and queue
+# games played since the start (target month, or the current month with
+# fetch_all_archives / several players). 0 = fetch once
+playlist_refresh_seconds = 0
+# Keep fetched games packed (about one byte per ply plus interned headers)
+# instead of as PGN text; a game is rebuilt when it is taken for playback.
+# Trades ~6ms of CPU per game (encode + decode) for ~10x less memory, so it
+# only pays off for very large multi-archive playlists
+compact_playlist = False
+
+# Optional SQLite game store: the sources above are imported into it and the
+# playlist is a query over its indexed headers, e.g.
+#   {"player": "MagnusCarlsen", "outcome": "win", "time_class": "blitz",
+#    "since": "2026-01-01", "variant": "Standard"}
+# (see GameStore.select). Empty path plays the sources directly.
+game_store_path = ""
+game_store_query = {}
+
+# Chess960 games are validated with their own castling rules; disable if the
+# board site cannot replay them
+allow_chess960 = True
 
 move_delay = 3
+# Board site driven in browser mode (fixture_server.py serves a local stand-in)
+chesskit_url = "https://chesskit.org/"
+# "browser" drives chesskit.org under Xvfb and grabs the screen; "native" draws
+# the board in Python and pipes raw frames into ffmpeg (no Chrome, no Xvfb)
+render_mode = "browser"
+native_board_size = 600
+native_fps = 10
+# Advance moves from a timer injected into the page instead of one WebDriver
+# click per move; progress comes back through one long-poll per window
+in_page_playback = False
+in_page_poll_seconds = 30
+# Load the next game in an off-screen window while the current one plays
+# (requires in_page_playback)
+preload_next_game = False
+# Keep a second, off-screen Chrome warmed up so a crashed session is replaced
+# in seconds (costs one more browser's RAM); without it one is relaunched
+browser_hot_standby = False
+# Opt-in: load games with one in-page script that waits on DOM mutations
+# instead of fixed sleeps; falls back to the step-by-step loader if it fails.
+# Off keeps the step-by-step load_game_via_pgn dialog flow
+scripted_game_loader = False
+game_load_timeout = 20
+# "x11grab" records the Xvfb display; "screencast" takes changed frames from
+# Chrome's DevTools screencast and can run Chrome headless (no Xvfb needed)
+capture_backend = "x11grab"
+screencast_headless = True
+# Opt-in: locate the board from the page (or a captured frame) and grab/crop
+# just that. Off keeps the 800x800 grab cropped by the fixed BOARD_CROP_*
+# values in stream_scene.py
+auto_board_region = False
+# Opt-in: skip filter work on unchanged board frames between moves
+# (mpdecimate + fps refill, 1000k VBV buffer instead of 400k). Off keeps the
+# baseline filter graph. max_hold is the longest a static board goes without
+# a real frame (seconds)
+static_scene_encoding = False
+static_scene_max_hold = 0.5
 stream_to_youtube = True
+# With stream_to_youtube off: render the whole playlist into output_file on a
+# process pool (native board, faster than real time) instead of recording live
+offline_render = False
+offline_render_workers = None     # None = one per core
+# Encode each game once and keep the MPEG-TS segment; on later loops a cached
+# game is stream-copied to the output without the browser or the encoder
+segment_cache_enabled = False
+segment_cache_dir = os.path.join(os.getcwd(), ".segment_cache")
 
 output_file = os.path.join(os.getcwd(), "chess_games_recording.mkv")
 youtube_stream_url = "rtmp://a.rtmp.youtube.com/live2"
 youtube_stream_key = "7v8x-k1dd-r1sb-e1sz-efd2"
 
 enable_infinite_loop = True
+# Pause before the next pass when a whole pass found no playable game
+# (e.g. only Chess960 games with allow_chess960 off)
+empty_pass_backoff_seconds = 60
+
+# Multi-stream: run several independent channels from this one process. Each
+# entry overrides the single-channel settings above, e.g.
+#   {"name": "magnus", "players": ["MagnusCarlsen"], "stream_key": "...",
+#    "pgn_file": "", "output_file": "magnus.mkv"}
+# Empty runs the single stream configured above.
+channels = []
+# Cores shared out between channels (None = every core this process may use)
+multi_stream_cpus = None
+# Channels beyond this memory budget are not started
+multi_stream_memory_mb = 2048
+channel_memory_mb = 450
+# Channel n records X display :<first_channel_display + n>
+first_channel_display = 99
+
+# ffmpeg progress watchdog: warn when output time stops advancing for this
+# long, or when the encode runs slower than this over a 30s window
+ffmpeg_stall_seconds = 15
+ffmpeg_min_speed = 0.95
+
+# Background memory sampling: interval and ring-buffer length (1h at 5s)
+memory_sample_seconds = 5
+memory_history_samples = 720
+
+# Memory governor, checked between games: force a GC, reload the page or
+# recycle the renderer before the container hits its 512MB limit. Off until
+# the thresholds have been tuned on the production host
+memory_governor = False
+governor_gc_container_mb = 400
+governor_reload_container_mb = 440
+governor_recycle_container_mb = 470
+governor_js_heap_mb = 96          # of the 128MB --max-old-space-size
+governor_dom_nodes = 60000
 
 # ================= LOGGING =================
 logging.basicConfig(
@@ -44,108 +176,51 @@ logging.basicConfig(
 )
 
 # ================= SAFETY =================
+class BrowserSessionLost(WebDriverException):
+    pass
+
 def ensure_browser_alive(driver):
+    # Raises instead of exiting so the main loop can swap in another browser
+    # without touching ffmpeg or the playlist
     try:
         _ = driver.title
-    except WebDriverException:
-        logging.error("[FATAL] Browser session lost. Exiting.")
-        sys.exit(1)
-
-def log_memory_usage():
-    try:
-        # 1. Try to get container-accurate memory from cgroups (Docker/Render)
-        container_mem = None
-        # Cgroup v2 (modern)
-        if os.path.exists("/sys/fs/cgroup/memory.current"):
-            with open("/sys/fs/cgroup/memory.current", "r") as f:
-                container_mem = int(f.read().strip()) / (1024 * 1024)
-        # Cgroup v1 (older)
-        elif os.path.exists("/sys/fs/cgroup/memory/memory.usage_in_bytes"):
-            with open("/sys/fs/cgroup/memory/memory.usage_in_bytes", "r") as f:
-                container_mem = int(f.read().strip()) / (1024 * 1024)
-
-        # 2. Fallback to process summing (Local/Non-container)
-        process = psutil.Process(os.getpid())
-        py_mem = process.memory_info().rss / (1024 * 1024)
-        
-        if container_mem is not None:
-            total_display = container_mem
-            source = "Container"
-        else:
-            # Note: This often overcounts Chrome due to shared memory
-            total_rss = py_mem
-            for child in process.children(recursive=True):
-                try:
-                    total_rss += child.memory_info().rss / (1024 * 1024)
-                except:
-                    pass
-            total_display = total_rss
-            source = "Summed RSS"
-
-        sys_mem = psutil.virtual_memory().percent
-        logging.info(f"[ANALYTICS] System: {sys_mem}% | Total RAM ({source}): {total_display:.1f}MB / 512MB limit | Python: {py_mem:.1f}MB")
-        
-    except Exception as e:
-        logging.error(f"[ANALYTICS] Error logging memory: {e}")
+    except WebDriverException as e:
+        logging.error("[BROWSER] Browser session lost.")
+        raise BrowserSessionLost(f"Browser session lost: {e.msg or e}") from e
 
-# ================= PGN FORMATTING =================
-def format_pgn_to_standard(raw_pgn):
-    if not raw_pgn:
+# Sampled off the playback thread; see memory_sampler.py
+memory_sampler = MemorySampler(memory_sample_seconds, memory_history_samples)
 
-        return ""
-        
-    lines = raw_pgn.split('\n')
-    headers = []
-    movement_lines = []
-    
-    for line in lines:
-        line = line.strip()
-        if not line: continue
-        if line.startswith('['):
-            # Keep all headers that match the [Key "Value"] format
-            if re.match(r'\[\w+ ".*"\]', line):
-                headers.append(line)
-        else:
-            movement_lines.append(line)
-    
-    # Process move text
-    move_text = " ".join(movement_lines)
-    
-    # Remove comments { ... }
-    move_text = re.sub(r'\{.*?\}', '', move_text, flags=re.DOTALL)
-    # Remove annotations like $1, $2
-    move_text = re.sub(r'\$\d+', '', move_text)
-    # Remove redundant "1..." / "1. ..." notations
-    move_text = re.sub(r'\d+\s*\.\.\.', '', move_text)
-    
-    # Standardize spacing
-    move_text = re.sub(r'\s+', ' ', move_text).strip()
-    
-    # Final reconstruction: Headers -> Empty Line -> Moves
-    return "\n".join(headers) + "\n\n" + move_text
+def log_memory_usage():
+    # Reads the latest background sample, so it is cheap inside the move loop
+    logging.info(f"[ANALYTICS] {memory_sampler.summary()}")
+
+metrics.Gauge("chess_container_memory_bytes", "Container memory usage from cgroups",
+              lambda: memory_sampler.value("cgroup_current"))
+metrics.Gauge("chess_container_memory_peak_bytes", "Highest container memory usage sampled",
+              lambda: memory_sampler.peaks.get("cgroup_current"))
+metrics.Gauge("chess_container_memory_trend_bytes_per_minute", "Container memory slope over the last 10 minutes",
+              lambda: memory_sampler.trend("cgroup_current"))
+for _stat in ("anon", "file", "shmem"):
+    metrics.Gauge(f"chess_container_memory_{_stat}_bytes", f"cgroup memory.stat {_stat}",
+                  lambda key=f"cgroup_{_stat}": memory_sampler.value(key))
+for _group in PROCESS_GROUPS:
+    metrics.Gauge(f"chess_{_group}_pss_bytes", f"Proportional set size of {_group} processes",
+                  lambda key=f"pss_{_group}": memory_sampler.value(key))
+metrics.Gauge("chess_memory_pressure_some_avg10", "Memory PSI 'some' over 10s (%)",
+              lambda: memory_sampler.value("psi_some_avg10"))
+metrics.Gauge("chess_memory_pressure_full_avg10", "Memory PSI 'full' over 10s (%)",
+              lambda: memory_sampler.value("psi_full_avg10"))
 
 # ================= API FETCH =================
+api_cache = ArchiveCache(
+    api_cache_dir, api_base,
+    session=ThrottledSession(pool_size=fetch_workers, requests_per_second=api_requests_per_second)
+)
+
 def fetch_pgns(username, year, month):
-    url = f"https://api.chess.com/pub/player/{username}/games/{year}/{month}"
-    logging.info(f"[API] Fetching games from {url}")
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-        games = data.get("games", [])
-        
-        valid_pgns = []
-        for g in games:
-            # Filter for standard chess
-            if g.get("rules") == "chess" and g.get("pgn"):
-                # Convert to accepted format immediately
-                formatted = format_pgn_to_standard(g.get("pgn"))
-                if formatted:
-                    valid_pgns.append(formatted)
-        
+        valid_pgns = api_cache.fetch_month(username, year, month)
         logging.info(f"[API] Found and formatted {len(valid_pgns)} valid games")
         return valid_pgns
     except Exception as e:
@@ -153,13 +228,48 @@ def fetch_pgns(username, year, month):
         return []
 
 # ================= FFMPEG =================
-def start_screen_recording(stream_to_youtube=False, youtube_stream_url="", youtube_stream_key="", output_file="chess_games_recording.mkv"):
+# Latest process from start_screen_recording, read by the metrics gauges
+active_ffmpeg = None
+
+def ffmpeg_stat(key):
+    if active_ffmpeg is None or active_ffmpeg.poll() is not None:
+        return None
+    value = active_ffmpeg.telemetry.snapshot().get(key)
+    return int(value) if isinstance(value, bool) else value
+
+metrics.Gauge("chess_ffmpeg_speed", "ffmpeg encode speed over the last 30s", lambda: ffmpeg_stat("window_speed"))
+metrics.Gauge("chess_ffmpeg_fps", "ffmpeg output frame rate", lambda: ffmpeg_stat("fps"))
+metrics.Gauge("chess_ffmpeg_drop_frames", "Frames dropped by ffmpeg", lambda: ffmpeg_stat("drop_frames"))
+metrics.Gauge("chess_ffmpeg_dup_frames", "Frames duplicated by ffmpeg", lambda: ffmpeg_stat("dup_frames"))
+metrics.Gauge("chess_ffmpeg_stalled", "1 while ffmpeg output time is not advancing", lambda: ffmpeg_stat("stalled"))
+
+def stream_output_args(stream_to_youtube, youtube_stream_url, youtube_stream_key, output_file):
+    return ['-f', 'flv', f"{youtube_stream_url}/{youtube_stream_key}"] if stream_to_youtube else [output_file]
+
+def start_screen_recording(stream_to_youtube=False, youtube_stream_url="", youtube_stream_key="", output_file="chess_games_recording.mkv", raw_frame_size=None, raw_framerate=10, display=None, cpus=None, image_pipe=False, board_region=None, segment_offset=None):
     logging.info("[RECORDING] Starting FFmpeg...")
 
     system_os = platform.system().lower()
     logging.info(f"[SYSTEM] Detected OS: {system_os}")
 
-    if system_os == 'windows':
+    if raw_frame_size:
+        # Board frames rendered in-process and written to stdin
+        input_args = [
+            '-f', 'rawvideo',
+            '-pix_fmt', 'rgb24',
+            '-video_size', f'{raw_frame_size[0]}x{raw_frame_size[1]}',
+            '-framerate', str(raw_framerate),
+            '-i', 'pipe:0'
+        ]
+    elif image_pipe:
+        # Screencast JPEGs arrive only when the page changes; stamp them on arrival
+        input_args = [
+            '-use_wallclock_as_timestamps', '1',
+            '-f', 'image2pipe',
+            '-c:v', 'mjpeg',
+            '-i', 'pipe:0'
+        ]
+    elif system_os == 'windows':
         input_args = [
             '-f', 'gdigrab',
             '-framerate', '60',
@@ -169,145 +279,115 @@ def start_screen_recording(stream_to_youtube=False, youtube_stream_url="", youtu
             '-i', 'desktop'
         ]
     elif system_os == 'linux':
-        display = os.environ.get("DISPLAY", ":99.0")
+        display = display or os.environ.get("DISPLAY", ":99.0")
+        grab_size, grab_input = '800x800', display  # Reduced from 1280x1024
+        if board_region:
+            # Grab only the board instead of the whole screen
+            grab_size = f'{board_region.w}x{board_region.h}'
+            grab_input = f'{display}+{board_region.x},{board_region.y}'
         input_args = [
             '-f', 'x11grab',
             '-framerate', '10',
             '-probesize', '32',        # Ultra-low probe size to save initial RAM
             '-analyzeduration', '0',   # Don't analyze stream to save buffer
-            '-video_size', '800x800',  # Reduced from 1280x1024
+            '-video_size', grab_size,
             '-draw_mouse', '0',
-            '-i', display
+            '-i', grab_input
         ]
     else:
         raise RuntimeError(f"Unsupported OS: {system_os}")
 
-    # Background music setup
-    music_file = os.path.join(os.getcwd(), 'bgmusic.mp3')
-    if os.path.exists(music_file):
-        audio_args = ['-stream_loop', '-1', '-i', music_file]
-    else:
-        logging.warning("[AUDIO] Background music not found, using null audio.")
-        audio_args = ['-f', 'lavfi', '-i', 'anullsrc=channel_layout=stereo:sample_rate=44100']
-
-    # Bottom Magnus video setup
-    bottom_video = os.path.join(os.getcwd(), 'bottom-Magnus.mp4')
-    if os.path.exists(bottom_video):
-        banner_args = ['-stream_loop', '-1', '-i', bottom_video]
+    overlay_args = stream_scene.overlay_inputs()
+
+    # Board position in the captured frame (scene layout: stream_scene.py)
+    BOARD_CROP_X = stream_scene.BOARD_CROP_X
+    BOARD_CROP_Y = stream_scene.BOARD_CROP_Y
+    BOARD_CROP_W = stream_scene.BOARD_CROP_W
+    BOARD_CROP_H = stream_scene.BOARD_CROP_H
+    if raw_frame_size:
+        # Rendered frames are the board already
+        BOARD_CROP_X, BOARD_CROP_Y = 0, 0
+        BOARD_CROP_W, BOARD_CROP_H = raw_frame_size
+    elif image_pipe:
+        # Screencast frames are the viewport, where pin_board puts the board at 0,0
+        BOARD_CROP_X, BOARD_CROP_Y = 0, 0
+        if board_region:
+            BOARD_CROP_X, BOARD_CROP_Y, BOARD_CROP_W, BOARD_CROP_H = board_region
+    elif board_region and system_os == 'linux':
+        # x11grab already delivers just the board
+        BOARD_CROP_X, BOARD_CROP_Y = 0, 0
+        BOARD_CROP_W, BOARD_CROP_H = board_region.w, board_region.h
+
+    # --- LOGIC: Static Board ---
+    # Between moves the board does not change. mpdecimate drops those frames
+    # right after the crop so scale/pad/drawtext only run when something moved;
+    # fps refills the output rate with references to the last frame, which x264
+    # codes as skip blocks. `max` keeps at least one real frame per hold window
+    # so a live stream never waits on a static board.
+    board_decimate = board_refill = ""
+    if static_scene_encoding:
+        input_fps = raw_framerate if raw_frame_size else 10
+        board_decimate = f"mpdecimate=max={max(1, round(static_scene_max_hold * input_fps))},"
+        board_refill = f",fps={stream_scene.OUTPUT_FPS}"
+
+    filter_args = stream_scene.filter_args(
+        (BOARD_CROP_X, BOARD_CROP_Y, BOARD_CROP_W, BOARD_CROP_H), board_decimate, board_refill)
+    encoding_args = stream_scene.encoding_args(static_scene_encoding)
+
+    if segment_offset is not None:
+        # One game per encoder: MPEG-TS on stdout for the segment tee, with
+        # timestamps starting where the relay's stream clock stands
+        output_args = ['-f', 'mpegts', '-output_ts_offset', f'{segment_offset:.3f}', 'pipe:1']
     else:
-        logging.warning("[VIDEO] bottom-Magnus.mp4 not found, falling back.")
-        # We need a dummy input if missing to keep mapping consistent
-        banner_args = ['-f', 'lavfi', '-i', 'color=c=black:s=720x400:d=1']
-
-
-
-    # === 1. GLOBAL SCENE SETTINGS ===
-    OUT_W = 480        
-    OUT_H = 854        # 480p Vertical
-
-    # === 2. TOP TEXT (HEADER) SETTINGS ===
-    HEADER_TEXT = "GOAT Chess"        
-    HEADER_FONT_SIZE = 32             
-    HEADER_Y = 20                     
-    HEADER_BOX_ALPHA = 0.5            # Transparency of the black box behind the text (0.0 to 1.0)
-
-    # === 3. CHESS BOARD SETTINGS ===
-    # --- Browser Cropping (Optimized for 800x800 window) ---
-    BOARD_CROP_X = 0                  
-    BOARD_CROP_Y = 100                # Adjusted for 800h
-    BOARD_CROP_W = 600                
-    BOARD_CROP_H = 600                
-    
-    # --- Stream Positioning ---
-    BOARD_SCALE_W = 480               
-    BOARD_POS_Y_SHIFT = -120          
-
-    # === 4. BOTTOM BANNER SETTINGS ===
-    BANNER_SCALE_W = 480              
-    BANNER_H = 400                    
-    BANNER_Y = 560                    
-
-    # === 5. AUDIO SETTINGS ===
-    MUSIC_VOLUME = 0.5                # Background music volume (0.0 = silent, 1.0 = loud)
-
-    # --- LOGIC: Vertical Padding Calculation ---
-    # This formula centers the board in the 1280h frame and applies the BOARD_POS_Y_SHIFT
-    vertical_pad = f"({OUT_H}-ih*min({OUT_W}/iw\\,{OUT_H}/ih))/2+{BOARD_POS_Y_SHIFT}"
-
+        output_args = stream_output_args(stream_to_youtube, youtube_stream_url, youtube_stream_key, output_file)
 
-    
-    if system_os == 'windows':
-        fontfile_path = "C\\:/Windows/Fonts/arialbd.ttf"
-    else:
-        fontfile_path = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
-
-    filter_args = [
-        '-filter_threads', '1',        # Force single filter thread (Saves 50MB+)
-        '-filter_complex',
-        # Step A: Crop and scale the board
-        f"[0:v]crop={BOARD_CROP_W}:{BOARD_CROP_H}:{BOARD_CROP_X}:{BOARD_CROP_Y},"
-        f"scale={BOARD_SCALE_W}:-1[board];"
-        
-        # Step B: Pad board into stream frame and add Header Text
-        f"[board]pad={OUT_W}:{OUT_H}:(ow-iw)/2:{vertical_pad}:black,"
-        f"drawtext=fontfile='{fontfile_path}':text='{HEADER_TEXT}':"
-        f"fontcolor=white:fontsize={HEADER_FONT_SIZE}:box=1:boxcolor=black@{HEADER_BOX_ALPHA}:boxborderw=10:"
-        f"x=(w-text_w)/2:y={HEADER_Y}[main];"
-        
-        # Step C: Scale the banner and overlay it
-        f"[1:v]scale={BANNER_SCALE_W}:{BANNER_H}[banner];"
-        f"[main][banner]overlay=0:{BANNER_Y}[v];"
-        
-        # Step D: Apply Volume
-        f"[2:a]volume={MUSIC_VOLUME}[a]",
-        
-        '-map', '[v]',
-        '-map', '[a]'
-    ]
-
-
-
-    encoding_args = [
-        '-vcodec', 'libx264',
-        '-preset', 'ultrafast',
-        '-pix_fmt', 'yuv420p',
-        '-r', '15',
-        '-g', '30',
-        '-b:v', '500k',
-        '-minrate', '500k',
-        '-maxrate', '500k',
-        '-bufsize', '400k',            # Small buffer to stay in RAM
-        '-x264-params', 'nal-hrd=cbr:force-cfr=1',
-        '-acodec', 'aac',
-        '-ar', '44100',
-        '-b:a', '32k',
-        '-threads', '1',               # Single thread for encoding
-        '-shortest'
-    ]
-
-    output_args = ['-f', 'flv', f"{youtube_stream_url}/{youtube_stream_key}"] if stream_to_youtube else [output_file]
-
-    command = ['ffmpeg', '-y'] + input_args + banner_args + audio_args + filter_args + encoding_args + output_args
+    command = ['ffmpeg', '-y'] + PROGRESS_ARGS + input_args + overlay_args + filter_args + encoding_args + output_args
     logging.info(f"[FFMPEG COMMAND] {' '.join(command)}")
 
-    return subprocess.Popen(command, stdin=subprocess.PIPE)
+    global active_ffmpeg
+    proc = subprocess.Popen(command, stdin=subprocess.PIPE, stderr=subprocess.PIPE,
+                            stdout=subprocess.PIPE if segment_offset is not None else None)
+    proc.telemetry = FfmpegTelemetry(proc, ffmpeg_stall_seconds, ffmpeg_min_speed).start()
+    proc.capture = ScreencastCapture(proc.stdin) if image_pipe else None
+    # stdin carries frames (native renderer, screencast), not keyboard commands
+    proc.frame_pipe = bool(raw_frame_size or image_pipe)
+    active_ffmpeg = proc
+    if cpus:
+        pin_processes([proc.pid], cpus)
+    return proc
 
 def stop_screen_recording(proc):
     if proc:
+        proc.telemetry.stop()
+        if proc.capture:
+            proc.capture.stop()
+        # stderr belongs to the telemetry reader, so no communicate() here
         try:
-            proc.communicate(input=b"q", timeout=5)
+            if not proc.frame_pipe:
+                proc.stdin.write(b"q")
+            # On a frame pipe "q" would be read as image data; EOF ends the encode
+            proc.stdin.close()
+            proc.wait(timeout=5)
         except:
             proc.terminate()
 
+def finish_segment(proc, tee, complete, game_info):
+    # Ends a per-game encoder and files its segment; returns the new ffmpeg_proc
+    stop_screen_recording(proc)
+    tee.finish(complete, game_info)
+    return None
+
 # ================= GAME PLAY =================
+# SVG path provided by user for the "Next Move" icon
+NEXT_MOVE_XPATH = "//*[local-name()='path' and @d='m13.172 12l-4.95-4.95l1.414-1.413L16 12l-6.364 6.364l-1.414-1.415z']/ancestor::*[local-name()='button' or @role='button']"
+
 def play_all_moves(driver, wait, game_info="Unknown Game"):
 
     ensure_browser_alive(driver)
 
     logging.info("[PLAY] Waiting for game navigation controls...")
     
-    # SVG path provided by user for the "Next Move" icon
-    next_move_xpath = "//*[local-name()='path' and @d='m13.172 12l-4.95-4.95l1.414-1.413L16 12l-6.364 6.364l-1.414-1.415z']/ancestor::*[local-name()='button' or @role='button']"
+    next_move_xpath = NEXT_MOVE_XPATH
     
     try:
         # Wait until the next move button is present
@@ -324,15 +404,17 @@ def play_all_moves(driver, wait, game_info="Unknown Game"):
         ensure_browser_alive(driver)
         
         try:
+            start = time.monotonic()
             # Re-locate button each time to avoid stale reference
             btn = driver.find_element(By.XPATH, next_move_xpath)
             
             # Check if disabled
             if btn.get_attribute("disabled"):
                 logging.info(f"[PLAY] End of game reached after {move_count} moves.")
-                break
+                return True
             
             btn.click()
+            record_move(time.monotonic() - start)
             move_count += 1
             logging.info(f"[PLAY] [{game_info}] Playing move {move_count}...")
             
@@ -346,6 +428,102 @@ def play_all_moves(driver, wait, game_info="Unknown Game"):
             logging.info(f"[PLAY] Navigation stopped: {e}")
             break
 
+# Installs a scheduler in the page that clicks "Next Move" on a monotonic
+# timer (start + n * delay, so command latency never accumulates) and records
+# progress events until the button is disabled.
+INSTALL_AUTOPLAY_JS = """
+const xpath = arguments[0], delayMs = arguments[1];
+if (window.__autoplay) clearTimeout(window.__autoplay.timer);
+const state = window.__autoplay = {events: [], done: false, ended: false, moves: 0, start: performance.now(), timer: null, waiter: null};
+const find = () => document.evaluate(xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const finish = (ev) => {
+    state.done = true;
+    state.events.push(ev);
+    if (state.waiter) state.waiter();
+};
+const tick = () => {
+    const btn = find();
+    if (!btn) return finish({type: 'error', message: 'next move button disappeared', moves: state.moves});
+    if (btn.disabled || btn.getAttribute('disabled') !== null) {
+        state.ended = true;
+        return finish({type: 'end', moves: state.moves, t: performance.now() - state.start});
+    }
+    const clickStart = performance.now();
+    btn.click();
+    state.moves += 1;
+    state.events.push({type: 'move', n: state.moves, t: performance.now() - state.start,
+                       click: performance.now() - clickStart});
+    const target = state.start + state.moves * delayMs;
+    state.timer = setTimeout(tick, Math.max(0, target - performance.now()));
+};
+state.timer = setTimeout(tick, 0);
+"""
+
+# Long-poll: returns when the game ends or after maxWait ms with the events
+# recorded so far
+POLL_AUTOPLAY_JS = """
+const maxWait = arguments[0], reply = arguments[arguments.length - 1];
+const state = window.__autoplay;
+if (!state) return reply({lost: true, done: true, ended: false, events: [], moves: 0});
+const flush = () => {
+    const events = state.events;
+    state.events = [];
+    state.waiter = null;
+    reply({lost: false, done: state.done, ended: state.ended, events: events, moves: state.moves});
+};
+if (state.done) return flush();
+const timer = setTimeout(flush, maxWait);
+state.waiter = () => { clearTimeout(timer); flush(); };
+"""
+
+def play_all_moves_in_page(driver, wait, game_info="Unknown Game", on_started=None):
+    ensure_browser_alive(driver)
+
+    logging.info("[PLAY] Waiting for game navigation controls...")
+    try:
+        wait.until(EC.presence_of_element_located((By.XPATH, NEXT_MOVE_XPATH)))
+        logging.info("[PLAY] Next move button found.")
+    except:
+        logging.warning("[PLAY] Next move button not found. Game might not have loaded or controls are hidden.")
+        return False
+
+    driver.set_script_timeout(in_page_poll_seconds + 10)
+    driver.execute_script(INSTALL_AUTOPLAY_JS, NEXT_MOVE_XPATH, move_delay * 1000)
+
+    # The page now plays by itself; free WebDriver time can be spent elsewhere
+    if on_started:
+        try:
+            on_started()
+        except Exception as e:
+            logging.error(f"[PLAY] Background task failed: {e}")
+
+    # One async round trip per poll window instead of several commands per move
+    while True:
+        try:
+            result = driver.execute_async_script(POLL_AUTOPLAY_JS, in_page_poll_seconds * 1000)
+        except WebDriverException as e:
+            ensure_browser_alive(driver)
+            logging.info(f"[PLAY] Navigation stopped: {e}")
+            return False
+
+        for event in result["events"]:
+            if event["type"] == "move":
+                record_move(event["click"] / 1000)
+                logging.info(f"[PLAY] [{game_info}] Playing move {event['n']}... (+{event['t'] / 1000:.1f}s)")
+            elif event["type"] == "error":
+                logging.warning(f"[PLAY] Navigation stopped: {event['message']}")
+        log_memory_usage()
+
+        if result["lost"]:
+            logging.warning("[PLAY] In-page scheduler lost (page reloaded?).")
+            return False
+        if result["done"]:
+            # The scheduler also stops on errors; only a real end completes the game
+            if not result["ended"]:
+                return False
+            logging.info(f"[PLAY] End of game reached after {result['moves']} moves.")
+            return True
+
 # ================= LOAD GAME VIA PGN =================
 def load_game_via_pgn(driver, wait, pgn_text):
     ensure_browser_alive(driver)
@@ -469,49 +647,283 @@ def load_game_via_pgn(driver, wait, pgn_text):
             pass
         return False
 
-# ================= MAIN =================
-def start_health_check():
-    port = int(os.environ.get("PORT", 10000))
-    handler = http.server.SimpleHTTPRequestHandler
-    
-    # Simple silent handler
-    class HealthHandler(http.server.BaseHTTPRequestHandler):
-        def do_GET(self):
-            self.send_response(200)
-            self.end_headers()
-            self.wfile.write(b"OK")
-        def log_message(self, format, *args):
-            return # Disable logging to save console noise
-
-    try:
-        with socketserver.TCPServer(("", port), HealthHandler) as httpd:
-            logging.info(f"[SYSTEM] Health check server started on port {port}")
-            httpd.serve_forever()
-    except Exception as e:
-        logging.error(f"[SYSTEM] Health check server failed: {e}")
+# Whole "Load game" dialog flow in one async round trip. Every step waits for
+# the DOM change it needs via MutationObserver, so the load takes as long as
+# the page does; the reply carries per-phase timings or the failing step.
+LOAD_GAME_JS = r"""
+const pgn = arguments[0], timeoutMs = arguments[1], reply = arguments[arguments.length - 1];
+const t0 = performance.now();
+const phases = {};
+let mark = t0, phase = 'open';
+const done = (name) => { const now = performance.now(); phases[name] = Math.round(now - mark); mark = now; };
+const xp = (path, root) => document.evaluate(path, root || document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+const visible = (el) => !!el && el.getClientRects().length > 0;
+const deadline = t0 + timeoutMs;
+const waitFor = (test) => new Promise((resolve, reject) => {
+    const hit = test();
+    if (hit) return resolve(hit);
+    const obs = new MutationObserver(() => {
+        const found = test();
+        if (found) { obs.disconnect(); clearTimeout(timer); resolve(found); }
+    });
+    obs.observe(document.body, {childList: true, subtree: true, attributes: true, characterData: true});
+    const timer = setTimeout(() => { obs.disconnect(); reject(new Error('timed out waiting for ' + phase)); },
+                             Math.max(0, deadline - performance.now()));
+});
+const setValue = (textarea) => {
+    const setter = Object.getOwnPropertyDescriptor(window.HTMLTextAreaElement.prototype, 'value').set;
+    setter.call(textarea, pgn);
+    for (const type of ['input', 'change', 'blur']) textarea.dispatchEvent(new Event(type, {bubbles: true}));
+};
+const openDialog = () => [...document.querySelectorAll("div[role='dialog']")].find(visible);
+const siteError = (dialog) => {
+    const node = xp(".//*[contains(text(), 'Invalid') or contains(text(), 'error') or contains(text(), 'failed')]", dialog);
+    return visible(node) && node.textContent.trim() ? node.textContent.trim() : null;
+};
+(async () => {
+    const opener = xp("//p[contains(text(), 'Load another game')]") ||
+        await waitFor(() => { const b = xp("//button[contains(., 'Load game')]"); return visible(b) && !b.disabled && b; });
+    opener.click();
+    done('open');
+
+    phase = 'select';
+    const select = await waitFor(() => { const el = document.getElementById('dialog-select'); return visible(el) && el; });
+    // MUI selects open on mousedown, not click
+    select.dispatchEvent(new MouseEvent('mousedown', {bubbles: true, button: 0}));
+    const option = await waitFor(() => { const li = xp("//li[contains(text(), 'PGN') or contains(text(), 'pgn')]"); return visible(li) && li; });
+    option.click();
+    done('select');
+
+    phase = 'input';
+    const textarea = await waitFor(() => [...document.querySelectorAll("textarea:not([aria-hidden='true'])")].find(visible));
+    setValue(textarea);
+    const addButton = () => {
+        const dialog = openDialog();
+        const btn = dialog && xp(".//button[contains(@class, 'MuiButton-containedPrimary') and text()='Add']", dialog);
+        return btn && !btn.disabled && btn;
+    };
+    let add = addButton();
+    if (!add) {
+        // Controlled inputs sometimes drop the first synthetic value
+        await new Promise(r => requestAnimationFrame(r));
+        if (textarea.value.length < 10) setValue(textarea);
+        else textarea.dispatchEvent(new Event('input', {bubbles: true}));
+        add = await waitFor(addButton);
+    }
+    done('input');
+
+    phase = 'submit';
+    add.click();
+    const dialog = openDialog();
+    const outcome = await waitFor(() => !visible(dialog) ? {closed: true} : (siteError(dialog) ? {error: siteError(dialog)} : null));
+    done('submit');
+    if (outcome.error) throw new Error('site error: ' + outcome.error);
+    reply({ok: true, error: null, failed_phase: null, phases: phases, total: Math.round(performance.now() - t0)});
+})().catch(e => reply({ok: false, error: String(e.message || e), failed_phase: phase, phases: phases,
+                        total: Math.round(performance.now() - t0)}));
+"""
+
+def load_game_via_script(driver, pgn_text):
+    ensure_browser_alive(driver)
+    driver.set_script_timeout(game_load_timeout + 10)
+    result = driver.execute_async_script(LOAD_GAME_JS, pgn_text, game_load_timeout * 1000)
+    timings = ", ".join(f"{name} {ms}ms" for name, ms in result["phases"].items())
+    if result["ok"]:
+        logging.info(f"[LOAD] Game loaded in {result['total']}ms ({timings})")
+    else:
+        logging.warning(f"[LOAD] Scripted load failed in phase '{result['failed_phase']}' "
+                        f"after {result['total']}ms: {result['error']} ({timings})")
+    return result
+
+def load_game(driver, wait, pgn_text):
+    start = time.monotonic()
+    success = _load_game(driver, wait, pgn_text)
+    if success:
+        GAMES_LOADED.inc()
+        GAME_LOAD_SECONDS.observe(time.monotonic() - start)
+    else:
+        GAMES_FAILED.inc()
+    return success
 
-def keep_alive(url):
-    logging.info(f"[SYSTEM] Self-polling started for {url}")
-    while True:
+def _load_game(driver, wait, pgn_text):
+    if scripted_game_loader:
         try:
-            requests.get(url, timeout=10)
-            logging.info(f"[KEEP-ALIVE] Pinged {url}")
-        except Exception as e:
-            logging.error(f"[KEEP-ALIVE] Failed to ping {url}: {e}")
-        time.sleep(300) # 5 minutes
-
-def main():
-    # Start health check in background thread for Render
-    health_thread = threading.Thread(target=start_health_check, daemon=True)
-    health_thread.start()
-
-    # Start self-polling to prevent spindown
-    app_url = "https://chess-ua0j.onrender.com"
-    keep_alive_thread = threading.Thread(target=keep_alive, args=(app_url,), daemon=True)
-    keep_alive_thread.start()
-
-    ffmpeg_proc = None
+            if load_game_via_script(driver, pgn_text)["ok"]:
+                return True
+        except WebDriverException as e:
+            ensure_browser_alive(driver)
+            logging.warning(f"[LOAD] Scripted load failed: {e}")
+        # Close whatever is half open and retry the step-by-step way
+        try:
+            webdriver.ActionChains(driver).send_keys(Keys.ESCAPE).perform()
+        except:
+            pass
+    return load_game_via_pgn(driver, wait, pgn_text)
 
+# ================= BOARD PINNING =================
+def pin_board(driver):
+    # Aggressively Clean and Pin the board to 0,0
+    try:
+        driver.execute_script("""
+            if (document.getElementById('stream-board-pin')) return;
+            const style = document.createElement('style');
+            style.id = 'stream-board-pin';
+            style.textContent = `
+                header, footer, .adsbox, #header, .MuiAppBar-root, .CookieBanner { display: none !important; }
+                body { background: black !important; overflow: hidden !important; }
+                /* Target the board container and force it to top-left */
+                .cg-board, .chess-board, [class*="board-"], [class*="game-"] {
+                    position: fixed !important;
+                    top: 0 !important;
+                    left: 0 !important;
+                    z-index: 99999 !important;
+                    transform: none !important;
+                }
+            `;
+            document.head.appendChild(style);
+            // Also try scrolling just in case
+            window.scrollTo(0,0);
+        """)
+        time.sleep(2)
+    except:
+        pass
+
+# ================= PRELOAD =================
+# Off-screen X position for the staging window (x11grab only sees 0,0-800x800)
+STAGING_WINDOW_X = 2000
+
+class GamePreloader:
+    # A second browser window parked off-screen. While the live window plays
+    # (in-page scheduler, so WebDriver is idle) the next game is loaded and
+    # pinned there; switching games is then two window moves.
+    def __init__(self, driver, wait, url):
+        self.driver = driver
+        self.wait = wait
+        self.live = driver.current_window_handle
+        driver.switch_to.new_window('window')
+        self.staging = driver.current_window_handle
+        driver.set_window_rect(x=STAGING_WINDOW_X, y=0, width=800, height=800)
+        driver.get(url)
+        driver.switch_to.window(self.live)
+        self.staged_idx = None
+        logging.info("[PRELOAD] Staging window ready.")
+
+    def stage(self, game_idx, pgn):
+        start = time.time()
+        self.staged_idx = None
+        self.driver.switch_to.window(self.staging)
+        try:
+            if load_game(self.driver, self.wait, pgn):
+                pin_board(self.driver)
+                self.staged_idx = game_idx
+                logging.info(f"[PRELOAD] Game {game_idx+1} staged in {time.time() - start:.1f}s")
+            else:
+                logging.warning(f"[PRELOAD] Could not stage game {game_idx+1}; it will load live.")
+        finally:
+            self.driver.switch_to.window(self.live)
+
+    def swap(self):
+        d = self.driver
+        d.switch_to.window(self.staging)
+        d.set_window_rect(x=0, y=0)
+        d.switch_to.window(self.live)
+        d.set_window_rect(x=STAGING_WINDOW_X, y=0)
+        self.live, self.staging = self.staging, self.live
+        d.switch_to.window(self.live)
+        self.staged_idx = None
+        logging.info("[PRELOAD] Swapped to staged game.")
+
+    def run_in_staging(self, fn):
+        self.driver.switch_to.window(self.staging)
+        try:
+            return fn(self.driver)
+        finally:
+            self.driver.switch_to.window(self.live)
+
+def peek_next_game(all_pgns, game_idx):
+    idx = game_idx + 1
+    if idx >= len(all_pgns):
+        if not enable_infinite_loop:
+            return None
+        idx = 0
+    pgn = all_pgns[idx]
+    return (idx, pgn) if validate_pgn(pgn, allow_chess960).ok else None
+
+# ================= MEMORY GOVERNOR =================
+class MemoryGovernor:
+    # Runs at game boundaries only, so a reload or renderer swap costs a few
+    # seconds of idle board instead of an OOM kill mid-stream.
+    def __init__(self, url):
+        self.url = url
+
+    def page_metrics(self, driver):
+        driver.execute_cdp_cmd("Performance.enable", {})
+        result = driver.execute_cdp_cmd("Performance.getMetrics", {})
+        return {m["name"]: m["value"] for m in result["metrics"]}
+
+    def decide(self, container_mb, heap_mb, nodes):
+        if container_mb is not None and container_mb >= governor_recycle_container_mb:
+            return "recycle"
+        if container_mb is not None and container_mb >= governor_reload_container_mb:
+            return "reload"
+        if heap_mb >= governor_js_heap_mb or nodes >= governor_dom_nodes:
+            return "reload"
+        if container_mb is not None and container_mb >= governor_gc_container_mb:
+            return "gc"
+        return None
+
+    def between_games(self, driver):
+        container = memory_sampler.value("cgroup_current")
+        container_mb = None if container is None else container / (1024 * 1024)
+        try:
+            page = self.page_metrics(driver)
+        except WebDriverException as e:
+            ensure_browser_alive(driver)
+            logging.warning(f"[GOVERNOR] DevTools metrics unavailable: {e}")
+            return None
+        heap_mb = page.get("JSHeapUsedSize", 0) / (1024 * 1024)
+        nodes = int(page.get("Nodes", 0))
+        PAGE_JS_HEAP.set(page.get("JSHeapUsedSize", 0))
+        PAGE_DOM_NODES.set(nodes)
+
+        action = self.decide(container_mb, heap_mb, nodes)
+        if action is None:
+            return None
+        container_text = "n/a" if container_mb is None else f"{container_mb:.0f}MB"
+        logging.info(f"[GOVERNOR] Container {container_text}, JS heap {heap_mb:.1f}MB, "
+                     f"{nodes} DOM nodes -> {action}")
+        start = time.time()
+        try:
+            if action == "gc":
+                driver.execute_cdp_cmd("HeapProfiler.collectGarbage", {})
+                GOVERNOR_GCS.inc()
+            elif action == "reload":
+                driver.refresh()
+                time.sleep(3)
+                pin_board(driver)
+                GOVERNOR_RELOADS.inc()
+            else:
+                # A cross-site hop makes Chrome tear down the old renderer process
+                driver.get("about:blank")
+                driver.get(self.url)
+                time.sleep(5)
+                pin_board(driver)
+                GOVERNOR_RECYCLES.inc()
+        except WebDriverException as e:
+            ensure_browser_alive(driver)
+            logging.warning(f"[GOVERNOR] {action} failed: {e}")
+            return None
+        try:
+            after = f"{self.page_metrics(driver).get('JSHeapUsedSize', 0) / (1024 * 1024):.1f}MB"
+        except WebDriverException as e:
+            ensure_browser_alive(driver)
+            logging.warning(f"[GOVERNOR] DevTools metrics unavailable after {action}: {e}")
+            after = "n/a"
+        logging.info(f"[GOVERNOR] {action} done in {time.time() - start:.1f}s, JS heap now {after}")
+        return action
+
+# ================= BROWSER =================
+def create_driver(display=None, headless=False):
     options = webdriver.ChromeOptions()
     options.add_argument("--start-maximized")
     
@@ -525,6 +937,16 @@ def main():
     options.add_argument("--disable-infobars")
     options.add_argument("--disable-notifications")
     options.add_argument("--dns-prefetch-disable")
+
+    if headless or (capture_backend == "screencast" and screencast_headless):
+        # Frames come over DevTools, so nothing needs to be drawn on a display
+        options.add_argument("--headless=new")
+
+    if preload_next_game:
+        # The staging window is off-screen; keep its timers and renderer at full speed
+        options.add_argument("--disable-background-timer-throttling")
+        options.add_argument("--disable-backgrounding-occluded-windows")
+        options.add_argument("--disable-renderer-backgrounding")
     
     # Disable images to save massive RAM (Chess pieces are SVGs/CSS usually, but board backgrounds are often images)
     # If pieces disappear, we can re-enable this.
@@ -549,39 +971,419 @@ def main():
         user_agent = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
         options.add_argument(f"user-agent={user_agent}")
 
-    driver = webdriver.Chrome(options=options)
+    service = None
+    if display:
+        # Per-channel X display; chromedriver hands its environment to Chrome
+        service = Service(env={**os.environ, "DISPLAY": display})
+    driver = webdriver.Chrome(options=options, service=service)
     driver.set_window_size(800, 800)
 
     
     # Log actual size
     size = driver.get_window_size()
     logging.info(f"[SYSTEM] Browser Window Size: {size['width']}x{size['height']}")
+
+    return driver
+
+class BrowserSupervisor:
+    # Owns the live Chrome session and, optionally, a pre-warmed standby parked
+    # off-screen. recover() promotes the standby (or launches a new browser)
+    # after the live session dies; the screen grab keeps running throughout.
+    def __init__(self, url, hot_standby=False, display=None, cpus=None):
+        self.url = url
+        self.hot_standby = hot_standby
+        self.display = display
+        self.cpus = cpus
+        self.driver = self._launch()
+        self.wait = WebDriverWait(self.driver, 20)
+        self.recoveries = 0
+        self._standby = None
+        self._standby_thread = None
+        self._warm_standby()
+
+    def _launch(self, offscreen=False):
+        driver = create_driver(self.display)
+        if self.cpus:
+            # Renderers fork from the zygote, so pinning the tree now covers them
+            pin_processes(driver_pids(driver), self.cpus)
+        if offscreen:
+            driver.set_window_rect(x=STAGING_WINDOW_X, y=0)
+        logging.info(f"Navigating to {self.url}...")
+        driver.get(self.url)
+        # Initial wait
+        time.sleep(5)
+        return driver
+
+    def _warm_standby(self):
+        if not self.hot_standby:
+            return
+        def run():
+            try:
+                self._standby = self._launch(offscreen=True)
+                logging.info("[BROWSER] Standby browser ready.")
+            except Exception as e:
+                logging.error(f"[BROWSER] Could not start standby browser: {e}")
+        self._standby_thread = threading.Thread(target=run, name="browser-standby", daemon=True)
+        self._standby_thread.start()
+
+    def _take_standby(self):
+        if self._standby_thread:
+            self._standby_thread.join()
+            self._standby_thread = None
+        standby, self._standby = self._standby, None
+        if standby is None:
+            return None
+        try:
+            standby.set_window_rect(x=0, y=0)
+            ensure_browser_alive(standby)
+            return standby
+        except WebDriverException:
+            logging.warning("[BROWSER] Standby browser is dead too.")
+            quit_driver(standby)
+            return None
+
+    def alive(self):
+        try:
+            ensure_browser_alive(self.driver)
+            return True
+        except BrowserSessionLost:
+            return False
+
+    def recover(self):
+        start = time.time()
+        self.recoveries += 1
+        BROWSER_RECOVERIES.inc()
+        quit_driver(self.driver)
+        driver = self._take_standby()
+        source = "standby"
+        if driver is None:
+            source = "relaunch"
+            driver = self._launch()
+        self.driver = driver
+        self.wait = WebDriverWait(driver, 20)
+        logging.info(f"[BROWSER] Recovered via {source} in {time.time() - start:.1f}s "
+                     f"(recovery #{self.recoveries})")
+        self._warm_standby()
+        return self.driver, self.wait
+
+    def shutdown(self):
+        if self._standby_thread:
+            self._standby_thread.join()
+        for driver in (self.driver, self._standby):
+            if driver:
+                quit_driver(driver)
+
+def quit_driver(driver):
+    try:
+        driver.quit()
+    except Exception:
+        pass
+
+def make_preloader(driver, wait):
+    if not preload_next_game:
+        return None
+    if not in_page_playback:
+        logging.warning("[PRELOAD] preload_next_game needs in_page_playback; disabled.")
+        return None
+    return GamePreloader(driver, wait, chesskit_url)
+
+# ================= MULTI-STREAM =================
+class Channel:
+    # One independent stream: its own players, output, X display and cores
+    def __init__(self, name, players, stream_key, output_file, pgn_file="", display=None, cpus=None):
+        self.name = name
+        self.players = list(players)
+        self.stream_key = stream_key
+        self.output_file = output_file
+        self.pgn_file = pgn_file
+        self.display = display
+        self.cpus = cpus
+        # Log/file tags stay empty for the classic single stream
+        self.prefix = f"[{name}] " if channels else ""
+        self.suffix = f"_{name}" if channels else ""
+
+def driver_pids(driver):
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        return [root.pid] + [p.pid for p in root.children(recursive=True)]
+    except (AttributeError, psutil.Error):
+        return []
+
+def pin_processes(pids, cpus):
+    for pid in pids:
+        try:
+            psutil.Process(pid).cpu_affinity(list(cpus))
+        except (psutil.Error, AttributeError, ValueError) as e:
+            logging.warning(f"[SCHEDULER] Could not pin pid {pid} to cores {cpus}: {e}")
+
+def display_running(display):
+    return os.path.exists(f"/tmp/.X11-unix/X{display.lstrip(':').split('.')[0]}")
+
+class ChannelScheduler:
+    # Runs every channel on its own thread inside this process, so the
+    # health server, metrics, API cache and Python runtime are shared. Each
+    # channel gets an Xvfb display and a slice of the CPU budget for its
+    # Chrome and ffmpeg; channels that crash are restarted with backoff.
+    def __init__(self, configs):
+        self.configs = list(configs)
+        self.xvfb = []
+        self.threads = {}
+
+    def core_slices(self, count):
+        cores = list(multi_stream_cpus) if multi_stream_cpus else sorted(psutil.Process().cpu_affinity())
+        if count <= len(cores):
+            per = len(cores) // count
+            return [cores[i * per:(i + 1) * per] for i in range(count)]
+        # More channels than cores: share round-robin
+        return [[cores[i % len(cores)]] for i in range(count)]
+
+    def build_channels(self):
+        limit = max(1, multi_stream_memory_mb // channel_memory_mb)
+        configs = self.configs
+        if len(configs) > limit:
+            logging.warning(f"[SCHEDULER] Memory budget {multi_stream_memory_mb}MB fits {limit} channels; "
+                            f"not starting {', '.join(c.get('name', '?') for c in configs[limit:])}")
+            configs = configs[:limit]
+        slices = self.core_slices(len(configs))
+        result = []
+        for idx, (config, cpus) in enumerate(zip(configs, slices)):
+            name = config.get("name", f"ch{idx}")
+            if stream_to_youtube and not config.get("stream_key"):
+                # Two encoders on one key would fight over the same broadcast
+                logging.error(f"[SCHEDULER] Channel {name} has no stream_key; not starting it.")
+                continue
+            result.append(Channel(
+                name,
+                config.get("players", players),
+                config.get("stream_key"),
+                config.get("output_file", os.path.join(os.getcwd(), f"chess_games_recording_{name}.mkv")),
+                config.get("pgn_file", ""),
+                display=config.get("display", f":{first_channel_display + idx}"),
+                cpus=config.get("cpus", cpus),
+            ))
+        return result
+
+    def start_display(self, display):
+        if display_running(display):
+            return
+        logging.info(f"[SCHEDULER] Starting Xvfb on {display}")
+        proc = subprocess.Popen(["Xvfb", display, "-ac", "-screen", "0", "800x800x16"],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        self.xvfb.append(proc)
+        for _ in range(50):
+            if display_running(display):
+                return
+            time.sleep(0.1)
+        logging.warning(f"[SCHEDULER] Xvfb on {display} did not come up in 5s")
+
+    def _run(self, channel):
+        backoff = 5
+        while True:
+            start = time.time()
+            try:
+                run_channel(channel)
+                logging.info(f"[SCHEDULER] Channel {channel.name} finished.")
+                return
+            except Exception as e:
+                logging.error(f"[SCHEDULER] Channel {channel.name} crashed: {e}")
+            # Reset the backoff after a long healthy run
+            backoff = 5 if time.time() - start > 600 else min(backoff * 2, 300)
+            logging.info(f"[SCHEDULER] Restarting channel {channel.name} in {backoff}s")
+            time.sleep(backoff)
+
+    def run(self):
+        try:
+            for channel in self.build_channels():
+                if render_mode != "native":
+                    self.start_display(channel.display)
+                logging.info(f"[SCHEDULER] Channel {channel.name}: display {channel.display}, "
+                             f"cores {channel.cpus}, players {', '.join(channel.players)}")
+                thread = threading.Thread(target=self._run, args=(channel,), name=f"channel-{channel.name}", daemon=True)
+                thread.start()
+                self.threads[channel.name] = thread
+            for thread in self.threads.values():
+                thread.join()
+        finally:
+            for proc in self.xvfb:
+                proc.terminate()
+
+# ================= MAIN =================
+def start_health_check():
+    port = int(os.environ.get("PORT", 10000))
+    handler = http.server.SimpleHTTPRequestHandler
     
-    wait = WebDriverWait(driver, 20)
+    # Simple silent handler
+    class HealthHandler(http.server.BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] == "/metrics":
+                body = metrics.REGISTRY.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", metrics.CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+            self.send_response(200)
+            self.end_headers()
+            self.wfile.write(b"OK")
+        def log_message(self, format, *args):
+            return # Disable logging to save console noise
 
     try:
-        logging.info("Navigating to chesskit.org...")
-        driver.get("https://chesskit.org/")
-        
-        # Log resolution
-        w = driver.execute_script("return window.innerWidth;")
-        h = driver.execute_script("return window.innerHeight;")
-        logging.info(f"[SYSTEM] Viewport Size: {w}x{h}")
+        with socketserver.TCPServer(("", port), HealthHandler) as httpd:
+            logging.info(f"[SYSTEM] Health check server started on port {port}")
+            httpd.serve_forever()
+    except Exception as e:
+        logging.error(f"[SYSTEM] Health check server failed: {e}")
 
+def keep_alive(url):
+    logging.info(f"[SYSTEM] Self-polling started for {url}")
+    while True:
+        try:
+            requests.get(url, timeout=10)
+            logging.info(f"[KEEP-ALIVE] Pinged {url}")
+        except Exception as e:
+            logging.error(f"[KEEP-ALIVE] Failed to ping {url}: {e}")
+        time.sleep(300) # 5 minutes
+
+def load_store_playlist(channel):
+    store = GameStore(game_store_path)
+    # Rows already in the store from earlier runs are playable at once
+    playlist = StorePlaylist(store, game_store_query)
+    if channel.pgn_file:
+        store.import_archive(channel.pgn_file)
+        playlist.refresh()
+        playlist.mark_complete()
+    elif fetch_all_archives:
+        # Months are imported as they land; start as soon as one game matches
+        ArchiveFetcher(api_cache, channel.players, playlist, fetch_workers).start()
+        playlist.wait_for(1)
+    else:
+        for player in channel.players:
+            try:
+                store.import_month(api_cache, player, target_year, target_month)
+            except Exception as e:
+                logging.error(f"[API] Failed to fetch games for {player}: {e}")
+        playlist.refresh()
+        playlist.mark_complete()
+    return playlist
+
+def load_playlist(channel, refresh=True):
+    if game_store_path:
+        return load_store_playlist(channel)
+    if channel.pgn_file:
+        return PgnArchive(channel.pgn_file, transform=format_pgn_to_standard)
+    if fetch_all_archives or len(channel.players) > 1:
+        # Months stream into the playlist; start as soon as the first one lands
+        all_pgns = CompactPlaylist() if compact_playlist else Playlist()
+        ArchiveFetcher(api_cache, channel.players, all_pgns, fetch_workers).start()
+        all_pgns.wait_for(1)
+        # Every archive is fetched; only the current month can still grow
+        months = None
+    else:
+        pgns = fetch_pgns(channel.players[0], target_year, target_month)
+        all_pgns = CompactPlaylist(pgns) if compact_playlist else Playlist(pgns)
+        all_pgns.mark_complete()
+        months = [(target_year, target_month)]
+    if refresh and playlist_refresh_seconds and all_pgns:
+        PlaylistRefresher(api_cache, channel.players, all_pgns, playlist_refresh_seconds, months).start()
+    return all_pgns
+
+def render_offline():
+    channel = Channel("main", players, youtube_stream_key, output_file, pgn_file)
+    all_pgns = load_playlist(channel, refresh=False)
+    if isinstance(all_pgns, Playlist):
+        # A VOD needs every month, not just the first to arrive
+        all_pgns.wait_for(sys.maxsize)
+    render_playlist(list(all_pgns), output_file, move_delay, native_board_size,
+                    workers=offline_render_workers, allow_chess960=allow_chess960,
+                    static_scene=static_scene_encoding)
+
+def segment_settings():
+    # Everything that changes the encoded bytes (capture, timing, scene,
+    # overlays, encoder); a change re-encodes every game
+    return {
+        "version": 2,
+        "scene": stream_scene.scene_settings(static_scene_encoding),
+        "render_mode": render_mode,
+        "capture_backend": capture_backend,
+        "move_delay": move_delay,
+        "native_board_size": native_board_size,
+        "native_fps": native_fps,
+        "auto_board_region": auto_board_region,
+        "static_scene_encoding": static_scene_encoding,
+        "static_scene_max_hold": static_scene_max_hold,
+    }
+
+def main():
+    if offline_render and not stream_to_youtube:
+        render_offline()
+        return
+
+    # Start health check in background thread for Render
+    health_thread = threading.Thread(target=start_health_check, daemon=True)
+    health_thread.start()
+
+    memory_sampler.start()
+
+    # Start self-polling to prevent spindown
+    app_url = "https://chess-ua0j.onrender.com"
+    keep_alive_thread = threading.Thread(target=keep_alive, args=(app_url,), daemon=True)
+    keep_alive_thread.start()
+
+    if channels:
+        ChannelScheduler(channels).run()
+    else:
+        run_channel(Channel("main", players, youtube_stream_key, output_file, pgn_file))
+
+def run_channel(channel):
+    ffmpeg_proc = None
+    board_region = None
+    relay = cache = tee = None
+    output_args = stream_output_args(stream_to_youtube, youtube_stream_url, channel.stream_key, channel.output_file)
+    if segment_cache_enabled:
+        cache = SegmentCache(segment_cache_dir)
+        relay = SegmentRelay(output_args)
+
+    supervisor = driver = wait = None
+    renderer = pacer = None
+    preloader = governor = None
+    if render_mode == "native":
+        renderer = BoardRenderer(native_board_size)
+    else:
+        supervisor = BrowserSupervisor(chesskit_url, browser_hot_standby, channel.display, channel.cpus)
+        driver, wait = supervisor.driver, supervisor.wait
+        if memory_governor:
+            governor = MemoryGovernor(chesskit_url)
+
+    try:
+        if driver:
+            # Log resolution
+            w = driver.execute_script("return window.innerWidth;")
+            h = driver.execute_script("return window.innerHeight;")
+            logging.info(f"[SYSTEM] Viewport Size: {w}x{h}")
+
+            preloader = make_preloader(driver, wait)
         
-        # Initial wait
-        time.sleep(5) 
-        
-        all_pgns = fetch_pgns(username, target_year, target_month)
+        all_pgns = load_playlist(channel)
         if not all_pgns:
             logging.error("No games found from API.")
             return
 
         game_idx = 0
+        played_this_pass = 0
         while True:
+            if game_idx >= len(all_pgns) and isinstance(all_pgns, Playlist) and not enable_infinite_loop:
+                # Months still in flight: wait for them rather than ending early
+                all_pgns.wait_for(game_idx + 1)
             if game_idx >= len(all_pgns):
                 if enable_infinite_loop:
+                    if not played_this_pass:
+                        logging.error(f"[VALIDATE] No playable game in {len(all_pgns)}; "
+                                      f"retrying in {empty_pass_backoff_seconds}s.")
+                        time.sleep(empty_pass_backoff_seconds)
                     game_idx = 0
+                    played_this_pass = 0
                     logging.info("Looping back to first game.")
                 else:
                     logging.info("All games played.")
@@ -594,67 +1396,177 @@ def main():
             black = re.search(r'\[Black "(.*?)"\]', pgn)
             white_name = white.group(1) if white else "White"
             black_name = black.group(1) if black else "Black"
-            game_info = f"{white_name} vs {black_name} ({game_idx+1}/{len(all_pgns)})"
+            game_info = f"{channel.prefix}{white_name} vs {black_name} ({game_idx+1}/{len(all_pgns)})"
             
+            # Reject unplayable games in milliseconds instead of via the load dialog
+            check = validate_pgn(pgn, allow_chess960)
+            if not check.ok:
+                logging.warning(f"[VALIDATE] Skipping game {game_idx+1} ({game_info}): {check.error}")
+                GAMES_SKIPPED.inc()
+                game_idx += 1
+                continue
+            logging.info(f"[VALIDATE] {check.plies} plies, final position {check.final_fen}")
+
+            if relay:
+                if relay.proc.poll() is not None:
+                    logging.error(f"[RELAY] Exited with code {relay.proc.returncode}; restarting.")
+                    relay = SegmentRelay(output_args)
+                    FFMPEG_RESTARTS.inc()
+                key = segment_key(pgn, segment_settings())
+                cached = cache.lookup(key)
+                if cached:
+                    logging.info(f"[CACHE] Replaying {game_info} from the segment cache")
+                    if relay.play_file(*cached):
+                        played_this_pass += 1
+                        game_idx += 1
+                        continue
+                    # Unreadable segment: encode the game live again
+
             logging.info(f"playing game {game_info}")
             log_memory_usage()
+            if ffmpeg_proc and ffmpeg_proc.poll() is not None:
+                logging.error(f"[FFMPEG] Exited with code {ffmpeg_proc.returncode}; restarting.")
+                ffmpeg_proc.telemetry.stop()
+                if ffmpeg_proc.capture:
+                    ffmpeg_proc.capture.stop()
+                ffmpeg_proc = None
+                FFMPEG_RESTARTS.inc()
+            if ffmpeg_proc:
+                logging.info(f"[FFMPEG] {ffmpeg_proc.telemetry.summary()}")
 
             
-            success = load_game_via_pgn(driver, wait, pgn)
-            
-            if success:
-                 # Aggressively Clean and Pin the board to 0,0
-                 try:
-                     driver.execute_script("""
-                        const style = document.createElement('style');
-                        style.textContent = `
-                            header, footer, .adsbox, #header, .MuiAppBar-root, .CookieBanner { display: none !important; }
-                            body { background: black !important; overflow: hidden !important; }
-                            /* Target the board container and force it to top-left */
-                            .cg-board, .chess-board, [class*="board-"], [class*="game-"] {
-                                position: fixed !important;
-                                top: 0 !important;
-                                left: 0 !important;
-                                z-index: 99999 !important;
-                                transform: none !important;
-                            }
-                        `;
-                        document.head.appendChild(style);
-                        // Also try scrolling just in case
-                        window.scrollTo(0,0);
-                     """)
-                     time.sleep(2)
-                 except:
-                     pass
-
-                 # Debug screenshot
-
-
-
-                 try:
-                     driver.save_screenshot(os.path.join(os.getcwd(), "debug_board.png"))
-                     logging.info(f"[DEBUG] Screenshot saved to debug_board.png")
-                 except:
-                     pass
-                     
-                 if ffmpeg_proc is None:
+            if renderer:
+                if ffmpeg_proc is None:
                     ffmpeg_proc = start_screen_recording(
                         stream_to_youtube,
                         youtube_stream_url,
-                        youtube_stream_key,
-                        output_file
+                        channel.stream_key,
+                        channel.output_file,
+                        raw_frame_size=(renderer.size, renderer.size),
+                        raw_framerate=native_fps,
+                        cpus=channel.cpus,
+                        segment_offset=relay.clock if relay else None
                     )
-                 play_all_moves(driver, wait, game_info)
-            else:
-                 logging.warning(f"Skipping game {game_idx+1} due to load failure.")
-            
+                    pacer = FramePacer(ffmpeg_proc.stdin, native_fps)
+                    if relay:
+                        tee = SegmentTee(ffmpeg_proc, relay, cache, key)
+                complete = False
+                played_this_pass += 1
+                try:
+                    stream_game(pacer, renderer, pgn, move_delay, game_info)
+                    complete = True
+                except (BrokenPipeError, OSError) as e:
+                    # ffmpeg died mid-game (e.g. RTMP drop); a new one starts with the next game
+                    logging.error(f"[FFMPEG] Frame pipe closed during {game_info}: {e}; restarting.")
+                    if not tee:
+                        stop_screen_recording(ffmpeg_proc)
+                        ffmpeg_proc = None
+                    FFMPEG_RESTARTS.inc()
+                    time.sleep(1)
+                finally:
+                    if tee:
+                        ffmpeg_proc = finish_segment(ffmpeg_proc, tee, complete, game_info)
+                        tee = None
+                game_idx += 1
+                continue
+
+            try:
+                staged = preloader is not None and preloader.staged_idx == game_idx
+                if staged:
+                    # Next game was loaded and pinned off-screen while the last one played
+                    preloader.swap()
+                    success = True
+                    # The finished game's window is off-screen now; tidy it up there
+                    if governor:
+                        preloader.run_in_staging(governor.between_games)
+                else:
+                    if governor:
+                        governor.between_games(driver)
+                    success = load_game(driver, wait, pgn)
+                    if success:
+                        pin_board(driver)
+
+                if success:
+                     played_this_pass += 1
+                     # Debug screenshot
+                     try:
+                         driver.save_screenshot(os.path.join(os.getcwd(), f"debug_board{channel.suffix}.png"))
+                         logging.info(f"[DEBUG] Screenshot saved to debug_board{channel.suffix}.png")
+                     except:
+                         pass
+                     
+                     if ffmpeg_proc is None:
+                        screencast = capture_backend == "screencast"
+                        if auto_board_region and board_region is None:
+                            board_region = detect_board_region(
+                                driver, channel.display or os.environ.get("DISPLAY", ":99"), screen=not screencast)
+                        ffmpeg_proc = start_screen_recording(
+                            stream_to_youtube,
+                            youtube_stream_url,
+                            channel.stream_key,
+                            channel.output_file,
+                            display=channel.display,
+                            cpus=channel.cpus,
+                            image_pipe=screencast,
+                            board_region=board_region,
+                            segment_offset=relay.clock if relay else None
+                        )
+                        if relay:
+                            tee = SegmentTee(ffmpeg_proc, relay, cache, key)
+                     capture = ffmpeg_proc.capture
+                     if capture and capture.target != driver.current_window_handle:
+                         # New window after a preload swap or a browser recovery
+                         capture.attach(driver)
+                     if in_page_playback:
+                         on_started = None
+                         if preloader:
+                             next_game = peek_next_game(all_pgns, game_idx)
+                             if next_game and cache and cache.lookup(segment_key(next_game[1], segment_settings())):
+                                 # Replayed from disk; nothing to stage
+                                 next_game = None
+                             if next_game:
+                                 on_started = lambda: preloader.stage(*next_game)
+                         complete = play_all_moves_in_page(driver, wait, game_info, on_started)
+                     else:
+                         complete = play_all_moves(driver, wait, game_info)
+                     if tee:
+                         ffmpeg_proc = finish_segment(ffmpeg_proc, tee, complete, game_info)
+                         tee = None
+                else:
+                     logging.warning(f"Skipping game {game_idx+1} due to load failure.")
+            except WebDriverException as e:
+                if tee:
+                    # The partial game already went out; it just is not cached
+                    ffmpeg_proc = finish_segment(ffmpeg_proc, tee, False, game_info)
+                    tee = None
+                if supervisor.alive():
+                    # Transient error (timeout, window rect, CDP call): skip the game
+                    logging.error(f"[BROWSER] {e}; skipping game {game_idx+1}")
+                    if preloader:
+                        # The staging window may be half-swapped; load the next game live
+                        preloader.staged_idx = None
+                    game_idx += 1
+                    time.sleep(1)
+                    continue
+                # Same game_idx again on a fresh browser; ffmpeg keeps grabbing the display
+                logging.error(f"[BROWSER] {e}; recovering and resuming at game {game_idx+1}")
+                driver, wait = supervisor.recover()
+                preloader = make_preloader(driver, wait)
+                continue
+
             game_idx += 1
-            # Small buffer between games
-            time.sleep(1)
+            # Small buffer between games (a staged swap needs none)
+            if preloader is None or preloader.staged_idx is None:
+                time.sleep(1)
 
     finally:
         stop_screen_recording(ffmpeg_proc)
-        driver.quit()
+        if tee:
+            tee.finish(False)
+        if relay:
+            relay.close()
+        if supervisor:
+            supervisor.shutdown()
 
 if __name__ == "__main__":
     main()
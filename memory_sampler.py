@@ -0,0 +1,229 @@
+import collections
+import logging
+import os
+import threading
+import time
+
+import psutil
+
+# ================= MEMORY SAMPLER =================
+# A background thread samples container memory (cgroup v1/v2 memory.stat),
+# per-process-group PSS from /proc/<pid>/smaps_rollup and memory pressure
+# (PSI) into a bounded ring buffer. Playback code only reads the latest
+# sample. PSS splits shared pages between their users, so the per-group
+# figures add up instead of double counting Chrome's shared memory like
+# summed RSS does.
+
+CGROUP_V2 = "/sys/fs/cgroup"
+CGROUP_V1 = "/sys/fs/cgroup/memory"
+
+# Process groups reported separately; anything else is left out
+PROCESS_GROUPS = ("chrome", "chromedriver", "ffmpeg", "python")
+
+MB = 1024 * 1024
+
+
+def _read_int(path):
+    try:
+        with open(path, "r") as f:
+            value = f.read().strip()
+    except OSError:
+        return None
+    return None if value == "max" else int(value)
+
+def _read_stat(path):
+    stats = {}
+    try:
+        with open(path, "r") as f:
+            for line in f:
+                key, _, value = line.partition(" ")
+                stats[key] = int(value)
+    except (OSError, ValueError):
+        return None
+    return stats
+
+def read_cgroup_memory():
+    # Normalized to v2 names: current, max, anon, file, shmem (bytes)
+    stat = _read_stat(os.path.join(CGROUP_V2, "memory.stat"))
+    if stat is not None and os.path.exists(os.path.join(CGROUP_V2, "memory.current")):
+        return {
+            "current": _read_int(os.path.join(CGROUP_V2, "memory.current")),
+            "max": _read_int(os.path.join(CGROUP_V2, "memory.max")),
+            "anon": stat.get("anon"),
+            "file": stat.get("file"),
+            "shmem": stat.get("shmem"),
+        }
+    stat = _read_stat(os.path.join(CGROUP_V1, "memory.stat"))
+    if stat is not None:
+        limit = _read_int(os.path.join(CGROUP_V1, "memory.limit_in_bytes"))
+        return {
+            "current": _read_int(os.path.join(CGROUP_V1, "memory.usage_in_bytes")),
+            # v1 reports "no limit" as a huge page-aligned number
+            "max": limit if limit is not None and limit < 1 << 60 else None,
+            # total_* include child cgroups, matching usage_in_bytes
+            "anon": stat.get("total_rss", stat.get("rss")),
+            "file": stat.get("total_cache", stat.get("cache")),
+            "shmem": stat.get("total_shmem", stat.get("shmem")),
+        }
+    return None
+
+def read_psi():
+    # {"some_avg10": 0.0, "some_avg60": ..., "full_avg10": ...} or None
+    for path in (os.path.join(CGROUP_V2, "memory.pressure"), "/proc/pressure/memory"):
+        try:
+            with open(path, "r") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            continue
+        psi = {}
+        for line in lines:
+            kind, *fields = line.split()
+            for field in fields:
+                key, _, value = field.partition("=")
+                if key.startswith("avg"):
+                    psi[f"{kind}_{key}"] = float(value)
+        return psi
+    return None
+
+def read_pss(pid):
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", "r") as f:
+            for line in f:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+def process_group(proc, own_pid):
+    if proc.pid == own_pid:
+        return "python"
+    try:
+        name = proc.name().lower()
+    except psutil.Error:
+        return None
+    if "chromedriver" in name:
+        return "chromedriver"
+    if "chrome" in name:
+        return "chrome"
+    if "ffmpeg" in name:
+        return "ffmpeg"
+    return None
+
+def read_process_pss():
+    # This process and its descendants only (chromedriver -> chrome, ffmpeg),
+    # so other channels and services on the host are not counted
+    own = psutil.Process(os.getpid())
+    try:
+        procs = [own] + own.children(recursive=True)
+    except psutil.Error:
+        procs = [own]
+    totals = dict.fromkeys(PROCESS_GROUPS, 0)
+    counts = dict.fromkeys(PROCESS_GROUPS, 0)
+    for proc in procs:
+        group = process_group(proc, own.pid)
+        if group is None:
+            continue
+        pss = read_pss(proc.pid)
+        if pss is None:
+            continue
+        totals[group] += pss
+        counts[group] += 1
+    return totals, counts
+
+
+class MemorySampler:
+    def __init__(self, interval=5.0, history=720):
+        self.interval = interval
+        self.samples = collections.deque(maxlen=history)
+        self.peaks = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.thread = None
+
+    def sample(self):
+        sample = {"t": time.time(), "cgroup": read_cgroup_memory(), "psi": read_psi()}
+        sample["pss"], sample["procs"] = read_process_pss()
+        with self._lock:
+            self.samples.append(sample)
+            for key, value in self._flat(sample).items():
+                if value is not None and value > self.peaks.get(key, float("-inf")):
+                    self.peaks[key] = value
+        return sample
+
+    @staticmethod
+    def _flat(sample):
+        flat = {f"pss_{group}": value for group, value in sample["pss"].items()}
+        flat["pss_total"] = sum(sample["pss"].values())
+        for key, value in (sample["cgroup"] or {}).items():
+            flat[f"cgroup_{key}"] = value
+        for key, value in (sample["psi"] or {}).items():
+            flat[f"psi_{key}"] = value
+        return flat
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.sample()
+            except Exception as e:
+                logging.error(f"[MEMORY] Sampling failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="memory-sampler", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+    def latest(self):
+        with self._lock:
+            return self.samples[-1] if self.samples else None
+
+    def value(self, key):
+        sample = self.latest()
+        return None if sample is None else self._flat(sample).get(key)
+
+    def history(self):
+        with self._lock:
+            return list(self.samples)
+
+    def trend(self, key, window=600.0):
+        # Least-squares slope of `key` in units per minute over the last `window` seconds
+        with self._lock:
+            points = [(s["t"], self._flat(s).get(key)) for s in self.samples]
+        if not points:
+            return None
+        cutoff = points[-1][0] - window
+        points = [(t, v) for t, v in points if t >= cutoff and v is not None]
+        # Too short a span is just sampling noise
+        if len(points) < 3 or points[-1][0] - points[0][0] < min(window / 4, 60.0):
+            return None
+        n = len(points)
+        mean_t = sum(t for t, _ in points) / n
+        mean_v = sum(v for _, v in points) / n
+        var = sum((t - mean_t) ** 2 for t, _ in points)
+        if not var:
+            return 0.0
+        return sum((t - mean_t) * (v - mean_v) for t, v in points) / var * 60.0
+
+    def summary(self):
+        sample = self.latest()
+        if sample is None:
+            return "no samples yet"
+        parts = []
+        cg = sample["cgroup"]
+        if cg:
+            limit = f" / {cg['max'] / MB:.0f}MB" if cg["max"] else ""
+            parts.append(f"Container {cg['current'] / MB:.1f}MB{limit} (anon {(cg['anon'] or 0) / MB:.0f}, "
+                         f"file {(cg['file'] or 0) / MB:.0f}, shmem {(cg['shmem'] or 0) / MB:.0f})")
+            trend = self.trend("cgroup_current")
+            if trend is not None:
+                parts.append(f"trend {trend / MB:+.2f}MB/min, peak {self.peaks.get('cgroup_current', 0) / MB:.1f}MB")
+        pss = " ".join(f"{group} {sample['pss'][group] / MB:.1f}" for group in PROCESS_GROUPS
+                       if sample["procs"][group])
+        parts.append(f"PSS MB: {pss or 'n/a'}")
+        if sample["psi"]:
+            parts.append(f"PSI some {sample['psi'].get('some_avg10', 0):.2f}% full {sample['psi'].get('full_avg10', 0):.2f}%")
+        return " | ".join(parts)
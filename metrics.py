@@ -0,0 +1,167 @@
+import bisect
+import collections
+import threading
+import time
+
+# ================= METRICS =================
+# Minimal Prometheus instruments (text exposition format 0.0.4). Updates are
+# a lock and an add, so playback code can record freely; everything derived
+# (rates, memory, ffmpeg state) is computed by callbacks at scrape time on the
+# health server's thread.
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, value in metric.samples():
+                lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.value = 0
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def inc(self, amount=1):
+        with self._lock:
+            self.value += amount
+
+    def samples(self):
+        return [(self.name, self.value)]
+
+
+class Gauge:
+    # Either set() directly or backed by a callback evaluated at scrape time
+    kind = "gauge"
+
+    def __init__(self, name, help, callback=None, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.value = 0
+        registry.register(self)
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        if self.callback is None:
+            return [(self.name, self.value)]
+        try:
+            value = self.callback()
+        except Exception:
+            return []
+        return [] if value is None else [(self.name, value)]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+        registry.register(self)
+
+    def observe(self, value):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[idx] += 1
+            self._sum += value
+
+    def samples(self):
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        out = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            out.append((f'{self.name}_bucket{{le="{_format_value(float(bound))}"}}', cumulative))
+        out.append((f"{self.name}_sum", total))
+        out.append((f"{self.name}_count", cumulative))
+        return out
+
+
+class RateWindow:
+    # Events per minute over a sliding window, for moves-per-minute style gauges
+    def __init__(self, window=60.0):
+        self.window = window
+        self._events = collections.deque()
+        self._lock = threading.Lock()
+
+    def mark(self):
+        with self._lock:
+            self._events.append(time.monotonic())
+
+    def per_minute(self):
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            while self._events and self._events[0] < cutoff:
+                self._events.popleft()
+            return len(self._events) * 60.0 / self.window
+
+
+# ================= APPLICATION INSTRUMENTS =================
+GAMES_LOADED = Counter("chess_games_loaded_total", "Games loaded onto the board")
+GAMES_FAILED = Counter("chess_games_failed_total", "Games whose load failed")
+GAMES_SKIPPED = Counter("chess_games_skipped_total", "Games skipped by validation")
+GAME_LOAD_SECONDS = Histogram("chess_game_load_seconds", "Time to load one game onto the board")
+MOVES = Counter("chess_moves_total", "Moves advanced")
+MOVE_ADVANCE_SECONDS = Histogram(
+    "chess_move_advance_seconds", "Time to advance the board by one move",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+MOVE_RATE = RateWindow()
+MOVES_PER_MINUTE = Gauge("chess_moves_per_minute", "Moves advanced over the last minute", MOVE_RATE.per_minute)
+API_FETCH_SECONDS = Histogram("chess_api_fetch_seconds", "chess.com API request latency")
+API_FETCH_ERRORS = Counter("chess_api_fetch_errors_total", "chess.com API requests that failed")
+FFMPEG_RESTARTS = Counter("chess_ffmpeg_restarts_total", "ffmpeg processes restarted after exiting")
+BROWSER_RECOVERIES = Counter("chess_browser_recoveries_total", "Browser sessions replaced after a crash")
+GOVERNOR_GCS = Counter("chess_governor_gc_total", "Forced garbage collections in the board page")
+GOVERNOR_RELOADS = Counter("chess_governor_reloads_total", "Board page reloads for memory")
+GOVERNOR_RECYCLES = Counter("chess_governor_recycles_total", "Renderer recycles for memory")
+PAGE_JS_HEAP = Gauge("chess_page_js_heap_bytes", "Used JS heap of the board page at the last game boundary")
+PAGE_DOM_NODES = Gauge("chess_page_dom_nodes", "DOM nodes of the board page at the last game boundary")
+
+
+def record_move(seconds):
+    MOVES.inc()
+    MOVE_RATE.mark()
+    MOVE_ADVANCE_SECONDS.observe(seconds)
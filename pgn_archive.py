@@ -0,0 +1,128 @@
+import logging
+import mmap
+import os
+import re
+import struct
+from array import array
+
+# ================= PGN ARCHIVE =================
+# Games are located by byte offset inside a memory-mapped PGN file, so a
+# multi-hundred MB dump costs one index entry (8 bytes) per game instead of a
+# Python string per game. The index is persisted next to the file.
+
+INDEX_SUFFIX = ".idx"
+INDEX_MAGIC = b"PGNIDX1\0"
+INDEX_HEADER = struct.Struct("<8sQQQ")  # magic, file size, mtime_ns, game count
+
+# A game starts on a "[" line whose preceding non-blank line is not a tag
+# line (tag lines end with "]", move text ends with a result or a move).
+GAME_START_RE = re.compile(rb"[^\]\s]\s*\n(?=\[)")
+HEADER_RE = re.compile(r'\[(\w+) "(.*)"\]')
+
+
+class PgnArchive:
+    def __init__(self, path, transform=None, persist_index=True):
+        self.path = path
+        self.transform = transform
+        self.persist_index = persist_index
+        self._file = open(path, "rb")
+        self._size = os.fstat(self._file.fileno()).st_size
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._size else None
+        self._headers = {}
+        self._offsets = self._load_index()
+        if self._offsets is None:
+            self._offsets = self._scan()
+            if self.persist_index:
+                self._save_index()
+        logging.info(f"[ARCHIVE] {os.path.basename(path)}: {len(self)} games indexed")
+
+    # ---------- index ----------
+    @property
+    def index_path(self):
+        return self.path + INDEX_SUFFIX
+
+    def _stamp(self):
+        return self._size, os.stat(self.path).st_mtime_ns
+
+    def _scan(self):
+        offsets = array("Q")
+        if self._mm is None:
+            return offsets
+        first = self._mm.find(b"[")
+        if first < 0:
+            return offsets
+        offsets.append(first)
+        for m in GAME_START_RE.finditer(self._mm, first):
+            offsets.append(m.end())
+        offsets.append(self._size)
+        return offsets
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "rb") as f:
+                magic, size, mtime_ns, count = INDEX_HEADER.unpack(f.read(INDEX_HEADER.size))
+                if magic != INDEX_MAGIC or (size, mtime_ns) != self._stamp():
+                    return None
+                offsets = array("Q")
+                offsets.fromfile(f, count + 1 if count else 0)
+                return offsets
+        except (OSError, EOFError, struct.error):
+            return None
+
+    def _save_index(self):
+        size, mtime_ns = self._stamp()
+        tmp_path = self.index_path + ".tmp"
+        try:
+            with open(tmp_path, "wb") as f:
+                f.write(INDEX_HEADER.pack(INDEX_MAGIC, size, mtime_ns, len(self)))
+                self._offsets.tofile(f)
+            os.replace(tmp_path, self.index_path)
+        except OSError as e:
+            logging.warning(f"[ARCHIVE] Could not persist index {self.index_path}: {e}")
+
+    # ---------- access ----------
+    def __len__(self):
+        return max(len(self._offsets) - 1, 0)
+
+    def raw(self, idx):
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("game index out of range")
+        return self._mm[self._offsets[idx]:self._offsets[idx + 1]].decode("utf-8", "replace").strip()
+
+    def __getitem__(self, idx):
+        text = self.raw(idx)
+        return self.transform(text) if self.transform else text
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def headers(self, idx):
+        if idx < 0:
+            idx += len(self)
+        cached = self._headers.get(idx)
+        if cached is not None:
+            return cached
+        if not 0 <= idx < len(self):
+            raise IndexError("game index out of range")
+        start, end = self._offsets[idx], self._offsets[idx + 1]
+        # Header block ends at the first blank line; never decode the move text
+        stop = self._mm.find(b"\n\n", start, end)
+        block = self._mm[start:end if stop < 0 else stop].decode("utf-8", "replace")
+        headers = dict(HEADER_RE.findall(block))
+        self._headers[idx] = headers
+        return headers
+
+    def close(self):
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
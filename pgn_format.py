@@ -0,0 +1,72 @@
+import re
+
+from pgn_archive import PgnArchive
+
+# ================= PGN FORMATTING =================
+# Keep all headers that match the [Key "Value"] format
+HEADER_LINE_RE = re.compile(r'\[\w+ ".*"\]')
+
+# One scan removes comments { ... } and annotations like $1, $2. Comments go
+# first in the old multi-pass chain, so a NAG may be spliced together across
+# a comment ("$1{c}5" -> "$15"); the NAG branch allows that to keep the output
+# byte-identical.
+_COMMENT = r'\{[^}]*\}'
+MOVETEXT_NOISE_RE = re.compile(rf'{_COMMENT}|\$(?:{_COMMENT})*\d(?:\d|{_COMMENT})*')
+MOVE_MARKER_TAIL_RE = re.compile(r'\d+\s*\Z')
+ASCII_DIGITS = "0123456789"
+
+
+def strip_move_markers(move_text):
+    # Remove redundant "1..." / "1 ..." notations. Splitting on the dots keeps
+    # the scan in C; only the text right before each "..." is inspected.
+    pieces = move_text.split('...')
+    if len(pieces) == 1:
+        return move_text
+
+    out = []
+    for piece in pieces[:-1]:
+        stripped = piece.rstrip()
+        core = stripped.rstrip(ASCII_DIGITS)
+        if core[-1:].isdecimal():
+            # Non-ASCII digits still match \d
+            out.append(piece[:MOVE_MARKER_TAIL_RE.search(piece).start()])
+        elif len(core) < len(stripped):
+            out.append(core)
+        else:
+            out.append(piece)
+            out.append('...')
+    out.append(pieces[-1])
+    return ''.join(out)
+
+def format_pgn_to_standard(raw_pgn):
+    if not raw_pgn:
+        return ""
+
+    headers = []
+    movement_lines = []
+    header_match = HEADER_LINE_RE.match
+
+    for line in raw_pgn.split('\n'):
+        line = line.strip()
+        if not line: continue
+        if line[0] == '[':
+            if header_match(line):
+                headers.append(line)
+        else:
+            movement_lines.append(line)
+
+    move_text = MOVETEXT_NOISE_RE.sub('', " ".join(movement_lines))
+    move_text = strip_move_markers(move_text)
+
+    # Standardize spacing
+    move_text = " ".join(move_text.split())
+
+    # Final reconstruction: Headers -> Empty Line -> Moves
+    return "\n".join(headers) + "\n\n" + move_text
+
+def format_pgns(raw_pgns):
+    return [formatted for formatted in map(format_pgn_to_standard, raw_pgns) if formatted]
+
+def format_archive(path):
+    with PgnArchive(path) as archive:
+        return format_pgns(archive)
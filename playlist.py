@@ -0,0 +1,106 @@
+import logging
+import threading
+from array import array
+
+from game_codec import CompactGame, GameCodec, read_archive, write_archive
+
+# ================= PLAYLIST =================
+# Thread-safe game list that fetchers append to while the main loop is
+# already playing from it.
+
+
+class Playlist:
+    def __init__(self, pgns=()):
+        self._items = list(pgns)
+        self._cond = threading.Condition()
+        self.complete = False
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, idx):
+        return self._items[idx]
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def extend(self, pgns):
+        with self._cond:
+            self._items.extend(pgns)
+            self._cond.notify_all()
+
+    def mark_complete(self):
+        with self._cond:
+            self.complete = True
+            self._cond.notify_all()
+
+    def wait_for(self, count, timeout=None):
+        # Block until at least `count` games are available or nothing more is coming
+        with self._cond:
+            self._cond.wait_for(lambda: len(self._items) >= count or self.complete, timeout)
+            return len(self._items) >= count
+
+
+class CompactPlaylist(Playlist):
+    # Same interface, but games are kept packed (game_codec) in one shared
+    # buffer and rebuilt as PGN text only when a game is taken for playback.
+    # Games that do not replay are dropped on the way in.
+    def __init__(self, pgns=()):
+        super().__init__()
+        self.codec = GameCodec()
+        self._blob = bytearray()
+        self._offsets = array("Q", [0])
+        if pgns:
+            self.extend(pgns)
+
+    @classmethod
+    def load(cls, path):
+        playlist = cls()
+        playlist.codec, playlist._blob, playlist._offsets = read_archive(path)
+        playlist.complete = True
+        return playlist
+
+    def save(self, path):
+        with self._cond:
+            write_archive(path, self.codec, self._blob, self._offsets)
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def _packed(self, idx):
+        with self._cond:
+            if idx < 0:
+                idx += len(self)
+            if not 0 <= idx < len(self):
+                raise IndexError("game index out of range")
+            return bytes(self._blob[self._offsets[idx]:self._offsets[idx + 1]])
+
+    def __getitem__(self, idx):
+        return self.codec.unpack(self._packed(idx)).pgn()
+
+    def __iter__(self):
+        for idx in range(len(self)):
+            yield self[idx]
+
+    def headers(self, idx):
+        # Header values without replaying the moves (a derived CurrentPosition is left out)
+        headers, _ = self.codec.unpack_headers(self._packed(idx))
+        return {key: value for key, value in headers if value is not None}
+
+    def extend(self, pgns):
+        games = []
+        for pgn in pgns:
+            try:
+                games.append(CompactGame.from_pgn(pgn))
+            except ValueError as e:
+                logging.warning(f"[PLAYLIST] Dropping game that does not replay: {e}")
+        with self._cond:
+            for game in games:
+                self._blob += self.codec.pack(game)
+                self._offsets.append(len(self._blob))
+            self._cond.notify_all()
+
+    def wait_for(self, count, timeout=None):
+        with self._cond:
+            self._cond.wait_for(lambda: len(self) >= count or self.complete, timeout)
+            return len(self) >= count
@@ -0,0 +1,114 @@
+import base64
+import json
+import logging
+import threading
+import time
+
+import requests
+import websocket
+
+# ================= DEVTOOLS SCREENCAST CAPTURE =================
+# Streams the page through Chrome's Page.startScreencast instead of grabbing
+# an X display. Chrome only emits a JPEG when the page changed; each one is
+# written to ffmpeg's stdin (image2pipe, wall-clock timestamps) as it lands,
+# and the last frame is repeated at a low heartbeat rate so the encoder never
+# waits on a static board. Works with headless Chrome, so no Xvfb is needed.
+
+
+def debugger_address(driver):
+    return driver.capabilities["goog:chromeOptions"]["debuggerAddress"]
+
+def page_websocket_url(driver):
+    # chromedriver window handles are DevTools target ids
+    handle = driver.current_window_handle
+    targets = requests.get(f"http://{debugger_address(driver)}/json", timeout=5).json()
+    for target in targets:
+        if target.get("id") == handle and target.get("webSocketDebuggerUrl"):
+            return target["webSocketDebuggerUrl"]
+    raise RuntimeError(f"No DevTools target for window {handle}")
+
+
+class ScreencastCapture:
+    def __init__(self, stream, max_size=800, quality=80, heartbeat=0.5):
+        self.stream = stream
+        self.max_size = max_size
+        self.quality = quality
+        self.heartbeat = heartbeat
+        self.frames = 0
+        self.repeats = 0
+        self._frame = None
+        self._written_at = 0.0
+        self._ws = None
+        self.target = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._writer = None
+
+    def attach(self, driver):
+        # (Re)bind to the driver's current window, e.g. after a preload swap
+        # or a browser recovery; ffmpeg keeps running across the switch.
+        url = page_websocket_url(driver)
+        old, self._ws = self._ws, websocket.create_connection(url, timeout=10, suppress_origin=True)
+        if old:
+            try:
+                old.close()
+            except Exception:
+                pass
+        ws = self._ws
+        ws.send(json.dumps({"id": 1, "method": "Page.startScreencast", "params": {
+            "format": "jpeg", "quality": self.quality,
+            "maxWidth": self.max_size, "maxHeight": self.max_size,
+        }}))
+        threading.Thread(target=self._read, args=(ws,), name="screencast-reader", daemon=True).start()
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._heartbeat, name="screencast-writer", daemon=True)
+            self._writer.start()
+        self.target = driver.current_window_handle
+        logging.info(f"[SCREENCAST] Capturing window {self.target}")
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._ws:
+            try:
+                self._ws.close()
+            except Exception:
+                pass
+
+    def _read(self, ws):
+        ws.settimeout(None)
+        try:
+            while not self._stop.is_set():
+                message = json.loads(ws.recv())
+                if message.get("method") != "Page.screencastFrame":
+                    continue
+                params = message["params"]
+                # Chrome stops sending until each frame is acknowledged
+                ws.send(json.dumps({"id": 2, "method": "Page.screencastFrameAck",
+                                    "params": {"sessionId": params["sessionId"]}}))
+                self._write(base64.b64decode(params["data"]), repeat=False)
+        except Exception as e:
+            if ws is self._ws and not self._stop.is_set():
+                logging.warning(f"[SCREENCAST] Frame stream ended: {e}")
+
+    def _write(self, frame, repeat):
+        with self._lock:
+            if repeat:
+                if frame is not self._frame:
+                    return
+                self.repeats += 1
+            else:
+                self._frame = frame
+                self.frames += 1
+            try:
+                self.stream.write(frame)
+                self.stream.flush()
+            except (BrokenPipeError, ValueError, OSError):
+                self._stop.set()
+            self._written_at = time.monotonic()
+
+    def _heartbeat(self):
+        while not self._stop.wait(self.heartbeat / 2):
+            frame = self._frame
+            if frame is not None and time.monotonic() - self._written_at >= self.heartbeat:
+                self._write(frame, repeat=True)
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import tempfile
+import threading
+import time
+
+# ================= ENCODED SEGMENT CACHE =================
+# Every game is encoded once into an MPEG-TS segment stored under a content
+# hash of its normalized PGN and the render/encode settings. A long-lived
+# relay ffmpeg owns the output (RTMP or file) and only stream-copies: live
+# games reach it through a tee that also writes the cache, and games seen
+# before are replayed from disk at real-time pace with their timestamps
+# shifted to continue the stream. Neither the browser nor the encoder runs
+# for a cached game.
+
+
+def segment_key(pgn, settings):
+    digest = hashlib.sha256()
+    digest.update(json.dumps(settings, sort_keys=True).encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(pgn.encode("utf-8"))
+    return digest.hexdigest()
+
+
+def probe_duration(path):
+    out = subprocess.run(
+        ['ffprobe', '-v', 'error', '-show_entries', 'format=duration', '-of', 'csv=p=0', path],
+        capture_output=True, text=True, timeout=30,
+    ).stdout.strip()
+    try:
+        return float(out)
+    except ValueError:
+        return 0.0
+
+
+class SegmentCache:
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def path(self, key):
+        return os.path.join(self.cache_dir, key[:2], f"{key}.ts")
+
+    def lookup(self, key):
+        # (path, duration seconds) for a complete segment, else None
+        path = self.path(key)
+        try:
+            with open(path + ".json", "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not os.path.exists(path):
+            return None
+        return path, meta["duration"]
+
+    def writer(self, key):
+        # Each writer gets its own temp file, so channels encoding the same
+        # game never interleave; whichever commits last wins
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return tempfile.NamedTemporaryFile(
+            "wb", dir=os.path.dirname(path), prefix=f"{key}.", suffix=".ts.tmp", delete=False)
+
+    def commit(self, key, tmp_path, duration, info=""):
+        path = self.path(key)
+        os.replace(tmp_path, path)
+        fd, tmp_meta = tempfile.mkstemp(dir=os.path.dirname(path), prefix=f"{key}.", suffix=".json.tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"duration": duration, "info": info, "created": time.time()}, f)
+        # The metadata file is the completion marker, so it lands last
+        os.replace(tmp_meta, path + ".json")
+
+    def discard(self, tmp_path):
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+
+
+class SegmentRelay:
+    # Persistent stream-copy ffmpeg; `clock` is the stream time fed so far,
+    # which is where the next segment's timestamps must start.
+    def __init__(self, output_args):
+        command = ['ffmpeg', '-y', '-loglevel', 'warning', '-fflags', '+genpts',
+                   '-f', 'mpegts', '-i', 'pipe:0', '-c', 'copy'] + output_args
+        logging.info(f"[RELAY] {' '.join(command)}")
+        self.proc = subprocess.Popen(command, stdin=subprocess.PIPE)
+        self.clock = 0.0
+        self._lock = threading.Lock()
+
+    def write(self, chunk):
+        with self._lock:
+            self.proc.stdin.write(chunk)
+
+    def play_file(self, path, duration):
+        # Replays a cached segment in real time, shifted onto the stream clock;
+        # False when the segment could not be read
+        logging.info(f"[RELAY] Replaying cached segment {os.path.basename(path)} ({duration:.1f}s)")
+        proc = subprocess.Popen(
+            ['ffmpeg', '-loglevel', 'error', '-re', '-i', path, '-c', 'copy',
+             '-output_ts_offset', f'{self.clock:.3f}', '-f', 'mpegts', 'pipe:1'],
+            stdout=subprocess.PIPE)
+        for chunk in iter(lambda: proc.stdout.read(65536), b""):
+            self.write(chunk)
+        if proc.wait() != 0:
+            logging.error(f"[RELAY] Replay of {os.path.basename(path)} failed with code {proc.returncode}")
+            return False
+        self.clock += duration
+        return True
+
+    def close(self):
+        try:
+            self.proc.stdin.close()
+            self.proc.wait(timeout=10)
+        except Exception:
+            self.proc.terminate()
+
+
+class SegmentTee:
+    # Pumps a live encoder's MPEG-TS stdout into the relay and a cache file
+    def __init__(self, proc, relay, cache, key):
+        self.proc = proc
+        self.relay = relay
+        self.cache = cache
+        self.key = key
+        self.file = cache.writer(key)
+        self.failed = False
+        self.thread = threading.Thread(target=self._pump, name="segment-tee", daemon=True)
+        self.thread.start()
+
+    def _pump(self):
+        for chunk in iter(lambda: self.proc.stdout.read(65536), b""):
+            try:
+                self.relay.write(chunk)
+            except (BrokenPipeError, OSError) as e:
+                logging.error(f"[RELAY] Write failed: {e}")
+                self.failed = True
+            self.file.write(chunk)
+
+    def finish(self, complete, info=""):
+        # Called after the encoder exited; only complete games are cached
+        self.thread.join()
+        self.file.close()
+        duration = probe_duration(self.file.name)
+        self.relay.clock += duration
+        if complete and duration > 0:
+            self.cache.commit(self.key, self.file.name, duration, info)
+            logging.info(f"[CACHE] Stored {duration:.1f}s segment for {info}")
+        else:
+            self.cache.discard(self.file.name)
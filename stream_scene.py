@@ -0,0 +1,153 @@
+import logging
+import os
+import platform
+
+# ================= STREAM SCENE =================
+# Layout, overlays and encoder settings of the vertical stream. The live
+# encoder (main.start_screen_recording) and the offline batch render build
+# their ffmpeg arguments from here, so their segments are interchangeable.
+
+# === 1. GLOBAL SCENE SETTINGS ===
+OUT_W = 480
+OUT_H = 854        # 480p Vertical
+OUTPUT_FPS = 15
+
+# === 2. TOP TEXT (HEADER) SETTINGS ===
+HEADER_TEXT = "GOAT Chess"
+HEADER_FONT_SIZE = 32
+HEADER_Y = 20
+HEADER_BOX_ALPHA = 0.5            # Transparency of the black box behind the text (0.0 to 1.0)
+
+# === 3. CHESS BOARD SETTINGS ===
+# --- Browser Cropping (Optimized for 800x800 window) ---
+BOARD_CROP_X = 0
+BOARD_CROP_Y = 100                # Adjusted for 800h
+BOARD_CROP_W = 600
+BOARD_CROP_H = 600
+
+# --- Stream Positioning ---
+BOARD_SCALE_W = 480
+BOARD_POS_Y_SHIFT = -120
+
+# === 4. BOTTOM BANNER SETTINGS ===
+BANNER_SCALE_W = 480
+BANNER_H = 400
+BANNER_Y = 560
+
+# === 5. AUDIO SETTINGS ===
+MUSIC_VOLUME = 0.5                # Background music volume (0.0 = silent, 1.0 = loud)
+
+# === 6. ENCODER SETTINGS ===
+VIDEO_PRESET = "ultrafast"
+VIDEO_BITRATE = "500k"
+VIDEO_GOP = 30
+AUDIO_BITRATE = "32k"
+AUDIO_RATE = 44100
+
+
+def music_file():
+    return os.path.join(os.getcwd(), 'bgmusic.mp3')
+
+def banner_file():
+    return os.path.join(os.getcwd(), 'bottom-Magnus.mp4')
+
+def font_file():
+    if platform.system().lower() == 'windows':
+        return "C\\:/Windows/Fonts/arialbd.ttf"
+    return "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+
+def bufsize(static_scene):
+    # 2s of VBV lets move frames borrow the bits idle frames leave unused
+    return '1000k' if static_scene else '400k'
+
+
+def overlay_inputs():
+    # Inputs 1 (banner video) and 2 (audio) of the scene filter graph
+    music = music_file()
+    if os.path.exists(music):
+        audio_args = ['-stream_loop', '-1', '-i', music]
+    else:
+        logging.warning("[AUDIO] Background music not found, using null audio.")
+        audio_args = ['-f', 'lavfi', '-i', f'anullsrc=channel_layout=stereo:sample_rate={AUDIO_RATE}']
+
+    # Bottom Magnus video setup
+    banner = banner_file()
+    if os.path.exists(banner):
+        banner_args = ['-stream_loop', '-1', '-i', banner]
+    else:
+        logging.warning("[VIDEO] bottom-Magnus.mp4 not found, falling back.")
+        # We need a dummy input if missing to keep mapping consistent
+        banner_args = ['-f', 'lavfi', '-i', 'color=c=black:s=720x400:d=1']
+    return banner_args + audio_args
+
+def filter_args(crop, board_filter="", board_suffix=""):
+    # crop: (x, y, w, h) of the board in input 0. board_filter runs on the
+    # cropped board before scaling, board_suffix after the header is drawn.
+    crop_x, crop_y, crop_w, crop_h = crop
+
+    # --- LOGIC: Vertical Padding Calculation ---
+    # This formula centers the board in the 1280h frame and applies the BOARD_POS_Y_SHIFT
+    vertical_pad = f"({OUT_H}-ih*min({OUT_W}/iw\\,{OUT_H}/ih))/2+{BOARD_POS_Y_SHIFT}"
+
+    return [
+        '-filter_threads', '1',        # Force single filter thread (Saves 50MB+)
+        '-filter_complex',
+        # Step A: Crop and scale the board
+        f"[0:v]crop={crop_w}:{crop_h}:{crop_x}:{crop_y},"
+        f"{board_filter}scale={BOARD_SCALE_W}:-1[board];"
+
+        # Step B: Pad board into stream frame and add Header Text
+        f"[board]pad={OUT_W}:{OUT_H}:(ow-iw)/2:{vertical_pad}:black,"
+        f"drawtext=fontfile='{font_file()}':text='{HEADER_TEXT}':"
+        f"fontcolor=white:fontsize={HEADER_FONT_SIZE}:box=1:boxcolor=black@{HEADER_BOX_ALPHA}:boxborderw=10:"
+        f"x=(w-text_w)/2:y={HEADER_Y}{board_suffix}[main];"
+
+        # Step C: Scale the banner and overlay it
+        f"[1:v]scale={BANNER_SCALE_W}:{BANNER_H}[banner];"
+        f"[main][banner]overlay=0:{BANNER_Y}[v];"
+
+        # Step D: Apply Volume
+        f"[2:a]volume={MUSIC_VOLUME}[a]",
+
+        '-map', '[v]',
+        '-map', '[a]'
+    ]
+
+def encoding_args(static_scene=False):
+    return [
+        '-vcodec', 'libx264',
+        '-preset', VIDEO_PRESET,
+        '-pix_fmt', 'yuv420p',
+        '-r', str(OUTPUT_FPS),
+        '-g', str(VIDEO_GOP),
+        '-b:v', VIDEO_BITRATE,
+        '-minrate', VIDEO_BITRATE,
+        '-maxrate', VIDEO_BITRATE,
+        '-bufsize', bufsize(static_scene),
+        '-x264-params', 'nal-hrd=cbr:force-cfr=1',
+        '-acodec', 'aac',
+        '-ar', str(AUDIO_RATE),
+        '-b:a', AUDIO_BITRATE,
+        '-threads', '1',               # Single thread for encoding
+        '-shortest'
+    ]
+
+
+def _file_stamp(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return [st.st_size, st.st_mtime_ns]
+
+def scene_settings(static_scene=False):
+    # Every scene and encoder value that changes the output bytes, including
+    # which overlay media is in use
+    return {
+        "out": [OUT_W, OUT_H, OUTPUT_FPS],
+        "header": [HEADER_TEXT, HEADER_FONT_SIZE, HEADER_Y, HEADER_BOX_ALPHA, font_file()],
+        "board": [BOARD_CROP_X, BOARD_CROP_Y, BOARD_CROP_W, BOARD_CROP_H, BOARD_SCALE_W, BOARD_POS_Y_SHIFT],
+        "banner": [BANNER_SCALE_W, BANNER_H, BANNER_Y, _file_stamp(banner_file())],
+        "audio": [MUSIC_VOLUME, AUDIO_BITRATE, AUDIO_RATE, _file_stamp(music_file())],
+        "encoder": [VIDEO_PRESET, VIDEO_BITRATE, bufsize(static_scene), VIDEO_GOP],
+    }
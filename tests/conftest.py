@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Modules live at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+FIXTURE_PGN = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "magnus_games.pgn")
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+from board_renderer import BoardRenderer, FramePacer, stream_game
+
+GAME = '[Event "Test"]\n[Result "*"]\n\n1. e4 e5 2. Nf3 *'
+
+
+def test_stream_game_writes_every_position():
+    read_fd, write_fd = os.pipe()
+    renderer = BoardRenderer(64)
+    with os.fdopen(write_fd, "wb", buffering=0) as stream, os.fdopen(read_fd, "rb") as reader:
+        # A 1ms hold at 1000 fps is one frame per position; the pipe buffer
+        # holds all four 64x64 frames
+        pacer = FramePacer(stream, 1000)
+        assert stream_game(pacer, renderer, GAME, 0.001) == 3
+        stream.close()
+        assert len(reader.read()) == 4 * renderer.size * renderer.size * 3
+
+
+def test_stream_game_raises_on_closed_pipe():
+    # run_channel catches this to restart ffmpeg at the next game
+    read_fd, write_fd = os.pipe()
+    os.close(read_fd)
+    with os.fdopen(write_fd, "wb", buffering=0) as stream:
+        pacer = FramePacer(stream, 1000)
+        with pytest.raises(BrokenPipeError):
+            stream_game(pacer, BoardRenderer(64), GAME, 0.001)
@@ -0,0 +1,90 @@
+import pytest
+
+from chess_rules import STARTING_FEN, IllegalMoveError, Position, validate_pgn
+from conftest import FIXTURE_PGN
+from pgn_archive import PgnArchive
+from pgn_format import format_pgn_to_standard
+
+
+def perft(pos, depth):
+    if depth == 0:
+        return 1
+    moves = pos.legal_moves()
+    if depth == 1:
+        return len(moves)
+    total = 0
+    for move in moves:
+        child = pos.copy()
+        child.push(move)
+        total += perft(child, depth - 1)
+    return total
+
+
+# Reference counts from the chessprogramming.org perft positions
+@pytest.mark.parametrize("fen, depth, nodes", [
+    (STARTING_FEN, 3, 8902),
+    ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", 2, 2039),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", 3, 2812),
+    ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1", 3, 9467),
+    ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", 2, 1486),
+])
+def test_perft(fen, depth, nodes):
+    assert perft(Position.from_fen(fen), depth) == nodes
+
+
+def test_move_index_round_trip():
+    pos = Position.from_fen("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1")
+    for idx, move in enumerate(pos.legal_moves()):
+        assert pos.move_index(move) == idx
+        assert pos.move_at(idx) == move
+    with pytest.raises(IllegalMoveError):
+        pos.move_at(len(pos.legal_moves()))
+
+
+def game(moves, result="*", **headers):
+    tags = {"Event": "Test", "Result": result, **headers}
+    return "\n".join(f'[{k} "{v}"]' for k, v in tags.items()) + "\n\n" + moves
+
+
+def test_validate_legal_game():
+    check = validate_pgn(game("1. f3 e5 2. g4 Qh4# 0-1", "0-1"))
+    assert check.ok and check.plies == 4 and check.error is None
+    assert check.final_fen == "rnb1kbnr/pppp1ppp/8/4p3/6Pq/5P2/PPPPP2P/RNBQKBNR w KQkq - 1 3"
+
+
+def test_validate_zero_castling():
+    # Castling written with zeros must not lose its leading 0 to the move-number strip
+    zeros = validate_pgn(game("1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. 0-0 d6 5. d3 Bg4 6. Nc3 Qd7 7. Be3 0-0-0 *"))
+    letters = validate_pgn(game("1. e4 e5 2. Nf3 Nc6 3. Bc4 Bc5 4. O-O d6 5. d3 Bg4 6. Nc3 Qd7 7. Be3 O-O-O *"))
+    assert zeros.ok and zeros.plies == 14
+    assert zeros.final_fen == letters.final_fen == "2kr2nr/pppq1ppp/2np4/2b1p3/2B1P1b1/2NPBN2/PPP2PPP/R2Q1RK1 w - - 5 8"
+
+
+def test_validate_illegal_move():
+    check = validate_pgn(game("1. e4 e5 2. Ke3 *"))
+    assert not check.ok and check.plies == 2 and check.error.startswith("ply 3")
+
+
+def test_validate_result_mismatch():
+    check = validate_pgn(game("1. e4 e5 1-0", "0-1"))
+    assert not check.ok and "does not match" in check.error
+
+
+def test_validate_variants():
+    assert not validate_pgn(game("1. e4 *", Variant="Crazyhouse")).ok
+    chess960 = game("1. e4 *", Variant="Chess960",
+                    SetUp="1", FEN="bbrknnqr/pppppppp/8/8/8/8/PPPPPPPP/BBRKNNQR w HChc - 0 1")
+    assert validate_pgn(chess960).ok
+    check = validate_pgn(chess960, allow_chess960=False)
+    assert not check.ok and "disabled" in check.error
+
+
+def test_validate_bad_fen():
+    check = validate_pgn(game("1. e4 *", SetUp="1", FEN="not a fen"))
+    assert not check.ok and check.plies == 0
+
+
+def test_fixture_games_validate():
+    with PgnArchive(FIXTURE_PGN, transform=format_pgn_to_standard, persist_index=False) as archive:
+        failures = [idx for idx, pgn in enumerate(archive) if not validate_pgn(pgn).ok]
+    assert not failures
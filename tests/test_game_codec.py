@@ -0,0 +1,58 @@
+from conftest import FIXTURE_PGN
+from game_codec import CompactGame, GameCodec, read_archive, read_varint, write_archive, write_varint
+from pgn_archive import HEADER_RE, PgnArchive
+from pgn_format import format_pgn_to_standard
+from playlist import CompactPlaylist
+
+
+def fixture_pgns():
+    with PgnArchive(FIXTURE_PGN, transform=format_pgn_to_standard, persist_index=False) as archive:
+        return list(archive)
+
+
+def test_varint_round_trip():
+    out = bytearray()
+    values = [0, 1, 127, 128, 300, 2 ** 32, 164105982219]
+    for value in values:
+        write_varint(out, value)
+    pos = 0
+    for value in values:
+        decoded, pos = read_varint(out, pos)
+        assert decoded == value
+    assert pos == len(out)
+
+
+def test_game_round_trip_is_byte_identical():
+    codec = GameCodec()
+    for pgn in fixture_pgns():
+        packed = codec.pack(CompactGame.from_pgn(pgn))
+        assert codec.unpack(packed).pgn() == pgn
+        assert len(packed) < len(pgn)
+
+
+def test_playlist_headers_and_save_load(tmp_path):
+    pgns = fixture_pgns()[:20]
+    playlist = CompactPlaylist(pgns)
+    assert len(playlist) == 20
+    assert playlist[3] == pgns[3]
+    assert playlist[-1] == pgns[-1]
+    headers = playlist.headers(0)
+    expected = dict(HEADER_RE.findall(pgns[0].partition("\n\n")[0]))
+    # A CurrentPosition equal to the final position is derived, not stored
+    expected.pop("CurrentPosition", None)
+    headers.pop("CurrentPosition", None)
+    assert headers == expected
+
+    path = str(tmp_path / "games.cgames")
+    playlist.save(path)
+    loaded = CompactPlaylist.load(path)
+    assert loaded.complete and list(loaded) == pgns
+    codec, blob, offsets = read_archive(path)
+    write_archive(str(tmp_path / "copy.cgames"), codec, blob, offsets)
+    assert (tmp_path / "copy.cgames").read_bytes() == (tmp_path / "games.cgames").read_bytes()
+
+
+def test_playlist_drops_games_that_do_not_replay():
+    bad = '[Event "Bad"]\n[Result "*"]\n\n1. e4 e5 2. Ke3 *'
+    playlist = CompactPlaylist([bad] + fixture_pgns()[:2])
+    assert len(playlist) == 2
@@ -0,0 +1,69 @@
+import os
+
+from pgn_archive import PgnArchive
+
+GAME_A = '[Event "A"]\n[White "Alice"]\n[Black "Bob"]\n\n1. e4 e5 2. Nf3 1-0\n'
+GAME_B = '[Event "B"]\n[White "Carol"]\n[Black "Dave"]\n\n1. d4 d5 0-1\n'
+
+
+def write(path, text, mtime_ns=None):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_games_and_headers(tmp_path):
+    path = tmp_path / "games.pgn"
+    write(path, GAME_A + "\n" + GAME_B)
+    with PgnArchive(str(path)) as archive:
+        assert len(archive) == 2
+        assert archive.raw(1).startswith('[Event "B"]')
+        assert archive.raw(-1) == archive.raw(1)
+        assert archive.headers(0) == {"Event": "A", "White": "Alice", "Black": "Bob"}
+        assert archive[0].endswith("1-0")
+
+
+def test_index_is_persisted_and_reused(tmp_path):
+    path = tmp_path / "games.pgn"
+    write(path, GAME_A + "\n" + GAME_B)
+    with PgnArchive(str(path)) as archive:
+        index_path = archive.index_path
+    assert os.path.exists(index_path)
+    stamp = os.stat(index_path).st_mtime_ns
+    with PgnArchive(str(path)) as archive:
+        assert len(archive) == 2
+    assert os.stat(index_path).st_mtime_ns == stamp
+
+
+def test_index_invalidated_when_file_changes(tmp_path):
+    path = tmp_path / "games.pgn"
+    write(path, GAME_A, mtime_ns=1_000_000_000)
+    with PgnArchive(str(path)) as archive:
+        assert len(archive) == 1
+    # Same size is not enough: the mtime is part of the stamp too
+    write(path, GAME_A.replace("Alice", "Alize"), mtime_ns=2_000_000_000)
+    with PgnArchive(str(path)) as archive:
+        assert archive.headers(0)["White"] == "Alize"
+    write(path, GAME_A + "\n" + GAME_B)
+    with PgnArchive(str(path)) as archive:
+        assert len(archive) == 2
+
+
+def test_corrupt_index_is_rebuilt(tmp_path):
+    path = tmp_path / "games.pgn"
+    write(path, GAME_A + "\n" + GAME_B)
+    with PgnArchive(str(path)) as archive:
+        index_path = archive.index_path
+    with open(index_path, "wb") as f:
+        f.write(b"garbage")
+    with PgnArchive(str(path)) as archive:
+        assert len(archive) == 2
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.pgn"
+    write(path, "")
+    with PgnArchive(str(path), persist_index=False) as archive:
+        assert len(archive) == 0
+        assert list(archive) == []
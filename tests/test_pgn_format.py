@@ -0,0 +1,69 @@
+import re
+
+import pytest
+
+from conftest import FIXTURE_PGN
+from pgn_archive import PgnArchive
+from pgn_format import format_pgn_to_standard, strip_move_markers
+
+
+def reference_format(raw_pgn):
+    # The original regex chain; the single-scan normalizer must match it byte for byte
+    if not raw_pgn:
+        return ""
+    headers, movement_lines = [], []
+    for line in raw_pgn.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        if line.startswith('['):
+            if re.match(r'\[\w+ ".*"\]', line):
+                headers.append(line)
+        else:
+            movement_lines.append(line)
+    move_text = " ".join(movement_lines)
+    move_text = re.sub(r'\{.*?\}', '', move_text, flags=re.DOTALL)
+    move_text = re.sub(r'\$\d+', '', move_text)
+    move_text = re.sub(r'\d+\s*\.\.\.', '', move_text)
+    move_text = re.sub(r'\s+', ' ', move_text).strip()
+    return "\n".join(headers) + "\n\n" + move_text
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("1. e4 1... e5", "1. e4  e5"),
+    ("12 ... Nf6", " Nf6"),
+    ("1. e4 e5", "1. e4 e5"),
+    # Same as the original \d+\s*\.\.\. regex: the digit of a move is eaten too
+    ("Nf3 ... Nc6", "Nf Nc6"),
+    ("O-O ... e5", "O-O ... e5"),
+    ("...", "..."),
+    ("3...Bb4 4...O-O", "Bb4 O-O"),
+])
+def test_strip_move_markers(text, expected):
+    assert strip_move_markers(text) == expected
+
+
+@pytest.mark.parametrize("move_text", [
+    "1. e4 {best by test} e5 $1 2. Nf3 $14 Nc6 1-0",
+    "1. e4 1... e5 2. Nf3 2 ... Nc6 *",
+    "1. d4 $1{note}5 d5 0-1",
+    "1. e4 {a} {b} e5 {unclosed",
+    "1. e4 e5 ... Nf3",
+    "1. e4 ١... e5",
+    "",
+])
+def test_format_matches_regex_chain(move_text):
+    raw = '[Event "Test"]\n[Site "?"]\n[Bad header line]\n\n' + move_text + "\n"
+    assert format_pgn_to_standard(raw) == reference_format(raw)
+
+
+def test_format_matches_regex_chain_on_fixture():
+    with PgnArchive(FIXTURE_PGN, persist_index=False) as archive:
+        for idx in range(len(archive)):
+            raw = archive.raw(idx)
+            assert format_pgn_to_standard(raw) == reference_format(raw), idx
+
+
+def test_empty_input():
+    assert format_pgn_to_standard("") == ""
+    assert format_pgn_to_standard(None) == ""